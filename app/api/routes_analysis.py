@@ -1,6 +1,20 @@
-from fastapi import APIRouter, HTTPException
-from app.services.quality_scoring_service import compute_quality_score
-from typing import Optional
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from app.services.quality_scoring_service import (
+    ANALYSIS_MODES,
+    DUPLICATE_SAMPLE_ROWS,
+    compute_quality_score,
+    compute_selected_quality_score,
+    find_duplicate_rows,
+    iter_quality_analysis,
+    select_features,
+    select_records
+)
+from app.services.storage_service import get_version_record
+from app.services.cache_service import ANALYSIS_CACHE_FORMAT
+from app.api.routes_jobs import submit_background_job
+from app.utils.helpers import dumps_json, make_etag, http_date, is_not_modified
+from typing import List, Optional
 from fastapi import Query
 
 router = APIRouter(prefix="/analyze", tags=["Dataset Analysis"])
@@ -9,14 +23,234 @@ router = APIRouter(prefix="/analyze", tags=["Dataset Analysis"])
 @router.get("/{dataset_id}")
 def analyze_dataset(
     dataset_id: str,
-    target_col: Optional[str] = Query(default=None)
+    request: Request,
+    target_col: Optional[str] = Query(default=None),
+    mode: str = Query(default="exact"),
+    feature: Optional[List[str]] = Query(default=None),
+    flag: Optional[List[str]] = Query(default=None),
+    offset: int = Query(default=0, ge=0),
+    limit: Optional[int] = Query(default=None, ge=1),
+    background: bool = Query(default=False)
 ):
+    """
+    Quality analysis of a dataset. `feature`, `flag` (a quality flag or
+    risk label, repeatable) and `offset` / `limit` select which feature
+    diagnostics are returned.
+    """
+    return _analysis_response(
+        request, dataset_id, "v0_raw", target_col, mode, feature, flag,
+        offset, limit, background
+    )
+
+
+@router.get("/{dataset_id}/versions/{version}")
+def analyze_dataset_version(
+    dataset_id: str,
+    version: str,
+    request: Request,
+    target_col: Optional[str] = Query(default=None),
+    mode: str = Query(default="exact"),
+    feature: Optional[List[str]] = Query(default=None),
+    flag: Optional[List[str]] = Query(default=None),
+    offset: int = Query(default=0, ge=0),
+    limit: Optional[int] = Query(default=None, ge=1),
+    background: bool = Query(default=False)
+):
+    """
+    Quality analysis of a given version; same options as the analysis of
+    the raw dataset.
+    """
+    return _analysis_response(
+        request, dataset_id, version, target_col, mode, feature, flag,
+        offset, limit, background
+    )
+
+
+def _analysis_response(
+    request: Request,
+    dataset_id: str,
+    version: str,
+    target_col: str | None,
+    mode: str,
+    feature: list[str] | None,
+    flag: list[str] | None,
+    offset: int,
+    limit: int | None,
+    background: bool
+):
+    """
+    The analysis of a version, tagged with an entity tag derived from its
+    content hash and the request parameters. A client revalidating an
+    unchanged analysis gets a 304 before anything is computed or read
+    from the cache.
+    """
+    _check_mode(mode)
+
+    if background:
+        return submit_background_job(
+            "analyze", dataset_id, compute_selected_quality_score,
+            dataset_id, target_col, version, mode, feature, flag, offset,
+            limit
+        )
+
+    version, headers = _validators(
+        dataset_id, version, target_col, mode, feature, flag, offset, limit
+    )
+    if is_not_modified(
+        request.headers, headers["ETag"], headers["Last-Modified"]
+    ):
+        return Response(status_code=304, headers=headers)
+
+    analysis = _analyze(dataset_id, target_col, mode, version)
+    if feature or flag or offset or limit is not None:
+        analysis = select_features(analysis, feature, flag, offset, limit)
+
+    # Encoded directly; FastAPI's encoder is slow on wide payloads
+    return Response(
+        dumps_json(analysis), media_type="application/json", headers=headers
+    )
+
+
+@router.get("/{dataset_id}/stream")
+def stream_analysis(
+    dataset_id: str,
+    request: Request,
+    target_col: Optional[str] = Query(default=None),
+    mode: str = Query(default="exact"),
+    feature: Optional[List[str]] = Query(default=None),
+    flag: Optional[List[str]] = Query(default=None),
+    offset: int = Query(default=0, ge=0),
+    limit: Optional[int] = Query(default=None, ge=1)
+):
+    """
+    The analysis as NDJSON: a "summary" line with the score and metrics,
+    one "feature" line per selected feature with its own
+    recommendations, an "approximation" line in approximate mode, and a
+    final "recommendations" line with the dataset-level ones and the
+    pagination. Lines are sent as they are computed.
+    """
+    return _stream_response(
+        request, dataset_id, "v0_raw", target_col, mode, feature, flag,
+        offset, limit
+    )
+
+
+@router.get("/{dataset_id}/versions/{version}/stream")
+def stream_version_analysis(
+    dataset_id: str,
+    version: str,
+    request: Request,
+    target_col: Optional[str] = Query(default=None),
+    mode: str = Query(default="exact"),
+    feature: Optional[List[str]] = Query(default=None),
+    flag: Optional[List[str]] = Query(default=None),
+    offset: int = Query(default=0, ge=0),
+    limit: Optional[int] = Query(default=None, ge=1)
+):
+    """
+    The analysis of a given version as NDJSON, as for the raw dataset.
+    """
+    return _stream_response(
+        request, dataset_id, version, target_col, mode, feature, flag,
+        offset, limit
+    )
+
+
+def _stream_response(
+    request: Request,
+    dataset_id: str,
+    version: str,
+    target_col: str | None,
+    mode: str,
+    feature: list[str] | None,
+    flag: list[str] | None,
+    offset: int,
+    limit: int | None
+):
+    _check_mode(mode)
+
+    version, headers = _validators(
+        dataset_id, version, "ndjson", target_col, mode, feature, flag,
+        offset, limit
+    )
+    if is_not_modified(
+        request.headers, headers["ETag"], headers["Last-Modified"]
+    ):
+        return Response(status_code=304, headers=headers)
+
+    records = select_records(
+        iter_quality_analysis(dataset_id, target_col, version, mode),
+        feature, flag, offset, limit
+    )
+    return StreamingResponse(
+        (dumps_json(record) + b"\n" for record in records),
+        media_type="application/x-ndjson",
+        headers=headers
+    )
+
+
+@router.get("/{dataset_id}/duplicates")
+def duplicate_rows(
+    dataset_id: str,
+    version: Optional[str] = Query(default=None),
+    sample: int = Query(default=DUPLICATE_SAMPLE_ROWS, ge=0, le=1000)
+):
+    """
+    Duplicate row count of a version, with the positions of the first
+    `sample` duplicate rows.
+    """
     try:
-        analysis = compute_quality_score(dataset_id, target_col)
-        return analysis
+        return find_duplicate_rows(dataset_id, version, sample)
     except FileNotFoundError:
         raise HTTPException(
             status_code=404,
             detail="Dataset not found"
         )
 
+
+def _check_mode(mode: str) -> None:
+    if mode not in ANALYSIS_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported analysis mode: {mode}"
+        )
+
+
+def _analyze(
+    dataset_id: str,
+    target_col: str | None,
+    mode: str,
+    version: str | None = None
+) -> dict:
+    try:
+        return compute_quality_score(dataset_id, target_col, version, mode)
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=404,
+            detail="Dataset not found"
+        )
+
+
+def _validators(dataset_id: str, version: str, *parts) -> tuple[str, dict]:
+    """
+    The stored name of a version and the validators of an analysis of it:
+    an entity tag from its content hash and `parts`, and its creation
+    time as Last-Modified.
+    """
+    try:
+        record = get_version_record(dataset_id, version)
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=404,
+            detail="Dataset version not found"
+        )
+
+    etag = make_etag(
+        ANALYSIS_CACHE_FORMAT, dataset_id, record["version"],
+        record["content_hash"], *parts
+    )
+    return record["version"], {
+        "ETag": etag,
+        "Last-Modified": http_date(record["created_at"]),
+        "Cache-Control": "no-cache"
+    }
@@ -1,42 +1,235 @@
 import os
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
+import re
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
 
-DATASET_STORAGE_PATH = "app/storage/datasets"
+from app.services.storage_service import (
+    get_latest_version,
+    get_version_record,
+    resolve_export_format,
+    export_suffix,
+    export_media_type,
+    get_export_path,
+    export_version,
+    stream_export
+)
+from app.utils.helpers import (
+    make_etag,
+    http_date,
+    is_not_modified,
+    range_still_valid
+)
 
 router = APIRouter(prefix="/download", tags=["Dataset Download"])
 
+DOWNLOAD_CHUNK_BYTES = 1024 * 1024
+
+_RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
 
 @router.get("/{dataset_id}")
-def download_latest_dataset(dataset_id: str):
-    """
-    Download the latest processed dataset (CSV only).
+def download_latest_dataset(
+    dataset_id: str,
+    request: Request,
+    format: str = "csv",
+    compression: str | None = None
+):
     """
-    dataset_dir = os.path.join(DATASET_STORAGE_PATH, dataset_id)
+    Download the latest processed dataset.
 
-    if not os.path.exists(dataset_dir):
+    - format: csv, parquet or arrow
+    - compression: none, gzip or zstd for csv (default none); zstd,
+      snappy, gzip or none for parquet (default zstd); none, zstd or lz4
+      for arrow (default none)
+
+    A version is encoded while it is sent the first time and cached, so
+    later downloads are served from the file and honour Range requests.
+    """
+    try:
+        latest_version = get_latest_version(dataset_id)
+    except FileNotFoundError:
         raise HTTPException(
             status_code=404,
             detail="Dataset not found"
         )
 
-    # List all CSV versions
-    versions = sorted(
-        f for f in os.listdir(dataset_dir)
-        if f.startswith("v") and f.endswith(".csv")
-    )
+    return _download(request, dataset_id, latest_version, format, compression)
+
+
+@router.get("/{dataset_id}/versions/{version}")
+def download_dataset_version(
+    dataset_id: str,
+    version: str,
+    request: Request,
+    format: str = "csv",
+    compression: str | None = None
+):
+    """
+    Download a given version; same options as the latest download.
+    """
+    return _download(request, dataset_id, version, format, compression)
+
 
-    if not versions:
+def _download(
+    request: Request,
+    dataset_id: str,
+    version: str,
+    format: str,
+    compression: str | None
+):
+    """
+    Send a version in the requested encoding. Responses carry an entity
+    tag derived from the version's content hash, so clients and caches
+    revalidate with If-None-Match / If-Modified-Since and get a 304 for
+    unchanged content.
+    """
+    try:
+        file_format, compression = resolve_export_format(format, compression)
+        record = get_version_record(dataset_id, version)
+    except FileNotFoundError:
         raise HTTPException(
             status_code=404,
-            detail="No dataset versions available"
+            detail="Dataset version not found"
         )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    version = record["version"]
+    etag = make_etag(record["content_hash"], file_format, compression)
+    last_modified = http_date(record["created_at"])
+    validators = {
+        "ETag": etag,
+        "Last-Modified": last_modified,
+        "Cache-Control": "no-cache"
+    }
+    if is_not_modified(request.headers, etag, last_modified):
+        return Response(status_code=304, headers=validators)
 
-    latest_version = versions[-1]
-    file_path = os.path.join(dataset_dir, latest_version)
+    suffix = export_suffix(file_format, compression)
+    filename = f"{dataset_id}_{version}{suffix}"
+    headers = {
+        **validators,
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "Accept-Ranges": "bytes"
+    }
+    media_type = export_media_type(file_format, compression)
+
+    range_header = request.headers.get("range")
+    if not range_still_valid(request.headers, etag, last_modified):
+        range_header = None
+
+    # An undo may remove the version while this request is handled; its
+    # files are then gone from the catalog and the disk.
+    try:
+        export_path = get_export_path(
+            dataset_id, version, file_format, compression
+        )
+        if not os.path.exists(export_path) and _from_start(range_header):
+            return StreamingResponse(
+                stream_export(dataset_id, version, file_format, compression),
+                media_type=media_type,
+                headers=headers
+            )
 
-    return FileResponse(
-        path=file_path,
-        media_type="text/csv",
-        filename=f"{dataset_id}_{latest_version}"
+        # A range needs the complete artifact; resuming clients wait for it
+        export_path = export_version(
+            dataset_id, version, file_format, compression
+        )
+
+        # The export is opened before responding, so an undo that unlinks
+        # it mid-download does not cut the response short.
+        f = open(export_path, "rb")
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=404,
+            detail="Dataset version was removed"
+        )
+
+    size = os.fstat(f.fileno()).st_size
+    try:
+        byte_range = _parse_range(range_header, size)
+    except HTTPException:
+        f.close()
+        raise
+
+    if byte_range is None:
+        return StreamingResponse(
+            _iter_file(f, 0, size),
+            media_type=media_type,
+            headers={**headers, "Content-Length": str(size)}
+        )
+
+    start, end = byte_range
+    return StreamingResponse(
+        _iter_file(f, start, end - start + 1),
+        status_code=206,
+        media_type=media_type,
+        headers={
+            **headers,
+            "Content-Length": str(end - start + 1),
+            "Content-Range": f"bytes {start}-{end}/{size}"
+        }
     )
+
+
+def _from_start(range_header: str | None) -> bool:
+    """
+    Whether a request asks for the whole file: no range, or one that
+    starts at the first byte and is open-ended (`bytes=0-`).
+    """
+    if range_header is None:
+        return True
+
+    match = _RANGE_PATTERN.match(range_header.strip())
+    if match is None:
+        return True  # ignored, as in _parse_range
+    first, last = match.groups()
+    return not last and (not first or int(first) == 0)
+
+
+def _parse_range(
+    range_header: str | None,
+    size: int
+) -> tuple[int, int] | None:
+    """
+    First and last byte of a single-range `Range` header, or None to send
+    the whole file (no header, several ranges, or one we cannot parse).
+    """
+    if range_header is None:
+        return None
+
+    match = _RANGE_PATTERN.match(range_header.strip())
+    if match is None or match.groups() == ("", ""):
+        return None
+
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        # Suffix range: the last N bytes
+        start = max(size - int(last), 0)
+        end = size - 1
+
+    if start > end or start >= size:
+        raise _range_not_satisfiable(size)
+    return start, end
+
+
+def _range_not_satisfiable(size: int) -> HTTPException:
+    return HTTPException(
+        status_code=416,
+        detail="Requested range not satisfiable",
+        headers={"Content-Range": f"bytes */{size}"}
+    )
+
+
+def _iter_file(f, start: int, length: int):
+    with f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(DOWNLOAD_CHUNK_BYTES, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
@@ -1,8 +1,9 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
-from typing import Dict, Any
+from typing import Dict, Any, List
 
-from app.services.execution_service import execute_step
+from app.services.execution_service import execute_step, execute_pipeline
+from app.api.routes_jobs import submit_background_job
 
 router = APIRouter(prefix="/execute", tags=["Execution Mode"])
 
@@ -12,8 +13,23 @@ class ExecutionRequest(BaseModel):
     params: Dict[str, Any]
 
 
+class PipelineRequest(BaseModel):
+    steps: List[ExecutionRequest]
+    checkpoint: bool = False
+
+
 @router.post("/{dataset_id}")
-def execute_preprocessing_step(dataset_id: str, request: ExecutionRequest):
+def execute_preprocessing_step(
+    dataset_id: str,
+    request: ExecutionRequest,
+    background: bool = Query(default=False)
+):
+    if background:
+        return submit_background_job(
+            "execute", dataset_id, execute_step,
+            dataset_id, request.action, request.params
+        )
+
     try:
         result = execute_step(
             dataset_id=dataset_id,
@@ -36,3 +52,41 @@ def execute_preprocessing_step(dataset_id: str, request: ExecutionRequest):
             status_code=500,
             detail=f"Execution failed: {str(e)}"
         )
+
+
+@router.post("/{dataset_id}/pipeline")
+def execute_preprocessing_pipeline(
+    dataset_id: str,
+    request: PipelineRequest,
+    background: bool = Query(default=False)
+):
+    steps = [step.model_dump() for step in request.steps]
+
+    if background:
+        return submit_background_job(
+            "pipeline", dataset_id, execute_pipeline,
+            dataset_id, steps, request.checkpoint
+        )
+
+    try:
+        result = execute_pipeline(
+            dataset_id=dataset_id,
+            steps=steps,
+            checkpoint=request.checkpoint
+        )
+        return {
+            "status": "success",
+            "execution": result
+        }
+
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Pipeline failed: {str(e)}"
+        )
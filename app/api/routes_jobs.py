@@ -0,0 +1,75 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import JSONResponse
+
+from app.services.job_service import get_job, submit_job, JobLimitError
+from app.services.storage_service import get_dataset_dir
+
+router = APIRouter(prefix="/jobs", tags=["Background Jobs"])
+
+
+def submit_background_job(kind: str, dataset_id: str, func, *args):
+    """
+    Queue `func(*args)` for a dataset and answer 202 with the job id.
+    Shared by the endpoints that accept `background=true`.
+    """
+    try:
+        get_dataset_dir(dataset_id)
+        job = submit_job(kind, dataset_id, func, *args)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except JobLimitError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+    return JSONResponse(
+        status_code=202,
+        content={
+            "status": "accepted",
+            "job_id": job["job_id"],
+            "status_url": f"/jobs/{job['job_id']}",
+            "result_url": f"/jobs/{job['job_id']}/result"
+        }
+    )
+
+
+@router.get("/{job_id}")
+def get_job_status(job_id: str):
+    """
+    Status and progress of a background job.
+    """
+    try:
+        job = get_job(job_id)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    job.pop("result", None)
+    return job
+
+
+@router.get("/{job_id}/result")
+def get_job_result(job_id: str):
+    """
+    Result of a completed job; 202 while it is still queued or running.
+    """
+    try:
+        job = get_job(job_id)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    if job["status"] == "completed":
+        return job["result"]
+
+    if job["status"] == "failed":
+        error = job["error"] or {}
+        raise HTTPException(
+            status_code=error.get("status", 500),
+            detail=error.get("detail", "Job failed")
+        )
+
+    return JSONResponse(
+        status_code=202,
+        content={
+            "status": job["status"],
+            "progress": job["progress"],
+            "message": job["message"]
+        }
+    )
@@ -4,6 +4,7 @@ from fastapi.responses import FileResponse
 from typing import Optional
 
 from app.services.report_service import generate_report
+from app.api.routes_jobs import submit_background_job
 
 REPORT_STORAGE_PATH = "app/storage/reports"
 
@@ -13,11 +14,17 @@ router = APIRouter(prefix="/report", tags=["Reports"])
 @router.post("/{dataset_id}")
 def generate_dataset_report(
     dataset_id: str,
-    target_col: Optional[str] = Query(default=None)
+    target_col: Optional[str] = Query(default=None),
+    background: bool = Query(default=False)
 ):
     """
     Generate (or regenerate) dataset quality report.
     """
+    if background:
+        return submit_background_job(
+            "report", dataset_id, generate_report, dataset_id, target_col
+        )
+
     try:
         result = generate_report(dataset_id, target_col)
         return {
@@ -2,6 +2,7 @@ from fastapi import APIRouter, HTTPException, Query
 from typing import Optional
 
 from app.services.rescoring_service import rescore_dataset
+from app.api.routes_jobs import submit_background_job
 
 router = APIRouter(prefix="/rescore", tags=["Post-Execution Scoring"])
 
@@ -9,11 +10,17 @@ router = APIRouter(prefix="/rescore", tags=["Post-Execution Scoring"])
 @router.get("/{dataset_id}")
 def rescore(
     dataset_id: str,
-    target_col: Optional[str] = Query(default=None)
+    target_col: Optional[str] = Query(default=None),
+    background: bool = Query(default=False)
 ):
     """
     Compare dataset quality before and after preprocessing.
     """
+    if background:
+        return submit_background_job(
+            "rescore", dataset_id, rescore_dataset, dataset_id, target_col
+        )
+
     try:
         return rescore_dataset(dataset_id, target_col)
     except FileNotFoundError as e:
@@ -1,52 +1,85 @@
-import os
-from fastapi import APIRouter, HTTPException
-from app.services.versioning_service import undo_last_execution
+from fastapi import APIRouter, HTTPException, Query
+from app.services.versioning_service import (
+    undo_last_execution,
+    rollback_to_version
+)
+from app.services.job_service import error_status
+from app.services.storage_service import (
+    list_version_records,
+    read_journal,
+    get_journal_entry
+)
 from pydantic import BaseModel
 
-DATASET_STORAGE_PATH = "app/storage/datasets"
-
 router = APIRouter(prefix="/versions", tags=["Dataset Versions"])
 
 
-def extract_version_number(filename: str) -> int:
-    name = filename.replace(".csv", "")
-    if not name.startswith("v"):
-        raise ValueError(f"Invalid version file: {filename}")
-
-    number_part = name[1:].split("_")[0]
-    return int(number_part)
-
-
 @router.get("/{dataset_id}")
 def list_dataset_versions(dataset_id: str):
-    dataset_dir = os.path.join(DATASET_STORAGE_PATH, dataset_id)
-
-    if not os.path.exists(dataset_dir):
-        raise HTTPException(status_code=404, detail="Dataset not found")
-
-    versions = [
-        f for f in os.listdir(dataset_dir)
-        if f.endswith(".csv") and f.startswith("v")
-    ]
-
     try:
-        versions_sorted = sorted(
-            versions,
-            key=lambda x: extract_version_number(x)
-        )
+        records = list_version_records(dataset_id)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Dataset not found")
     except ValueError as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    versions_sorted = [record["version"] for record in records]
     latest = versions_sorted[-1] if versions_sorted else None
 
     return {
         "versions": versions_sorted,
-        "latest": latest
+        "latest": latest,
+        "details": [
+            {
+                "version": record["version"],
+                "parent": record["parent"],
+                "rows": record["n_rows"],
+                "columns": record["n_cols"],
+                "bytes": record["bytes"],
+                "content_hash": record["content_hash"],
+                "created_at": record["created_at"]
+            }
+            for record in records
+        ]
     }
 
+@router.get("/{dataset_id}/history")
+def get_execution_history(
+    dataset_id: str,
+    tail: int | None = Query(default=None, ge=1),
+    version: str | None = Query(default=None)
+):
+    """
+    Execution journal of a dataset: the entry that created `version`, or
+    the last `tail` entries (all entries by default).
+    """
+    try:
+        if version is not None:
+            entry = get_journal_entry(dataset_id, version)
+            if entry is None:
+                raise HTTPException(
+                    status_code=404,
+                    detail="No execution entry for this version"
+                )
+            return {"dataset_id": dataset_id, "history": [entry]}
+
+        return {
+            "dataset_id": dataset_id,
+            "history": read_journal(dataset_id, tail=tail)
+        }
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+
+
 @router.post("/undo/{dataset_id}")
 def undo_execution(dataset_id: str):
-    return undo_last_execution(dataset_id)
+    try:
+        return undo_last_execution(dataset_id)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    except ValueError as e:
+        # 409 for a version still in use, as for background jobs
+        raise HTTPException(status_code=error_status(e), detail=str(e))
 
 
 class RollbackRequest(BaseModel):
@@ -54,6 +87,9 @@ class RollbackRequest(BaseModel):
 @router.post("/rollback/{dataset_id}")
 def rollback_dataset(dataset_id: str, payload: RollbackRequest):
     target_version = payload.version
-    return perform_rollback(dataset_id, target_version)
+    try:
+        return rollback_to_version(dataset_id, target_version)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
 
 
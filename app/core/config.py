@@ -0,0 +1,50 @@
+"""
+Service settings, overridable through environment variables.
+"""
+import os
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() not in ("0", "false", "no", "off", "")
+
+
+LOG_LEVEL = os.getenv("DQE_LOG_LEVEL", "INFO")
+
+# ---------- Instrumentation ----------
+
+# Per-stage timings and memory high-water marks, served on /metrics.
+# Recording a stage costs a few microseconds, so it is on by default.
+METRICS_ENABLED = _env_flag("DQE_METRICS_ENABLED", True)
+
+# Stages running longer than this are logged as warnings
+SLOW_STAGE_SECONDS = float(os.getenv("DQE_SLOW_STAGE_SECONDS", "10"))
+
+# Upper bounds of the histogram buckets for stage durations, in seconds
+STAGE_DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+    60.0, 120.0, 300.0
+)
+
+# Dataset size labels by row count: the first label whose bound is not
+# exceeded, and "xlarge" above all of them
+DATASET_SIZE_LABELS = (
+    (10_000, "small"),
+    (100_000, "medium"),
+    (1_000_000, "large")
+)
+
+# ---------- Reports ----------
+
+# Worker processes rendering report sections in parallel
+REPORT_RENDER_WORKERS = int(
+    os.getenv("DQE_REPORT_RENDER_WORKERS", str(os.cpu_count() or 1))
+)
+
+# Below this many feature sections to render, they are rendered in
+# process; starting the workers would cost more than it saves
+REPORT_PARALLEL_MIN_FEATURES = int(
+    os.getenv("DQE_REPORT_PARALLEL_MIN_FEATURES", "200")
+)
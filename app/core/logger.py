@@ -0,0 +1,354 @@
+"""
+Logging, and the instrumentation behind /metrics: per-stage durations and
+memory high-water marks of the hot paths, labelled by dataset size, kept
+in process and rendered in the Prometheus text format.
+"""
+import os
+import sys
+import time
+import logging
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from app.core.config import (
+    LOG_LEVEL,
+    METRICS_ENABLED,
+    SLOW_STAGE_SECONDS,
+    STAGE_DURATION_BUCKETS,
+    DATASET_SIZE_LABELS
+)
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_configured = False
+
+
+def get_logger(name: str) -> logging.Logger:
+    global _configured
+    if not _configured:
+        root = logging.getLogger("app")
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter(
+            "%(asctime)s %(levelname)s %(name)s: %(message)s"
+        ))
+        root.addHandler(handler)
+        root.setLevel(LOG_LEVEL)
+        root.propagate = False
+        _configured = True
+    return logging.getLogger(name)
+
+
+logger = get_logger(__name__)
+
+
+# ---------- Memory ----------
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+# ru_maxrss is in bytes on macOS and in KiB elsewhere
+_MAXRSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+
+def resident_memory() -> int:
+    """
+    Current resident set size in bytes (0 where /proc is unavailable).
+    """
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def peak_resident_memory() -> int:
+    """
+    Highest resident set size of the process so far, in bytes.
+    """
+    if resource is None:
+        return 0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _MAXRSS_UNIT
+
+
+# ---------- Registry ----------
+
+class _Series:
+    """
+    Duration histogram, failure count and memory high-water mark of one
+    label set.
+    """
+    __slots__ = ("buckets", "total", "count", "failures", "high_water")
+
+    def __init__(self):
+        self.buckets = [0] * (len(STAGE_DURATION_BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.failures = 0
+        self.high_water = 0
+
+    def observe(self, seconds: float, high_water: int, failed: bool):
+        self.buckets[bisect_left(STAGE_DURATION_BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+        self.failures += failed
+        self.high_water = max(self.high_water, high_water)
+
+    def merge(self, state: tuple):
+        buckets, total, count, failures, high_water = state
+        self.buckets = [a + b for a, b in zip(self.buckets, buckets)]
+        self.total += total
+        self.count += count
+        self.failures += failures
+        self.high_water = max(self.high_water, high_water)
+
+    def state(self) -> tuple:
+        return (
+            list(self.buckets), self.total, self.count, self.failures,
+            self.high_water
+        )
+
+
+_lock = threading.Lock()
+_stages: dict[tuple[str, str], _Series] = {}
+_requests: dict[tuple[str, str, str], _Series] = {}
+
+
+def size_label(rows: int | None) -> str:
+    if rows is None:
+        return "unknown"
+    for bound, label in DATASET_SIZE_LABELS:
+        if rows <= bound:
+            return label
+    return "xlarge"
+
+
+def _observe(
+    registry: dict,
+    key: tuple,
+    seconds: float,
+    high_water: int = 0,
+    failed: bool = False
+) -> None:
+    with _lock:
+        series = registry.get(key)
+        if series is None:
+            series = registry[key] = _Series()
+        series.observe(seconds, high_water, failed)
+
+
+# ---------- Stages ----------
+
+class Stage:
+    """
+    Handle of a running stage; set `rows` once the dataset size is known
+    so the stage is labelled with it.
+    """
+    __slots__ = ("name", "rows")
+
+    def __init__(self, name: str, rows: int | None):
+        self.name = name
+        self.rows = rows
+
+
+@contextmanager
+def track_stage(name: str, rows: int | None = None):
+    """
+    Time a stage and record the memory high-water mark of the process
+    while it ran. Stages may nest; each is recorded on its own.
+    """
+    stage = Stage(name, rows)
+    if not METRICS_ENABLED:
+        yield stage
+        return
+
+    rss_before = resident_memory()
+    peak_before = peak_resident_memory()
+    start = time.perf_counter()
+    failed = False
+    try:
+        yield stage
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+
+        # A new process peak was reached inside the stage; otherwise the
+        # stage stayed below it and the larger endpoint is a lower bound.
+        peak_after = peak_resident_memory()
+        if peak_after > peak_before:
+            high_water = peak_after
+        else:
+            high_water = max(rss_before, resident_memory())
+
+        _observe(
+            _stages, (name, size_label(stage.rows)), seconds, high_water,
+            failed
+        )
+        if seconds > SLOW_STAGE_SECONDS:
+            logger.warning(
+                "Slow stage %s: %.2fs on %s rows", name, seconds, stage.rows
+            )
+
+
+def record_stage(name: str, seconds: float, rows: int | None = None) -> None:
+    """
+    Record a duration measured by the caller, e.g. summed over chunks.
+    """
+    if METRICS_ENABLED:
+        _observe(_stages, (name, size_label(rows)), seconds)
+
+
+def record_request(
+    method: str,
+    route: str,
+    status: int,
+    seconds: float
+) -> None:
+    if METRICS_ENABLED:
+        _observe(_requests, (method, route, str(status)), seconds)
+
+
+class RequestMetricsMiddleware:
+    """
+    ASGI middleware timing each request until its last body chunk is
+    sent, so streamed responses are measured in full. Requests are
+    labelled with the route template, keeping the label set bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router records the matched route in the shared scope
+            route = getattr(scope.get("route"), "path", "unmatched")
+            record_request(
+                scope["method"], route, status, time.perf_counter() - start
+            )
+
+
+def drain_metrics() -> dict:
+    """
+    Take and reset the stage metrics of this process, so a worker process
+    can hand them to the API process along with its result.
+    """
+    with _lock:
+        snapshot = {key: series.state() for key, series in _stages.items()}
+        _stages.clear()
+    return snapshot
+
+
+def merge_metrics(snapshot: dict) -> None:
+    with _lock:
+        for key, state in snapshot.items():
+            series = _stages.get(key)
+            if series is None:
+                series = _stages[key] = _Series()
+            series.merge(state)
+
+
+# ---------- Exposition ----------
+
+def _labels(**labels) -> str:
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for name, value in labels.items()
+    )
+    return ",".join(f'{name}="{value}"' for name, value in escaped)
+
+
+def _histogram(lines: list, metric: str, labels: dict, state: tuple):
+    buckets, total, count = state[:3]
+    cumulative = 0
+    for bound, bucket_count in zip(
+        (*STAGE_DURATION_BUCKETS, "+Inf"), buckets
+    ):
+        cumulative += bucket_count
+        lines.append(
+            f"{metric}_bucket{{{_labels(**labels, le=bound)}}} {cumulative}"
+        )
+    lines.append(f"{metric}_sum{{{_labels(**labels)}}} {total}")
+    lines.append(f"{metric}_count{{{_labels(**labels)}}} {count}")
+
+
+def render_metrics() -> str:
+    with _lock:
+        stages = {key: series.state() for key, series in _stages.items()}
+        requests = {
+            key: series.state() for key, series in _requests.items()
+        }
+
+    lines = [
+        "# HELP dqe_stage_duration_seconds Time spent in a pipeline stage.",
+        "# TYPE dqe_stage_duration_seconds histogram"
+    ]
+    for (stage, size), state in sorted(stages.items()):
+        _histogram(
+            lines, "dqe_stage_duration_seconds",
+            {"stage": stage, "size": size}, state
+        )
+
+    lines += [
+        "# HELP dqe_stage_failures_total Stages that raised an error.",
+        "# TYPE dqe_stage_failures_total counter"
+    ]
+    for (stage, size), state in sorted(stages.items()):
+        lines.append(
+            f"dqe_stage_failures_total{{{_labels(stage=stage, size=size)}}}"
+            f" {state[3]}"
+        )
+
+    lines += [
+        "# HELP dqe_stage_memory_high_water_bytes Highest resident memory "
+        "of the process observed while a stage ran.",
+        "# TYPE dqe_stage_memory_high_water_bytes gauge"
+    ]
+    for (stage, size), state in sorted(stages.items()):
+        if state[4]:
+            lines.append(
+                "dqe_stage_memory_high_water_bytes"
+                f"{{{_labels(stage=stage, size=size)}}} {state[4]}"
+            )
+
+    lines += [
+        "# HELP dqe_http_request_duration_seconds Time spent serving a "
+        "request, by route template.",
+        "# TYPE dqe_http_request_duration_seconds histogram"
+    ]
+    for (method, route, status), state in sorted(requests.items()):
+        _histogram(
+            lines, "dqe_http_request_duration_seconds",
+            {"method": method, "route": route, "status": status},
+            state
+        )
+
+    lines += [
+        "# HELP dqe_process_resident_memory_bytes Resident memory of the "
+        "API process.",
+        "# TYPE dqe_process_resident_memory_bytes gauge",
+        f"dqe_process_resident_memory_bytes {resident_memory()}",
+        "# HELP dqe_process_peak_resident_memory_bytes Highest resident "
+        "memory of the API process.",
+        "# TYPE dqe_process_peak_resident_memory_bytes gauge",
+        f"dqe_process_peak_resident_memory_bytes {peak_resident_memory()}"
+    ]
+    return "\n".join(lines) + "\n"
@@ -1,4 +1,6 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.routes_upload import router as upload_router
 from app.api.routes_analysis import router as analysis_router
@@ -8,11 +10,27 @@ from app.api.routes_rollback import router as rollback_router
 from app.api.routes_rescore import router as rescore_router
 from app.api.routes_reports import router as reports_router
 from app.api.routes_download import router as download_router
+from app.api.routes_jobs import router as jobs_router
+from app.services.job_service import shutdown_jobs, reconcile_jobs
+from app.services.report_service import shutdown_report_workers
+from app.core.logger import RequestMetricsMiddleware, render_metrics
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Fail jobs left queued or running by a previous server process
+    reconcile_jobs()
+    yield
+    # Stop the background job and report rendering worker pools
+    shutdown_jobs()
+    shutdown_report_workers()
+
 
 app = FastAPI(
     title="Automated Dataset Quality & Preprocessing Pipeline",
     description="Backend service for dataset quality scoring, risk detection, and preprocessing execution",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 app.include_router(upload_router)
@@ -23,6 +41,7 @@ app.include_router(rollback_router)
 app.include_router(rescore_router)
 app.include_router(reports_router)
 app.include_router(download_router)
+app.include_router(jobs_router)
 
 # CORS configuration (needed for React later)
 app.add_middleware(
@@ -33,6 +52,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request durations by route, served on /metrics with the stage metrics
+app.add_middleware(RequestMetricsMiddleware)
+
 
 @app.get("/")
 def root():
@@ -47,3 +69,15 @@ def health_check():
     return {
         "status": "healthy"
     }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """
+    Stage durations, memory high-water marks and request durations in the
+    Prometheus text format.
+    """
+    return PlainTextResponse(
+        render_metrics(),
+        media_type="text/plain; version=0.0.4"
+    )
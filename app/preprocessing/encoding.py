@@ -0,0 +1,17 @@
+import numpy as np
+import pandas as pd
+
+
+def label_encode(series: pd.Series) -> np.ndarray:
+    """
+    Integer codes of the sorted distinct values (as LabelEncoder assigns
+    them). Missing values stay missing, which makes the codes float.
+    """
+    codes, _ = pd.factorize(series, sort=True, use_na_sentinel=True)
+    missing = codes < 0
+    if not missing.any():
+        return codes.astype(np.int64, copy=False)
+
+    encoded = codes.astype(np.float64)
+    encoded[missing] = np.nan
+    return encoded
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+
+def fill_missing(
+    values: np.ndarray,
+    fill_value,
+    missing: np.ndarray | None = None
+) -> np.ndarray:
+    """
+    Replace NaN in a float array in place; `missing` is the NaN mask when
+    the caller already has it.
+    """
+    if missing is None:
+        missing = np.isnan(values)
+    np.copyto(values, fill_value, where=missing)
+    return values
+
+
+def median_impute(values: np.ndarray) -> np.ndarray:
+    missing = np.isnan(values)
+    if missing.any() and not missing.all():
+        fill_missing(values, np.median(values[~missing]), missing)
+    return values
+
+
+def mean_impute(values: np.ndarray) -> np.ndarray:
+    missing = np.isnan(values)
+    present = ~missing
+    count = present.sum()
+    if 0 < count < len(values):
+        mean = np.add.reduce(values, where=present) / count
+        fill_missing(values, mean, missing)
+    return values
+
+
+def mode_impute(series: pd.Series) -> pd.Series:
+    """
+    Fill missing values with the most frequent value (the smallest one on
+    ties, like Series.mode()[0]). Works for any dtype.
+    """
+    if not series.hasnans:
+        return series
+
+    modes = series.mode(dropna=True)
+    if modes.empty:
+        raise ValueError(
+            f"Feature '{series.name}' has no values to impute from"
+        )
+    return series.fillna(modes.iloc[0])
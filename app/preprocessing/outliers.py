@@ -0,0 +1,28 @@
+import numpy as np
+
+# Tukey's fences: values beyond IQR_FACTOR * IQR outside the quartiles
+IQR_FACTOR = 1.5
+
+
+def iqr_bounds(values: np.ndarray, factor: float = IQR_FACTOR) -> tuple:
+    """
+    Lower and upper outlier fences of a float array, ignoring NaN.
+    """
+    present = values[~np.isnan(values)]
+    if len(present) == 0:
+        return np.nan, np.nan
+
+    q1, q3 = np.percentile(present, [25, 75])
+    spread = factor * (q3 - q1)
+    return q1 - spread, q3 + spread
+
+
+def clip_outliers(values: np.ndarray, factor: float = IQR_FACTOR) -> np.ndarray:
+    """
+    Clip values outside the IQR fences to the fences, in place. NaN is
+    left untouched.
+    """
+    low, high = iqr_bounds(values, factor)
+    if not np.isnan(low):
+        np.clip(values, low, high, out=values)
+    return values
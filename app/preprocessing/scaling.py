@@ -0,0 +1,37 @@
+import numpy as np
+
+
+def standard_scale(values: np.ndarray) -> np.ndarray:
+    """
+    Center a float array in place and divide it by its sample standard
+    deviation, ignoring NaN. A constant column becomes NaN, as with the
+    equivalent pandas expression.
+    """
+    missing = np.isnan(values)
+    count = len(values) - missing.sum()
+    if count == 0:
+        return values
+
+    values -= np.nansum(values) / count
+
+    if missing.any():
+        squares = np.square(values)
+        squares[missing] = 0.0
+        sum_squares = squares.sum()
+    else:
+        sum_squares = np.dot(values, values)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        values /= np.sqrt(sum_squares / (count - 1)) if count > 1 else np.nan
+    return values
+
+
+def log_transform(values: np.ndarray) -> np.ndarray:
+    """
+    Natural log of positive values in place; zero and negative values
+    become 0 and missing values stay missing.
+    """
+    positive = values > 0
+    np.log(values, out=values, where=positive)
+    np.copyto(values, 0.0, where=~positive & ~np.isnan(values))
+    return values
@@ -0,0 +1,231 @@
+import os
+import json
+import time
+import sqlite3
+from contextlib import contextmanager
+
+from app.utils.helpers import json_default
+
+CACHE_STORAGE_PATH = "app/storage/cache"
+ANALYSIS_CACHE_DB = os.path.join(CACHE_STORAGE_PATH, "analysis_cache.db")
+
+# Upper bound for the serialized analyses kept on disk; least recently
+# used entries are evicted once it is exceeded.
+ANALYSIS_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Bump whenever the analysis output changes, so stale entries are ignored
+ANALYSIS_CACHE_FORMAT = 3
+
+# Upper bound for the rendered report sections kept on disk, evicted the
+# same way
+REPORT_SECTION_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Rows per query when looking up many report sections at once
+_SECTION_LOOKUP_BATCH = 500
+
+
+def _connect() -> sqlite3.Connection:
+    os.makedirs(CACHE_STORAGE_PATH, exist_ok=True)
+    conn = sqlite3.connect(ANALYSIS_CACHE_DB, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS analysis_cache (
+            dataset_id TEXT NOT NULL,
+            version TEXT NOT NULL,
+            target_col TEXT NOT NULL,
+            content_hash TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            last_access REAL NOT NULL,
+            PRIMARY KEY (dataset_id, version, target_col, content_hash)
+        )
+        """
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_analysis_cache_access "
+        "ON analysis_cache (last_access)"
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS report_sections (
+            section_key TEXT PRIMARY KEY,
+            payload TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            last_access REAL NOT NULL
+        )
+        """
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_report_sections_access "
+        "ON report_sections (last_access)"
+    )
+    return conn
+
+
+@contextmanager
+def _open_cache():
+    conn = _connect()
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def _cache_key(
+    dataset_id: str,
+    version: str,
+    target_col: str | None,
+    content_hash: str,
+    mode: str = "exact"
+) -> tuple:
+    # Exact analyses keep the key they had before modes existed
+    key_hash = f"{content_hash}:{ANALYSIS_CACHE_FORMAT}"
+    if mode != "exact":
+        key_hash = f"{key_hash}:{mode}"
+    return (dataset_id, version, target_col or "", key_hash)
+
+
+def get_cached_analysis(
+    dataset_id: str,
+    version: str,
+    target_col: str | None,
+    content_hash: str,
+    mode: str = "exact"
+) -> dict | None:
+    key = _cache_key(dataset_id, version, target_col, content_hash, mode)
+
+    with _open_cache() as conn:
+        row = conn.execute(
+            "SELECT payload FROM analysis_cache "
+            "WHERE dataset_id = ? AND version = ? "
+            "AND target_col = ? AND content_hash = ?",
+            key
+        ).fetchone()
+        if row is None:
+            return None
+
+        conn.execute(
+            "UPDATE analysis_cache SET last_access = ? "
+            "WHERE dataset_id = ? AND version = ? "
+            "AND target_col = ? AND content_hash = ?",
+            (time.time(), *key)
+        )
+
+    return json.loads(row[0])
+
+
+def store_analysis(
+    dataset_id: str,
+    version: str,
+    target_col: str | None,
+    content_hash: str,
+    analysis: dict,
+    mode: str = "exact"
+) -> None:
+    key = _cache_key(dataset_id, version, target_col, content_hash, mode)
+    payload = json.dumps(analysis, default=json_default)
+
+    if len(payload) > ANALYSIS_CACHE_MAX_BYTES:
+        return
+
+    with _open_cache() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO analysis_cache "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (*key, payload, len(payload), time.time())
+        )
+        _evict(conn, "analysis_cache", ANALYSIS_CACHE_MAX_BYTES)
+
+
+def _evict(conn: sqlite3.Connection, table: str, max_bytes: int) -> None:
+    """
+    Drop least recently used entries until a table fits its size limit.
+    """
+    total = conn.execute(
+        f"SELECT COALESCE(SUM(size), 0) FROM {table}"
+    ).fetchone()[0]
+    if total <= max_bytes:
+        return
+
+    expired = []
+    for rowid, size in conn.execute(
+        f"SELECT rowid, size FROM {table} ORDER BY last_access"
+    ):
+        if total <= max_bytes:
+            break
+        expired.append((rowid,))
+        total -= size
+
+    conn.executemany(f"DELETE FROM {table} WHERE rowid = ?", expired)
+
+
+def invalidate_analysis_cache(
+    dataset_id: str,
+    version: str | None = None
+) -> None:
+    """
+    Remove cached analyses of one version, or of the whole dataset.
+    """
+    with _open_cache() as conn:
+        if version is None:
+            conn.execute(
+                "DELETE FROM analysis_cache WHERE dataset_id = ?",
+                (dataset_id,)
+            )
+        else:
+            conn.execute(
+                "DELETE FROM analysis_cache "
+                "WHERE dataset_id = ? AND version = ?",
+                (dataset_id, version)
+            )
+
+
+# ---------- Report sections ----------
+#
+# Rendered report sections are keyed by a hash of everything they are
+# rendered from, so an entry stays valid for as long as it is reachable
+# and needs no invalidation.
+
+def get_cached_sections(keys: list[str]) -> dict:
+    """
+    Rendered sections found in the cache, by key.
+    """
+    found = {}
+    with _open_cache() as conn:
+        for start in range(0, len(keys), _SECTION_LOOKUP_BATCH):
+            batch = keys[start:start + _SECTION_LOOKUP_BATCH]
+            placeholders = ", ".join("?" * len(batch))
+            rows = conn.execute(
+                "SELECT section_key, payload FROM report_sections "
+                f"WHERE section_key IN ({placeholders})",
+                batch
+            ).fetchall()
+            found.update((key, json.loads(payload)) for key, payload in rows)
+
+        now = time.time()
+        conn.executemany(
+            "UPDATE report_sections SET last_access = ? "
+            "WHERE section_key = ?",
+            [(now, key) for key in found]
+        )
+    return found
+
+
+def store_sections(sections: dict) -> None:
+    if not sections:
+        return
+
+    now = time.time()
+    rows = []
+    for key, section in sections.items():
+        payload = json.dumps(section, default=json_default)
+        rows.append((key, payload, len(payload), now))
+
+    with _open_cache() as conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO report_sections VALUES (?, ?, ?, ?)",
+            rows
+        )
+        _evict(conn, "report_sections", REPORT_SECTION_CACHE_MAX_BYTES)
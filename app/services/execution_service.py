@@ -1,101 +1,491 @@
 import os
-import json
+import numpy as np
 import pandas as pd
-import numpy as np 
+import pyarrow as pa
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 
-DATASET_STORAGE_PATH = "app/storage/datasets"
+from app.preprocessing.missing_values import (
+    median_impute,
+    mean_impute,
+    mode_impute
+)
+from app.preprocessing.scaling import standard_scale, log_transform
+from app.preprocessing.outliers import clip_outliers
+from app.preprocessing.encoding import label_encode
+from app.services.storage_service import (
+    get_latest_version,
+    get_version_record,
+    get_version_columns,
+    get_version_schema,
+    extract_version_number,
+    read_version,
+    write_delta,
+    dataset_lock
+)
+from app.services.quality_scoring_service import (
+    compute_quality_score,
+    store_step_profile
+)
+from app.services.job_service import report_progress
+from app.core.logger import track_stage
 
+ACTION_DESCRIPTIONS = {
+    "drop_feature": "Dropped feature: {}",
+    "median_impute": "Median imputation on {}",
+    "mean_impute": "Mean imputation on {}",
+    "mode_impute": "Mode imputation on {}",
+    "log_transform": "Log transform applied on {}",
+    "standard_scale": "Standard scaling applied on {}",
+    "clip_outliers": "Outliers clipped on {}",
+    "label_encode": "Label encoding applied on {}"
+}
+SUPPORTED_ACTIONS = list(ACTION_DESCRIPTIONS)
 
-def extract_version_number(filename: str) -> int:
-    name = filename.replace(".csv", "")
-    number_part = name[1:].split("_")[0]
-    return int(number_part)
+# Actions that only apply to numeric columns; selectors pick numeric
+# columns only for these.
+NUMERIC_ACTIONS = [
+    "median_impute", "mean_impute", "log_transform", "standard_scale",
+    "clip_outliers"
+]
+
+# Selectors that pick columns by type; any other selector is matched
+# against the quality flags and risk labels of the analysis.
+TYPE_SELECTORS = ["all", "numeric", "categorical"]
+
+# Threads transforming column blocks of a multi-column action; the NumPy
+# kernels release the GIL, so blocks run in parallel.
+EXECUTION_MAX_WORKERS = min(8, os.cpu_count() or 1)
 
 
 def execute_step(dataset_id: str, action: str, params: dict) -> dict:
-    dataset_dir = os.path.join(DATASET_STORAGE_PATH, dataset_id)
-    if not os.path.exists(dataset_dir):
-        raise FileNotFoundError("Dataset not found")
+    """
+    Apply one action to params["feature"], the list params["features"]
+    or the columns matched by params["selector"], as one new version.
+    """
+    with dataset_lock(dataset_id), track_stage("execution") as stage:
+        result = _execute_step(dataset_id, action, params)
+        stage.rows = _version_rows(dataset_id, result["new_version"])
+    return result
+
+
+def _execute_step(dataset_id: str, action: str, params: dict) -> dict:
+    latest_version = get_latest_version(dataset_id)
+
+    columns = list(get_version_columns(dataset_id, latest_version))
+    features = _check_step(
+        dataset_id, latest_version, action, params, columns
+    )
+
+    # Only the touched columns are read, and only those columns are
+    # stored in the new version.
+    if action == "drop_feature":
+        df = pd.DataFrame()
+    else:
+        df = read_version(dataset_id, latest_version, columns=features)
+    before = {feature: df[feature] for feature in df.columns}
+    description = _apply_step(df, action, features)
+
+    # The version and its log entry are committed together
+    next_version_num = extract_version_number(latest_version) + 1
+    new_version = _write_step(
+        dataset_id, next_version_num, latest_version, df, action, features,
+        {"action": action, **_feature_fields(features),
+         "description": description}
+    )
+    _store_profile(dataset_id, latest_version, new_version, before, [action])
 
-    versions = [
-        f for f in os.listdir(dataset_dir)
-        if f.endswith(".csv") and f.startswith("v")
+    return {
+        "new_version": new_version,
+        **_feature_fields(features),
+        "description": description
+    }
+
+
+def execute_pipeline(
+    dataset_id: str,
+    steps: list[dict],
+    checkpoint: bool = False
+) -> dict:
+    """
+    Run an ordered list of {"action", "params"} steps on one in-memory
+    frame holding only the touched columns. Writes a single version for
+    the whole pipeline, or one version per step with `checkpoint`.
+    """
+    if not steps:
+        raise ValueError("Pipeline has no steps")
+
+    with dataset_lock(dataset_id), track_stage("execution") as stage:
+        result = _execute_pipeline(dataset_id, steps, checkpoint)
+        stage.rows = _version_rows(dataset_id, result["new_version"])
+    return result
+
+
+def _execute_pipeline(
+    dataset_id: str,
+    steps: list[dict],
+    checkpoint: bool
+) -> dict:
+    latest_version = get_latest_version(dataset_id)
+
+    # ---------- Validate every step before touching data ----------
+    # Selectors are resolved against the version the pipeline starts from
+    columns = list(get_version_columns(dataset_id, latest_version))
+    step_features = []
+    for i, step in enumerate(steps, start=1):
+        try:
+            step_features.append(_check_step(
+                dataset_id, latest_version,
+                step.get("action"), step.get("params") or {}, columns
+            ))
+        except ValueError as e:
+            raise ValueError(f"Step {i}: {e}")
+
+    # Columns whose first step drops them never need to be read
+    first_actions = {}
+    for step, features in zip(steps, step_features):
+        for feature in features:
+            first_actions.setdefault(feature, step["action"])
+    to_read = [
+        feature for feature, action in first_actions.items()
+        if action != "drop_feature"
     ]
-    if not versions:
-        raise FileNotFoundError("No dataset versions found")
 
-    latest_version = sorted(
-        versions, key=extract_version_number
-    )[-1]
+    df = (
+        read_version(dataset_id, latest_version, columns=to_read)
+        if to_read else pd.DataFrame()
+    )
+    before = {feature: df[feature] for feature in df.columns}
 
-    df = pd.read_csv(os.path.join(dataset_dir, latest_version))
+    # ---------- Run ----------
+    version_num = extract_version_number(latest_version)
+    parent = latest_version
+    dropped = []
+    results = []
+    versions = []
 
-    feature = params.get("feature")
-    if not feature:
-        raise ValueError("Missing required parameter: feature")
+    for i, (step, features) in enumerate(zip(steps, step_features)):
+        action = step["action"]
+        report_progress(
+            i / len(steps), f"Step {i + 1}: {action} on {_label(features)}"
+        )
 
-    description = ""
+        step_before = {f: df[f] for f in features if f in df.columns}
+        description = _apply_step(df, action, features)
+        result = {
+            "action": action,
+            **_feature_fields(features),
+            "description": description
+        }
+
+        if action == "drop_feature":
+            dropped.extend(features)
+
+        if checkpoint:
+            version_num += 1
+            step_parent = parent
+            parent = _write_step(
+                dataset_id, version_num, parent, df, action, features, result
+            )
+            _store_profile(
+                dataset_id, step_parent, parent, step_before, [action]
+            )
+            versions.append(parent)
+            result = {"version": parent, **result}
+
+        results.append(result)
+
+    if not checkpoint:
+        parent = f"v{version_num + 1}_pipeline_{len(steps)}_steps"
+        write_delta(
+            dataset_id, parent, latest_version,
+            changed=df if len(df.columns) else None,
+            dropped=dropped,
+            journal=[{
+                "version": parent,
+                "action": "pipeline",
+                "steps": results,
+                "description": "; ".join(
+                    r["description"] for r in results
+                ),
+                "timestamp": datetime.utcnow().isoformat()
+            }]
+        )
+        _store_profile(
+            dataset_id, latest_version, parent,
+            {f: before[f] for f in df.columns if f in before},
+            [step["action"] for step in steps]
+        )
+        versions.append(parent)
+
+    return {
+        "initial_version": latest_version,
+        "new_version": parent,
+        "versions": versions,
+        "steps": results
+    }
+
+
+# ---------- Steps ----------
+
+def _check_step(
+    dataset_id: str,
+    version: str,
+    action: str,
+    params: dict,
+    columns: list
+) -> list[str]:
+    """
+    Validate one step against the columns available before it and return
+    the features it applies to. Dropped features are removed from
+    `columns`.
+    """
+    features = _resolve_features(
+        dataset_id, version, params, columns,
+        numeric_only=action in NUMERIC_ACTIONS
+    )
+
+    if action not in SUPPORTED_ACTIONS:
+        raise ValueError(f"Unsupported action: {action}")
 
-    # ---------- SUPPORTED ACTIONS ----------
     if action == "drop_feature":
-        if feature not in df.columns:
+        columns[:] = [c for c in columns if c not in features]
+    return features
+
+
+def _resolve_features(
+    dataset_id: str,
+    version: str,
+    params: dict,
+    columns: list,
+    numeric_only: bool = False
+) -> list[str]:
+    if params.get("feature"):
+        features = [params["feature"]]
+    elif params.get("features"):
+        if not isinstance(params["features"], list):
+            raise ValueError("Parameter 'features' must be a list")
+        features = list(dict.fromkeys(params["features"]))
+    elif params.get("selector"):
+        features = _select_features(
+            dataset_id, version, params["selector"], columns,
+            params.get("target_col"), numeric_only
+        )
+    else:
+        raise ValueError("Missing required parameter: feature")
+
+    for feature in features:
+        if feature not in columns:
             raise ValueError(f"Feature '{feature}' not found")
-        df.drop(columns=[feature], inplace=True)
-        description = f"Dropped feature: {feature}"
+    return features
 
-    elif action == "median_impute":
-        df[feature] = df[feature].fillna(df[feature].median())
-        description = f"Median imputation on {feature}"
+
+def _select_features(
+    dataset_id: str,
+    version: str,
+    selector: str,
+    columns: list,
+    target_col: str | None = None,
+    numeric_only: bool = False
+) -> list[str]:
+    """
+    Columns matched by a selector: a column type ("all", "numeric",
+    "categorical") or a flag of the analysis, e.g. "High Missingness".
+    The target column is never selected, and with `numeric_only` only
+    numeric columns are.
+    """
+    schema = get_version_schema(dataset_id, version)
+    numeric = {
+        field.name for field in schema
+        if pa.types.is_integer(field.type)
+        or pa.types.is_floating(field.type)
+    }
+
+    if selector in TYPE_SELECTORS:
+        matched = [
+            col for col in columns
+            if selector == "all"
+            or (selector == "numeric") == (col in numeric)
+        ]
+    else:
+        # Flags come from the (cached) analysis of the version
+        analysis = compute_quality_score(
+            dataset_id, target_col=target_col, version=version
+        )
+        flagged = {
+            info["feature"] for info in analysis["feature_diagnostics"]
+            if selector in info["quality_flags"]
+            or selector in info["risk_analysis"]["risk_label"]
+        }
+        matched = [col for col in columns if col in flagged]
+
+    matched = [
+        col for col in matched
+        if col != target_col and (col in numeric or not numeric_only)
+    ]
+    if not matched:
+        raise ValueError(f"No features match selector '{selector}'")
+    return matched
+
+
+def _apply_step(df: pd.DataFrame, action: str, features: list[str]) -> str:
+    """
+    Apply one action to the given columns of `df` in place and return its
+    description.
+    """
+    description = ACTION_DESCRIPTIONS[action].format(_label(features))
+
+    if action == "drop_feature":
+        for feature in features:
+            if feature in df.columns:
+                del df[feature]
+        return description
+
+    series = [df[feature] for feature in features]
+    for feature, values in zip(features, _map_columns(action, series)):
+        df[feature] = values
+    return description
+
+
+def _map_columns(action: str, series: list) -> list:
+    """
+    Transform columns on a thread pool, one block of columns per thread.
+    """
+    if len(series) == 1:
+        return [_transform_column(series[0], action)]
+
+    n_blocks = min(EXECUTION_MAX_WORKERS, len(series))
+    blocks = [series[i::n_blocks] for i in range(n_blocks)]
+
+    with ThreadPoolExecutor(max_workers=n_blocks) as executor:
+        block_results = list(executor.map(
+            lambda block: [_transform_column(s, action) for s in block],
+            blocks
+        ))
+
+    # Undo the round-robin split
+    results = [None] * len(series)
+    for i, block_result in enumerate(block_results):
+        results[i::n_blocks] = block_result
+    return results
+
+
+def _transform_column(series: pd.Series, action: str):
+    """
+    New values of one column for a (non-drop) action.
+    """
+
+    # ---------- SUPPORTED ACTIONS ----------
+    if action == "median_impute":
+        if not series.hasnans:
+            return series
+        return median_impute(_float_values(series))
 
     elif action == "mean_impute":
-        df[feature] = df[feature].fillna(df[feature].mean())
-        description = f"Mean imputation on {feature}"
+        if not series.hasnans:
+            return series
+        return mean_impute(_float_values(series))
 
     elif action == "mode_impute":
-        df[feature] = df[feature].fillna(df[feature].mode()[0])
-        description = f"Mode imputation on {feature}"
+        return mode_impute(series)
 
     elif action == "log_transform":
-        df[feature] = df[feature].apply(
-            lambda x: np.log(x) if x > 0 else 0
-        )
-        description = f"Log transform applied on {feature}"
-
+        return log_transform(_float_values(series))
 
     elif action == "standard_scale":
-        mean = df[feature].mean()
-        std = df[feature].std()
-        df[feature] = (df[feature] - mean) / std
-        description = f"Standard scaling applied on {feature}"
+        return standard_scale(_float_values(series))
 
-    else:
-        raise ValueError(f"Unsupported action: {action}")
+    elif action == "clip_outliers":
+        return clip_outliers(_float_values(series))
+
+    elif action == "label_encode":
+        return label_encode(series)
+
+    raise ValueError(f"Unsupported action: {action}")
+
+
+def _float_values(series: pd.Series) -> np.ndarray:
+    """
+    Writable float64 copy of a numeric column: the only full copy a
+    numeric action makes, since the kernels work in place.
+    """
+    if series.dtype == bool or not pd.api.types.is_numeric_dtype(series):
+        raise ValueError(f"Feature '{series.name}' is not numeric")
+
+    if isinstance(series.dtype, np.dtype):
+        return np.array(series.to_numpy(), dtype=np.float64, copy=True)
+    return series.to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def _label(features: list[str]) -> str:
+    if len(features) <= 3:
+        return ", ".join(features)
+    return f"{len(features)} features"
+
+
+def _feature_fields(features: list[str]) -> dict:
+    if len(features) == 1:
+        return {"feature": features[0]}
+    return {"features": features}
+
+
+def _store_profile(
+    dataset_id: str,
+    parent: str,
+    version: str,
+    before: dict,
+    actions: list[str]
+) -> None:
+    """
+    Derive the stored profile of a new version from its parent's.
+    """
+    record = get_version_record(dataset_id, parent)
+    dropped = [
+        col for col in record["columns"]
+        if col not in get_version_columns(dataset_id, version)
+    ]
+    with track_stage("step_profiling", record["n_rows"]):
+        store_step_profile(
+            dataset_id, parent, version, before, dropped,
+            rescaled_only=set(actions) == {"standard_scale"}
+        )
 
-    next_version_num = extract_version_number(latest_version) + 1
-    safe_feature = feature.replace(" ", "_")
-    new_version = f"v{next_version_num}_{action}_{safe_feature}.csv"
 
+def _version_rows(dataset_id: str, version: str) -> int:
+    return get_version_record(dataset_id, version)["n_rows"]
 
-    df.to_csv(os.path.join(dataset_dir, new_version), index=False)
 
-    # ---------- LOG ----------
-    log_path = os.path.join(dataset_dir, "execution_log.json")
-    logs = []
-    if os.path.exists(log_path):
-        logs = json.load(open(log_path))
+def _write_step(
+    dataset_id: str,
+    version_num: int,
+    parent: str,
+    df: pd.DataFrame,
+    action: str,
+    features: list[str],
+    log_entry: dict
+) -> str:
+    """
+    Store the result of one step as a delta holding only its columns,
+    committed together with its log entry.
+    """
+    if len(features) == 1:
+        suffix = features[0].replace(" ", "_")
+    else:
+        suffix = f"{len(features)}_features"
+    new_version = f"v{version_num}_{action}_{suffix}"
 
-    logs.append({
+    journal = [{
         "version": new_version,
-        "action": action,
-        "feature": feature,
-        "description": description,
+        **log_entry,
         "timestamp": datetime.utcnow().isoformat()
-    })
-
-    json.dump(logs, open(log_path, "w"), indent=2)
+    }]
+    if action == "drop_feature":
+        return write_delta(
+            dataset_id, new_version, parent,
+            dropped=features, journal=journal
+        )
+    return write_delta(
+        dataset_id, new_version, parent,
+        changed=df[features], journal=journal
+    )
 
-    return {
-        "new_version": new_version,
-        "description": description
-    }
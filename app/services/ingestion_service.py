@@ -1,15 +1,57 @@
 import os
+import time
 import uuid
+import shutil
+import itertools
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 from fastapi import UploadFile, HTTPException
 
-DATASET_STORAGE_PATH = "app/storage/datasets"
+from app.services.storage_service import (
+    DATASET_STORAGE_PATH,
+    dataframe_to_table,
+    table_to_dataframe,
+    write_version_stream,
+    save_profile
+)
+from app.utils.statistics import ProfileAccumulator
+from app.core.logger import track_stage, record_stage
+
+# Rows parsed per chunk; peak memory is roughly one chunk, independent
+# of the size of the upload.
+INGEST_CHUNK_ROWS = 100_000
+
+# Text columns with at most this many distinct values per non-missing
+# value in the first chunk are stored dictionary-encoded
+CATEGORY_MAX_RATIO = 0.5
+
+# Integer types tried, smallest first, when downcasting
+COMPACT_INT_TYPES = [np.int8, np.int16, np.int32]
+
+
+class _SchemaConflict(Exception):
+    """
+    A later chunk parsed a column with a dtype the earlier chunks cannot
+    be converted to, or with values outside its compact dtype; the upload
+    is re-read with `dtypes` forced and the `widened` columns compacted
+    to no less than the given dtypes.
+    """
+
+    def __init__(self, dtypes: dict, widened: dict | None = None):
+        widened = widened or {}
+        super().__init__(
+            f"Conflicting dtypes for {list(dtypes) + list(widened)}"
+        )
+        self.dtypes = dtypes
+        self.widened = widened
 
 
 def ingest_csv(file: UploadFile) -> dict:
     """
     Validates and ingests a CSV file.
-    Saves raw dataset as version v0.
+    Streams the upload in chunks into version v0 of the columnar version
+    store, profiling each chunk on the way so v0 is analysed for free.
     """
 
     # 1. Enforce CSV-only upload
@@ -25,41 +67,248 @@ def ingest_csv(file: UploadFile) -> dict:
     dataset_dir = os.path.join(DATASET_STORAGE_PATH, dataset_id)
     os.makedirs(dataset_dir, exist_ok=True)
 
-    raw_dataset_path = os.path.join(dataset_dir, "v0_raw.csv")
-
-    # 3. Read CSV
+    # 3. Stream CSV into v0
     try:
-        df = pd.read_csv(file.file)
+        with track_stage("ingestion") as stage:
+            profile = _stream_into_version(file.file, dataset_id)
+            stage.rows = profile.n_rows
+    except HTTPException:
+        shutil.rmtree(dataset_dir, ignore_errors=True)
+        raise
     except Exception as e:
+        shutil.rmtree(dataset_dir, ignore_errors=True)
         raise HTTPException(
             status_code=400,
             detail=f"Failed to read CSV file: {str(e)}"
         )
 
-    # 4. Basic validation
-    if df.empty:
-        raise HTTPException(
-            status_code=400,
-            detail="Uploaded CSV is empty."
-        )
-
-    if df.shape[1] == 0:
-        raise HTTPException(
-            status_code=400,
-            detail="CSV must contain at least one column."
-        )
-
-    # 5. Save raw dataset
-    df.to_csv(raw_dataset_path, index=False)
-
-    # 6. Initial metadata
+    # 4. Initial metadata
     metadata = {
         "dataset_id": dataset_id,
         "filename": file.filename,
-        "rows": df.shape[0],
-        "columns": df.shape[1],
-        "column_names": df.columns.tolist(),
+        "rows": profile.n_rows,
+        "columns": profile.n_cols,
+        "column_names": profile.columns.index.tolist(),
         "current_version": "v0_raw"
     }
 
     return metadata
+
+
+def _stream_into_version(source, dataset_id: str):
+    """
+    Write the upload as v0 and return its profile. Re-reads the source
+    only when a column changes dtype between chunks.
+    """
+    forced_dtypes = {}
+    min_dtypes = {}
+
+    while True:
+        source.seek(0)
+        try:
+            return _ingest_pass(
+                source, dataset_id, forced_dtypes, min_dtypes
+            )
+        except _SchemaConflict as conflict:
+            forced_dtypes.update(conflict.dtypes)
+            min_dtypes.update(conflict.widened)
+
+
+def _ingest_pass(
+    source,
+    dataset_id: str,
+    forced_dtypes: dict,
+    min_dtypes: dict
+):
+    # The reader must be closed explicitly: it detaches from the upload
+    # handle, which would otherwise be closed with it before a re-read.
+    with pd.read_csv(
+        source,
+        chunksize=INGEST_CHUNK_ROWS,
+        dtype=forced_dtypes or None
+    ) as reader:
+        first_chunk = next(reader)
+
+        # Basic validation, from the first chunk only
+        if first_chunk.empty:
+            raise HTTPException(
+                status_code=400,
+                detail="Uploaded CSV is empty."
+            )
+
+        if first_chunk.shape[1] == 0:
+            raise HTTPException(
+                status_code=400,
+                detail="CSV must contain at least one column."
+            )
+
+        dtypes = first_chunk.dtypes
+        compact = _infer_compact_dtypes(first_chunk, min_dtypes)
+        schema = _chunk_schema(first_chunk, compact)
+        categories = {
+            col: pd.Index([], dtype=object)
+            for col, dtype in compact.items() if dtype == "category"
+        }
+        accumulator = ProfileAccumulator()
+        profiling_seconds = 0.0
+
+        with write_version_stream(dataset_id, "v0_raw", schema) as writer:
+            for chunk in itertools.chain([first_chunk], reader):
+                chunk = _conform_chunk(chunk, dtypes)
+                chunk = _compact_chunk(chunk, compact, categories)
+                table = pa.Table.from_pandas(
+                    chunk, schema=schema, preserve_index=False
+                )
+                writer.write_table(table)
+
+                # Profiled as later reads will see it
+                start = time.perf_counter()
+                accumulator.update(table_to_dataframe(table))
+                profiling_seconds += time.perf_counter() - start
+
+    profile = accumulator.finalize()
+    record_stage("profiling", profiling_seconds, profile.n_rows)
+    save_profile(dataset_id, "v0_raw", profile)
+    return profile
+
+
+# ---------- Schema inference ----------
+#
+# The stored schema of v0 is inferred from the first chunk: integers are
+# downcast to the smallest type holding their range, floats to float32
+# where that is lossless, and low-cardinality text is dictionary-encoded.
+# Every later read maps it to pandas as is (see table_to_dataframe). A
+# later chunk that does not fit a downcast type raises _SchemaConflict,
+# and the upload is re-read with that column widened to fit it.
+
+def _infer_compact_dtypes(chunk: pd.DataFrame, min_dtypes: dict) -> dict:
+    """
+    Compact dtype per column that has one: a NumPy dtype or "category".
+    """
+    compact = {}
+
+    for col in chunk.columns:
+        series = chunk[col]
+        kind = series.dtype.kind
+
+        if kind in "iu" and len(series):
+            dtype = _smallest_int(series)
+            if col in min_dtypes:
+                dtype = np.promote_types(dtype, min_dtypes[col])
+            if dtype.itemsize < series.dtype.itemsize:
+                compact[col] = dtype
+
+        elif kind == "f" and col not in min_dtypes:
+            if series.dtype != np.float32 and _fits(series, np.float32):
+                compact[col] = np.dtype(np.float32)
+
+        elif (
+            kind == "O"
+            and pd.api.types.infer_dtype(series, skipna=True) == "string"
+        ):
+            count = series.count()
+            if series.nunique() <= CATEGORY_MAX_RATIO * count:
+                compact[col] = "category"
+
+    return compact
+
+
+def _smallest_int(series: pd.Series) -> np.dtype:
+    low, high = series.min(), series.max()
+    for int_type in COMPACT_INT_TYPES:
+        info = np.iinfo(int_type)
+        if info.min <= low and high <= info.max:
+            return np.dtype(int_type)
+    return np.dtype(np.int64)
+
+
+def _fits(series: pd.Series, dtype) -> bool:
+    """
+    Whether casting to `dtype` keeps every value (missing ones included).
+    """
+    values = series.to_numpy()
+    with np.errstate(over="ignore", invalid="ignore"):
+        cast = values.astype(dtype)
+    return np.array_equal(cast, values, equal_nan=values.dtype.kind == "f")
+
+
+def _compact_chunk(
+    chunk: pd.DataFrame,
+    compact: dict,
+    categories: dict
+) -> pd.DataFrame:
+    """
+    Cast a conformed chunk to the compact dtypes. Dictionary columns are
+    encoded against categories that only ever grow (new values appended
+    in order of appearance), so each batch extends the stored dictionary.
+    """
+    widened = {}
+
+    for col, dtype in compact.items():
+        series = chunk[col]
+
+        if dtype == "category":
+            seen = categories[col]
+            unseen = pd.Index(series.dropna().unique()).difference(
+                seen, sort=False
+            )
+            if len(unseen):
+                seen = categories[col] = seen.append(unseen)
+            chunk[col] = pd.Categorical(series, categories=seen)
+        elif _fits(series, dtype):
+            chunk[col] = series.astype(dtype)
+        elif dtype.kind == "i":
+            widened[col] = np.promote_types(dtype, _smallest_int(series))
+        else:
+            widened[col] = series.dtype
+
+    if widened:
+        raise _SchemaConflict({}, widened)
+    return chunk
+
+
+def _chunk_schema(chunk: pd.DataFrame, compact: dict) -> pa.Schema:
+    """
+    Arrow schema of the first chunk with the compact dtypes applied; text
+    columns that happen to be empty there are typed as strings so later
+    chunks can fill them.
+    """
+    schema = dataframe_to_table(chunk).schema
+    fields = []
+    for field in schema:
+        dtype = compact.get(field.name)
+        if dtype == "category":
+            field = pa.field(
+                field.name, pa.dictionary(pa.int32(), pa.string())
+            )
+        elif dtype is not None:
+            field = pa.field(field.name, pa.from_numpy_dtype(dtype))
+        elif pa.types.is_null(field.type):
+            field = pa.field(field.name, pa.string())
+        fields.append(field)
+    return pa.schema(fields)
+
+
+def _conform_chunk(chunk: pd.DataFrame, dtypes: pd.Series) -> pd.DataFrame:
+    """
+    Cast a chunk to the dtypes of the first chunk where that is lossless,
+    or raise _SchemaConflict with the dtypes the whole file needs.
+    """
+    conflicts = {}
+
+    for col in chunk.columns[chunk.dtypes != dtypes]:
+        series = chunk[col]
+        expected = dtypes[col]
+
+        if expected.kind == "f" and series.dtype.kind in "iuf":
+            chunk[col] = series.astype(expected)
+        elif expected.kind == "O" and series.isna().all():
+            chunk[col] = series.astype(expected)
+        elif expected.kind in "iu" and series.dtype.kind == "f":
+            conflicts[col] = "float64"
+        else:
+            conflicts[col] = str
+
+    if conflicts:
+        raise _SchemaConflict(conflicts)
+    return chunk
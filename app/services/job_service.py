@@ -0,0 +1,407 @@
+import os
+import json
+import uuid
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from app.utils.helpers import json_default
+from app.services.storage_service import VersionInUseError
+from app.core.logger import drain_metrics, merge_metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows: admission is then only serialized per process
+    fcntl = None
+
+JOB_STORAGE_PATH = "app/storage/jobs"
+JOB_ACTIVE_DIR_NAME = "active"
+JOB_LOCK_FILE_NAME = ".lock"
+
+ACTIVE_JOB_STATUSES = ("queued", "running")
+
+# Worker processes shared by all background jobs
+JOB_MAX_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+
+# Queued + running jobs allowed per dataset
+JOB_MAX_PER_DATASET = 2
+
+_executor = None
+_lock = threading.Lock()
+
+# Set inside a worker process while it runs a job
+_current_job_id = None
+
+
+# HTTP status of an error by exception type, as the synchronous endpoints
+# map them; the first matching entry applies, anything else is a 500
+ERROR_STATUS_CODES = (
+    (VersionInUseError, 409),
+    (FileNotFoundError, 404),
+    (ValueError, 400)
+)
+
+
+class JobLimitError(Exception):
+    pass
+
+
+def error_status(error: BaseException) -> int:
+    for error_type, status_code in ERROR_STATUS_CODES:
+        if isinstance(error, error_type):
+            return status_code
+    return 500
+
+
+def _job_error(error: BaseException) -> dict:
+    return {
+        "type": type(error).__name__,
+        "detail": str(error),
+        "status": error_status(error)
+    }
+
+
+# ---------- Job records ----------
+#
+# A job is a JSON file in JOB_STORAGE_PATH, written by the API process on
+# submit / completion and by the worker process while it runs, so status
+# can be read from any process that shares the storage directory.
+#
+# Each record names its owner, the API process whose pool runs it, by pid
+# and process start time. Only the owner can complete a job, so a queued
+# or running job whose owner is gone (restart, killed server) is failed
+# when it is next looked at. A queued or running job also has a marker
+# file in active/<dataset_id>/, which is what the per-dataset limit
+# counts, under a file lock shared by all server processes.
+
+def _get_job_path(job_id: str) -> str:
+    return os.path.join(JOB_STORAGE_PATH, f"{job_id}.json")
+
+
+def _save_job(job: dict) -> None:
+    os.makedirs(JOB_STORAGE_PATH, exist_ok=True)
+    path = _get_job_path(job["job_id"])
+    # Unique per call: the API process saves records from request threads
+    # and from pool callbacks at the same time
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+
+    with open(tmp_path, "w") as f:
+        json.dump(job, f, default=json_default)
+    os.replace(tmp_path, path)
+
+
+def _load_job(job_id: str) -> dict:
+    path = _get_job_path(job_id)
+    if not os.path.exists(path):
+        raise FileNotFoundError("Job not found")
+
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def get_job(job_id: str) -> dict:
+    return _reconcile_job(_load_job(job_id))
+
+
+def _update_job(job_id: str, **fields) -> dict:
+    job = _load_job(job_id)
+    job.update(fields)
+    _save_job(job)
+    return job
+
+
+def report_progress(progress: float, message: str) -> None:
+    """
+    Record progress of the running job. A no-op outside of a job, so
+    services can call it unconditionally.
+    """
+    if _current_job_id is None:
+        return
+    _update_job(_current_job_id, progress=round(progress, 4), message=message)
+
+
+# ---------- Ownership and admission ----------
+
+def _process_start_time(pid: int) -> int | None:
+    """
+    Start time of a process in clock ticks after boot, which tells a
+    recycled pid from the original process; None without /proc.
+    """
+    try:
+        with open(f"/proc/{pid}/stat", "r") as f:
+            stat = f.read()
+    except OSError:
+        return None
+
+    # Fields after the command name, which may itself contain spaces
+    return int(stat.rsplit(")", 1)[1].split()[19])
+
+
+def _owner_alive(job: dict) -> bool:
+    pid = job.get("owner_pid")
+    if pid is None:
+        return False
+
+    if os.name == "nt":
+        # os.kill would terminate the process; only one server process
+        # is supported there, so any other owner is a previous run
+        return pid == os.getpid()
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+
+    start_time = job.get("owner_start_time")
+    return start_time is None or _process_start_time(pid) == start_time
+
+
+def _reconcile_job(job: dict) -> dict:
+    """
+    Fail a queued or running job whose owning process is gone; nothing
+    would ever complete it.
+    """
+    if job["status"] in ACTIVE_JOB_STATUSES and not _owner_alive(job):
+        job.update(
+            status="failed",
+            finished_at=datetime.utcnow().isoformat(),
+            message="Interrupted",
+            error=_job_error(RuntimeError(
+                "Job was interrupted: the server running it exited"
+            ))
+        )
+        _save_job(job)
+    return job
+
+
+def reconcile_jobs() -> int:
+    """
+    Fail every queued or running job left behind by a process that is
+    gone. Run at startup; returns the number of jobs failed.
+    """
+    if not os.path.isdir(JOB_STORAGE_PATH):
+        return 0
+
+    failed = 0
+    with _admission_lock():
+        for name in os.listdir(JOB_STORAGE_PATH):
+            if not name.endswith(".json"):
+                continue
+            try:
+                job = _load_job(name[: -len(".json")])
+            except (FileNotFoundError, ValueError):
+                continue
+            was_active = job["status"] in ACTIVE_JOB_STATUSES
+            if was_active and _reconcile_job(job)["status"] == "failed":
+                failed += 1
+    return failed
+
+
+@contextmanager
+def _admission_lock():
+    """
+    Exclusive lock over job admission, held across threads and across
+    server processes sharing JOB_STORAGE_PATH.
+    """
+    os.makedirs(JOB_STORAGE_PATH, exist_ok=True)
+    with _lock:
+        if fcntl is None:
+            yield
+            return
+
+        lock_path = os.path.join(JOB_STORAGE_PATH, JOB_LOCK_FILE_NAME)
+        with open(lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _get_active_dir(dataset_id: str) -> str:
+    return os.path.join(JOB_STORAGE_PATH, JOB_ACTIVE_DIR_NAME, dataset_id)
+
+
+def _count_active_jobs(dataset_id: str) -> int:
+    """
+    Queued and running jobs of a dataset, across all server processes.
+    Drops the markers of jobs that have ended. Call under the admission
+    lock.
+    """
+    active_dir = _get_active_dir(dataset_id)
+    if not os.path.isdir(active_dir):
+        return 0
+
+    count = 0
+    for job_id in os.listdir(active_dir):
+        try:
+            status = get_job(job_id)["status"]
+        except FileNotFoundError:
+            status = None
+        if status in ACTIVE_JOB_STATUSES:
+            count += 1
+        else:
+            _release(dataset_id, job_id)
+    return count
+
+
+def _release(dataset_id: str, job_id: str) -> None:
+    try:
+        os.remove(os.path.join(_get_active_dir(dataset_id), job_id))
+    except FileNotFoundError:
+        pass
+
+
+# ---------- Execution ----------
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn: forking a threaded server process is not safe
+        _executor = ProcessPoolExecutor(
+            max_workers=JOB_MAX_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+
+def shutdown_jobs() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _run_job(job_id: str, func, args: tuple, kwargs: dict):
+    """
+    Entry point inside the worker process. Returns the result with the
+    stage metrics the job recorded, which the API process merges into
+    its own; on failure they travel on the exception.
+    """
+    global _current_job_id
+    _current_job_id = job_id
+    try:
+        _update_job(
+            job_id,
+            status="running",
+            started_at=datetime.utcnow().isoformat(),
+            message="Running"
+        )
+        return func(*args, **kwargs), drain_metrics()
+    except Exception as e:
+        e.job_metrics = drain_metrics()
+        raise
+    finally:
+        _current_job_id = None
+
+
+def submit_job(kind: str, dataset_id: str, func, *args, **kwargs) -> dict:
+    """
+    Run `func(*args, **kwargs)` in the worker pool and return the queued
+    job record immediately.
+    """
+    job_id = str(uuid.uuid4())
+    owner_pid = os.getpid()
+    job = {
+        "job_id": job_id,
+        "dataset_id": dataset_id,
+        "kind": kind,
+        "status": "queued",
+        "progress": 0.0,
+        "message": "Queued",
+        "owner_pid": owner_pid,
+        "owner_start_time": _process_start_time(owner_pid),
+        "submitted_at": datetime.utcnow().isoformat(),
+        "started_at": None,
+        "finished_at": None,
+        "result": None,
+        "error": None
+    }
+
+    with _admission_lock():
+        active = _count_active_jobs(dataset_id)
+        if active >= JOB_MAX_PER_DATASET:
+            raise JobLimitError(
+                f"Dataset already has {active} active jobs"
+            )
+        _save_job(job)
+        active_dir = _get_active_dir(dataset_id)
+        os.makedirs(active_dir, exist_ok=True)
+        open(os.path.join(active_dir, job_id), "w").close()
+
+    try:
+        try:
+            future = _get_executor().submit(
+                _run_job, job_id, func, args, kwargs
+            )
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory); start a fresh pool
+            shutdown_jobs()
+            future = _get_executor().submit(
+                _run_job, job_id, func, args, kwargs
+            )
+    except Exception:
+        _release(dataset_id, job_id)
+        _update_job(
+            job_id,
+            status="failed",
+            message="Failed",
+            error=_job_error(RuntimeError("Could not start job"))
+        )
+        raise
+
+    future.add_done_callback(
+        lambda f: _finish_job(job_id, dataset_id, f)
+    )
+    return job
+
+
+def _finish_job(job_id: str, dataset_id: str, future) -> None:
+    try:
+        finished_at = datetime.utcnow().isoformat()
+        if future.cancelled():
+            _update_job(
+                job_id,
+                status="failed",
+                finished_at=finished_at,
+                message="Cancelled",
+                error={
+                    "type": "CancelledError",
+                    "detail": "Job cancelled",
+                    "status": 500
+                }
+            )
+            return
+
+        error = future.exception()
+        if error is None:
+            try:
+                result, metrics = future.result()
+                merge_metrics(metrics)
+                _update_job(
+                    job_id,
+                    status="completed",
+                    progress=1.0,
+                    finished_at=finished_at,
+                    message="Completed",
+                    result=result
+                )
+                return
+            except Exception as e:
+                error = e
+
+        merge_metrics(getattr(error, "job_metrics", {}))
+        _update_job(
+            job_id,
+            status="failed",
+            finished_at=finished_at,
+            message="Failed",
+            error=_job_error(error)
+        )
+    finally:
+        _release(dataset_id, job_id)
@@ -1,80 +1,224 @@
-import os
+import time
 import pandas as pd
 import numpy as np
-from app.services.risk_leakage_service import detect_feature_risks
-from app.services.recommendation_service import generate_recommendations
+from app.services.risk_leakage_service import iter_feature_risks
+from app.services.recommendation_service import (
+    dataset_recommendations,
+    feature_recommendations
+)
+from app.services.storage_service import (
+    read_version,
+    read_version_table,
+    table_to_dataframe,
+    get_version_record,
+    get_content_hash,
+    normalize_version,
+    load_profile,
+    load_cross_products,
+    save_profile
+)
+from app.services.cache_service import get_cached_analysis, store_analysis
+from app.core.logger import record_stage, track_stage
+from app.utils.statistics import (
+    APPROX_Z,
+    DUPLICATE_CHUNK_ROWS,
+    ApproximateProfileAccumulator,
+    CrossProducts,
+    DatasetProfile,
+    DuplicateRowCounter,
+    count_duplicate_rows,
+    merged_rows,
+    profile_columns,
+    profile_dataframe,
+    update_profile,
+    attach_target,
+    complete_rows,
+    correlation_interval,
+    rescale_cross_products,
+    update_cross_products,
+    vif_interval
+)
 
-DATASET_STORAGE_PATH = "app/storage/datasets"
+# "exact" profiles every row; "approximate" estimates the expensive
+# statistics from sketches and samples and reports confidence intervals.
+ANALYSIS_MODES = ["exact", "approximate"]
+
+# Rows converted to pandas at a time while sketching a version
+APPROX_BATCH_ROWS = 1_000_000
+
+# Duplicate row positions returned for diagnostics by default
+DUPLICATE_SAMPLE_ROWS = 20
 
 
 def compute_quality_score(
     dataset_id: str,
     target_col: str | None = None,
-    version: str | None = None
+    version: str | None = None,
+    mode: str = "exact"
 ) -> dict:
-    dataset_dir = os.path.join(DATASET_STORAGE_PATH, dataset_id)
+    version, content_hash = _analysis_version(dataset_id, version, mode)
 
-    if not os.path.exists(dataset_dir):
-        raise FileNotFoundError("Dataset not found")
+    # Unchanged versions are served from the analysis cache
+    cached = get_cached_analysis(
+        dataset_id, version, target_col, content_hash, mode
+    )
+    if cached is not None:
+        return cached
 
-    if version:
-        dataset_path = os.path.join(dataset_dir, version)
-    else:
-        dataset_path = os.path.join(dataset_dir, "v0_raw.csv")
+    analysis = {}
+    for _ in _analysis_records(
+        dataset_id, version, target_col, mode, content_hash, analysis
+    ):
+        pass
+    return analysis
+
+
+def iter_quality_analysis(
+    dataset_id: str,
+    target_col: str | None = None,
+    version: str | None = None,
+    mode: str = "exact"
+):
+    """
+    The analysis of compute_quality_score as records, each yielded as
+    soon as it is computed: a "summary" record (score and metrics, from
+    the profile), one "feature" record per feature with its diagnostics
+    and recommendations, an "approximation" record in approximate mode
+    and a final "recommendations" record with the dataset-level ones.
+    The analysis is cached once the last record is out; a cached one is
+    replayed as the same records.
+    """
+    version, content_hash = _analysis_version(dataset_id, version, mode)
+
+    cached = get_cached_analysis(
+        dataset_id, version, target_col, content_hash, mode
+    )
+    if cached is not None:
+        yield from analysis_records(cached)
+        return
 
-    if not os.path.exists(dataset_path):
-        raise FileNotFoundError("Dataset version not found")
+    yield from _analysis_records(
+        dataset_id, version, target_col, mode, content_hash, {}
+    )
+
+
+def _analysis_version(
+    dataset_id: str,
+    version: str | None,
+    mode: str
+) -> tuple[str, str]:
+    if mode not in ANALYSIS_MODES:
+        raise ValueError(f"Unsupported analysis mode: {mode}")
+
+    version = normalize_version(version or "v0_raw")
+    return version, get_content_hash(dataset_id, version)
+
+
+def _analysis_records(
+    dataset_id: str,
+    version: str,
+    target_col: str | None,
+    mode: str,
+    content_hash: str,
+    analysis: dict
+):
+    """
+    Compute an analysis record by record, assembling it in `analysis`
+    and caching it after the last record.
+    """
+    # One profile feeds every section below. It is stored per version
+    # (v0's is built during ingestion), in which case only the columns
+    # risk detection needs are read. A stored profile is exact and free,
+    # so it is used in approximate mode too.
+    profile = load_profile(dataset_id, version)
+    if profile is None and mode == "approximate":
+        with track_stage("profiling") as stage:
+            profile, df = _approximate_profile(
+                dataset_id, version, target_col
+            )
+            stage.rows = profile.n_rows
+    elif profile is None:
+        with track_stage("profiling") as stage:
+            df = read_version(dataset_id, version)
+            stage.rows = len(df)
+            profile = profile_dataframe(df)
+    else:
+        df = read_version(
+            dataset_id, version, columns=_risk_columns(profile, target_col)
+        )
 
-    df = pd.read_csv(dataset_path)
-    n_rows, n_cols = df.shape
+    if target_col and target_col in df.columns:
+        attach_target(profile, df[target_col])
 
-    risk_analysis = detect_feature_risks(df, target_col)
+    stats = profile.columns
+    n_rows, n_cols = profile.n_rows, profile.n_cols
 
     # ---------- Missing values ----------
-    missing_ratio = df.isnull().sum().sum() / max(df.size, 1)
+    missing_ratio = profile.missing_ratio
 
     # ---------- Duplicate rows ----------
-    duplicate_ratio = df.duplicated().sum() / max(n_rows, 1)
+    duplicate_ratio = profile.duplicate_ratio
 
     # ---------- Numeric columns ----------
-    numeric_df = df.select_dtypes(include=[np.number])
+    numeric_stats = stats[stats["is_numeric"]]
 
     # ---------- Low variance ----------
-    low_variance_cols = [
-        col for col in numeric_df.columns
-        if numeric_df[col].nunique(dropna=True) <= 1
-    ]
+    low_variance_cols = set(
+        numeric_stats.index[numeric_stats["n_unique"] <= 1]
+    )
     low_variance_ratio = len(low_variance_cols) / max(n_cols, 1)
 
     # ---------- Skewness (safe) ----------
-    skewed_cols = []
-    for col in numeric_df.columns:
-        series = numeric_df[col].dropna()
-        if len(series) < 3:
-            continue
-        skew_val = series.skew()
-        if pd.notna(skew_val) and abs(skew_val) > 1:
-            skewed_cols.append(col)
+    skewed_cols = set(
+        numeric_stats.index[numeric_stats["skew"].abs() > 1]
+    )
 
-    skewness_ratio = len(skewed_cols) / max(len(numeric_df.columns), 1)
+    skewness_ratio = len(skewed_cols) / max(len(numeric_stats), 1)
 
     # ---------- Scoring ----------
-    score = 100.0
-    score -= missing_ratio * 30
-    score -= duplicate_ratio * 20
-    score -= low_variance_ratio * 25
-    score -= skewness_ratio * 15
+    final_score = _score(
+        missing_ratio, duplicate_ratio, low_variance_ratio, skewness_ratio
+    )
 
-    if pd.isna(score):
-        score = 0
+    analysis.update({
+        "dataset_id": dataset_id,
+        "rows": n_rows,
+        "columns": n_cols,
+        "quality_score": final_score,
+        "metrics": {
+            "missing_ratio": round(missing_ratio, 4),
+            "duplicate_ratio": round(duplicate_ratio, 4),
+            "low_variance_ratio": round(low_variance_ratio, 4),
+            "skewness_ratio": round(skewness_ratio, 4)
+        }
+    })
+    yield {"type": "summary", **analysis}
+
+    # The dataset-wide risk statistics (VIF, target correlation) are
+    # computed here; each feature's risks as its record is built.
+    stored_vif = profile.vif is not None
+    with track_stage("risk_detection", n_rows):
+        risks = iter_feature_risks(
+            df, target_col, profile=profile, mode=mode
+        )
 
-    final_score = max(int(round(score)), 0)
+    # Store exact profiles that are new or just gained their VIF
+    if (
+        profile.approximation is None
+        and profile.vif is not None
+        and not stored_vif
+    ):
+        save_profile(dataset_id, version, profile)
 
     # ---------- Feature diagnostics ----------
     feature_diagnostics = []
+    recommendations = []
+    recommendation_seconds = 0.0
 
-    for col in df.columns:
-        missing_pct = df[col].isnull().mean() * 100
+    for (col, risk_info), null_count, n_unique, dtype in zip(
+        risks, stats["null_count"], stats["n_unique"], stats["dtype"]
+    ):
+        missing_pct = null_count / max(n_rows, 1) * 100
 
         flags = []
         if missing_pct > 20:
@@ -86,33 +230,548 @@ def compute_quality_score(
         if not flags:
             flags.append("Safe")
 
-        feature_diagnostics.append({
+        info = {
             "feature": col,
             "missing_percentage": round(missing_pct, 2),
-            "unique_values": df[col].nunique(dropna=True),
-            "dtype": str(df[col].dtype),
+            "unique_values": int(n_unique),
+            "dtype": dtype,
             "quality_flags": flags,
-            "risk_analysis": risk_analysis.get(col)
-        })
+            "risk_analysis": risk_info
+        }
+        start = time.perf_counter()
+        feature_recs = feature_recommendations(info, risk_info)
+        recommendation_seconds += time.perf_counter() - start
+
+        feature_diagnostics.append(info)
+        recommendations += feature_recs
+        yield {"type": "feature", **info, "recommendations": feature_recs}
 
     # ---------- Recommendations ----------
-    recommendations = generate_recommendations(
-        df=df,
-        feature_diagnostics=feature_diagnostics,
-        risk_analysis=risk_analysis,
-        target_col=target_col
+    start = time.perf_counter()
+    dataset_recs = dataset_recommendations(profile, target_col)
+    record_stage(
+        "recommendations",
+        recommendation_seconds + time.perf_counter() - start,
+        n_rows
+    )
+
+    analysis["feature_diagnostics"] = feature_diagnostics
+    analysis["recommendations"] = recommendations + dataset_recs
+    if mode == "approximate":
+        analysis["approximation"] = _confidence_intervals(
+            profile, missing_ratio, low_variance_ratio, skewed_cols
+        )
+        yield {"type": "approximation", **analysis["approximation"]}
+
+    store_analysis(
+        dataset_id, version, target_col, content_hash, analysis, mode
     )
+    yield {"type": "recommendations", "recommendations": dataset_recs}
+
+
+def analysis_records(analysis: dict):
+    """
+    The records of iter_quality_analysis for a complete analysis.
+    """
+    feature_recs = {}
+    dataset_recs = []
+    for rec in analysis["recommendations"]:
+        if rec["scope"] == "Feature":
+            feature_recs.setdefault(rec["target"], []).append(rec)
+        else:
+            dataset_recs.append(rec)
+
+    yield {"type": "summary", **{
+        key: value for key, value in analysis.items()
+        if key not in (
+            "feature_diagnostics", "recommendations", "approximation"
+        )
+    }}
+    for info in analysis["feature_diagnostics"]:
+        yield {
+            "type": "feature",
+            **info,
+            "recommendations": feature_recs.get(info["feature"], [])
+        }
+    if "approximation" in analysis:
+        yield {"type": "approximation", **analysis["approximation"]}
+    yield {"type": "recommendations", "recommendations": dataset_recs}
+
+
+def _score(
+    missing_ratio: float,
+    duplicate_ratio: float,
+    low_variance_ratio: float,
+    skewness_ratio: float
+) -> int:
+    score = 100.0
+    score -= missing_ratio * 30
+    score -= duplicate_ratio * 20
+    score -= low_variance_ratio * 25
+    score -= skewness_ratio * 15
+
+    if pd.isna(score):
+        score = 0
+
+    return max(int(round(score)), 0)
+
+
+def _risk_columns(profile: DatasetProfile, target_col: str | None) -> list:
+    """
+    Columns risk detection reads: the numeric ones and the target. With
+    the VIF already in the profile, numeric columns are only needed for
+    target correlation.
+    """
+    if target_col not in profile.columns.index:
+        return [] if profile.vif is not None else profile.numeric_columns
+
+    needed = profile.numeric_columns
+    if target_col not in needed:
+        needed = needed + [target_col]
+    return needed
+
+
+# ---------- Feature selection ----------
+
+def select_features(
+    analysis: dict,
+    features: list[str] | None = None,
+    flags: list[str] | None = None,
+    offset: int = 0,
+    limit: int | None = None
+) -> dict:
+    """
+    Copy of an analysis restricted to one page of the feature diagnostics
+    matching `features` (names) and `flags` (quality flags or risk
+    labels); recommendations are kept for the dataset and for the
+    returned features only.
+    """
+    matching = [
+        info for info in analysis["feature_diagnostics"]
+        if _matches(info, features, flags)
+    ]
+    end = None if limit is None else offset + limit
+    page = matching[offset:end]
+
+    returned = {info["feature"] for info in page}
+    return {
+        **analysis,
+        "feature_diagnostics": page,
+        "recommendations": [
+            rec for rec in analysis["recommendations"]
+            if rec["scope"] != "Feature" or rec["target"] in returned
+        ],
+        "pagination": {
+            "offset": offset,
+            "limit": limit,
+            "matching_features": len(matching),
+            "returned_features": len(page)
+        }
+    }
+
+
+def select_records(
+    records,
+    features: list[str] | None = None,
+    flags: list[str] | None = None,
+    offset: int = 0,
+    limit: int | None = None
+):
+    """
+    select_features for the records of iter_quality_analysis: feature
+    records outside the page are dropped as they pass, and the final
+    record carries the pagination.
+    """
+    end = None if limit is None else offset + limit
+    matching = returned = 0
+    for record in records:
+        if record["type"] == "feature":
+            if not _matches(record, features, flags):
+                continue
+            matching += 1
+            if matching <= offset or (end is not None and matching > end):
+                continue
+            returned += 1
+        elif record["type"] == "recommendations":
+            record = {**record, "pagination": {
+                "offset": offset,
+                "limit": limit,
+                "matching_features": matching,
+                "returned_features": returned
+            }}
+        yield record
+
+
+def compute_selected_quality_score(
+    dataset_id: str,
+    target_col: str | None,
+    version: str | None,
+    mode: str,
+    features: list[str] | None,
+    flags: list[str] | None,
+    offset: int,
+    limit: int | None
+) -> dict:
+    """
+    compute_quality_score restricted by select_features when a selection
+    is given, as the analysis routes return it; run by background jobs.
+    """
+    analysis = compute_quality_score(dataset_id, target_col, version, mode)
+    if features or flags or offset or limit is not None:
+        analysis = select_features(analysis, features, flags, offset, limit)
+    return analysis
+
+
+def _matches(
+    info: dict,
+    features: list[str] | None,
+    flags: list[str] | None
+) -> bool:
+    if features and info["feature"] not in features:
+        return False
+    if not flags:
+        return True
+
+    labels = list(info["quality_flags"])
+    if info["risk_analysis"]:
+        labels += info["risk_analysis"]["risk_label"]
+    return any(flag in labels for flag in flags)
+
+
+# ---------- Duplicate rows ----------
+
+def find_duplicate_rows(
+    dataset_id: str,
+    version: str | None = None,
+    sample_size: int = DUPLICATE_SAMPLE_ROWS
+) -> dict:
+    """
+    Count rows equal to an earlier row, chunk by chunk over the
+    memory-mapped version, with the positions of the first duplicates.
+    """
+    version = normalize_version(version or "v0_raw")
+    counter = _count_version_duplicates(dataset_id, version, sample_size)
+
     return {
         "dataset_id": dataset_id,
-        "rows": n_rows,
-        "columns": n_cols,
-        "quality_score": final_score,
-        "metrics": {
-            "missing_ratio": round(missing_ratio, 4),
-            "duplicate_ratio": round(duplicate_ratio, 4),
-            "low_variance_ratio": round(low_variance_ratio, 4),
-            "skewness_ratio": round(skewness_ratio, 4)
-        },
-        "feature_diagnostics": feature_diagnostics,
-        "recommendations": recommendations
+        "version": version,
+        "rows": counter.n_rows,
+        "duplicate_rows": counter.duplicate_count,
+        "duplicate_ratio": round(
+            counter.duplicate_count / max(counter.n_rows, 1), 4
+        ),
+        "sample_indices": counter.sample_indices
     }
+
+
+def _count_version_duplicates(
+    dataset_id: str,
+    version: str,
+    sample_size: int = 0
+) -> DuplicateRowCounter:
+    table = read_version_table(dataset_id, version)
+
+    counter = DuplicateRowCounter(sample_size)
+    for batch in table.to_batches(max_chunksize=DUPLICATE_CHUNK_ROWS):
+        counter.update(table_to_dataframe(batch))
+    return counter
+
+
+# ---------- Incremental profiles ----------
+
+def store_step_profile(
+    dataset_id: str,
+    parent: str,
+    version: str,
+    before: dict,
+    dropped: list[str],
+    rescaled_only: bool = False
+) -> None:
+    """
+    Derive the profile of a version written by a step from its parent's
+    stored profile, so it is never re-profiled as a whole. Only the
+    columns the step wrote are profiled; `before` maps each of them that
+    existed in the parent to its old values. Nothing is stored when the
+    parent has no stored profile.
+
+    `rescaled_only` means every written column was only standard scaled;
+    correlations, and with them VIF, are then unchanged.
+    """
+    profile = load_profile(dataset_id, parent)
+    if profile is None:
+        return
+
+    written = get_version_record(dataset_id, version)["written"]
+    after = read_version(dataset_id, version, columns=written)
+    changed = profile_columns(after)
+
+    duplicate_count = _step_duplicate_count(
+        dataset_id, parent, version, profile, before, after, dropped
+    )
+
+    # ---------- VIF ----------
+    # Kept when no numeric column changed, or numeric ones were only
+    # rescaled without becoming constant (which turns them into NaN)
+    stats = profile.columns
+    touched = [
+        col for col in list(dropped) + written
+        if (col in stats.index and stats.at[col, "is_numeric"])
+        or (col in changed.index and changed.at[col, "is_numeric"])
+    ]
+    rescaled = not touched or (
+        rescaled_only
+        and not dropped
+        and all(
+            col in stats.index and stats.at[col, "n_unique"] > 1
+            for col in touched
+        )
+    )
+    step_profile = update_profile(
+        profile, changed, dropped, duplicate_count,
+        profile.vif if rescaled else None
+    )
+
+    # The parent's cross products, when stored, follow the step: rescaled
+    # in place, or updated for the written columns and changed rows
+    products = load_cross_products(dataset_id, parent)
+    if products is not None and rescaled:
+        # Standard scaling is x * scale + offset, with a positive scale
+        scale = {
+            col: np.sqrt(changed.at[col, "m2"] / stats.at[col, "m2"])
+            for col in touched
+        }
+        offset = {
+            col: changed.at[col, "mean"] - scale[col] * stats.at[col, "mean"]
+            for col in touched
+        }
+        step_profile.cross_products = rescale_cross_products(
+            products, scale, offset
+        )
+    elif products is not None:
+        with track_stage("vif", profile.n_rows):
+            step_profile.cross_products = _step_cross_products(
+                dataset_id, parent, version, products,
+                step_profile.numeric_columns, touched
+            )
+        step_profile.vif = (
+            step_profile.cross_products.variance_inflation_factors()
+        )
+
+    save_profile(dataset_id, version, step_profile)
+
+
+def _step_cross_products(
+    dataset_id: str,
+    parent: str,
+    version: str,
+    products: CrossProducts,
+    numeric_cols: list[str],
+    touched: list[str]
+) -> CrossProducts:
+    """
+    Cross products of a step's version from its parent's. Only the
+    touched numeric columns are read from the parent, for the rows that
+    were complete there; the unchanged ones are shared by both versions.
+    """
+    df = read_version(dataset_id, version, columns=numeric_cols)
+    touched_set = set(touched)
+    written = [
+        col for col in numeric_cols
+        if col in touched_set or col not in products.columns
+    ]
+    kept_set = set(numeric_cols) - set(written)
+
+    kept_complete = complete_rows(df, [col for col in df if col in kept_set])
+    complete = kept_complete & complete_rows(df, written)
+    old_complete = kept_complete
+    replaced = [col for col in products.columns if col not in kept_set]
+    if replaced:
+        old_complete = old_complete & complete_rows(
+            read_version(dataset_id, parent, columns=replaced)
+        )
+    return update_cross_products(products, df, written, old_complete, complete)
+
+
+def _step_duplicate_count(
+    dataset_id: str,
+    parent: str,
+    version: str,
+    profile: DatasetProfile,
+    before: dict,
+    after: pd.DataFrame,
+    dropped: list[str]
+) -> int:
+    """
+    Duplicate rows of a step's version. Only rows whose new value in a
+    written column is shared by several old values can change their
+    duplicates, and they cannot equal any other row, so their count is
+    re-taken before and after on those rows alone.
+    """
+    if dropped:
+        return _count_version_duplicates(dataset_id, version).duplicate_count
+
+    merged = np.zeros(profile.n_rows, dtype=bool)
+    for col in after.columns:
+        if col not in before:
+            # A new column has no old values to compare with
+            return _count_version_duplicates(
+                dataset_id, version
+            ).duplicate_count
+        merged |= merged_rows(before[col], after[col])
+
+    rows = np.flatnonzero(merged)
+    if len(rows) == 0:
+        return profile.duplicate_count
+    if len(rows) > profile.n_rows // 2:
+        return _count_version_duplicates(dataset_id, version).duplicate_count
+
+    old_rows = read_version_table(dataset_id, parent).take(rows)
+    new_rows = read_version_table(dataset_id, version).take(rows)
+    return (
+        profile.duplicate_count
+        - count_duplicate_rows(table_to_dataframe(old_rows))
+        + count_duplicate_rows(table_to_dataframe(new_rows))
+    )
+
+
+# ---------- Approximate mode ----------
+
+def _approximate_profile(
+    dataset_id: str,
+    version: str,
+    target_col: str | None
+) -> tuple[DatasetProfile, pd.DataFrame]:
+    """
+    Sketch the memory-mapped version batch by batch; return the estimated
+    profile and the reservoir sample of the columns risk detection reads.
+    The profile is not stored, so a later exact analysis still builds one.
+    """
+    table = read_version_table(dataset_id, version)
+
+    accumulator = ApproximateProfileAccumulator()
+    for batch in table.to_batches(max_chunksize=APPROX_BATCH_ROWS):
+        accumulator.update(table_to_dataframe(batch))
+
+    sample = table_to_dataframe(table.take(accumulator.sample_indices))
+    profile = accumulator.finalize(sample)
+    return profile, sample[_risk_columns(profile, target_col)]
+
+
+def _confidence_intervals(
+    profile: DatasetProfile,
+    missing_ratio: float,
+    low_variance_ratio: float,
+    skewed_cols: set
+) -> dict:
+    """
+    Confidence intervals of the estimated metrics and of the score. Null
+    counts are exact and low variance (at most one distinct value) is
+    exact in the linear-counting range of the sketches; the duplicate
+    ratio and the skewness flags carry the sampling error.
+
+    Every version normally has a stored, exact profile, and then only
+    the sampled risk metrics (VIF and target correlation) have
+    intervals; the profile is sketched only when none is stored.
+    """
+    estimate = profile.approximation
+    if estimate is None:
+        score = _score(
+            missing_ratio, profile.duplicate_ratio, low_variance_ratio,
+            len(skewed_cols) / max(len(profile.numeric_columns), 1)
+        )
+        intervals = {
+            "mode": "approximate",
+            "exact_profile": True,
+            "quality_score_ci": [score, score]
+        }
+    else:
+        intervals = _estimate_intervals(
+            profile, missing_ratio, low_variance_ratio, skewed_cols
+        )
+
+    if profile.sampled is not None:
+        intervals["sampled_metrics"] = _sampled_intervals(profile.sampled)
+    return intervals
+
+
+def _estimate_intervals(
+    profile: DatasetProfile,
+    missing_ratio: float,
+    low_variance_ratio: float,
+    skewed_cols: set
+) -> dict:
+    """
+    Confidence intervals of a sketched profile's metrics and score.
+    """
+    estimate = profile.approximation
+
+    # ---------- Duplicate ratio ----------
+    duplicate_ratio = estimate["duplicate_ratio"]
+    margin = APPROX_Z * estimate["duplicate_ratio_error"]
+    duplicate_ci = [
+        max(duplicate_ratio - margin, 0.0),
+        min(duplicate_ratio + margin, 1.0)
+    ]
+
+    # ---------- Skewness flags ----------
+    # A column is uncertain when |skew| is within the margin of the
+    # threshold; the bounds count all uncertain columns one way or other.
+    stats = profile.columns
+    numeric_cols = profile.numeric_columns
+    uncertain = {
+        col for col in numeric_cols
+        if abs(abs(stats.at[col, "skew"]) - 1)
+        <= APPROX_Z * estimate["skew_error"].get(col, np.inf)
+    }
+    n_numeric = max(len(numeric_cols), 1)
+    skewness_ci = [
+        len(skewed_cols - uncertain) / n_numeric,
+        len(skewed_cols | uncertain) / n_numeric
+    ]
+
+    return {
+        "mode": "approximate",
+        "exact_profile": False,
+        "confidence_level": 0.95,
+        "sample_rows": estimate["sample_rows"],
+        "duplicate_sample_rows": estimate["duplicate_sample_rows"],
+        "unique_values_relative_error": round(
+            estimate["distinct_relative_error"], 4
+        ),
+        "quality_score_ci": [
+            _score(
+                missing_ratio, duplicate_ci[1], low_variance_ratio,
+                skewness_ci[1]
+            ),
+            _score(
+                missing_ratio, duplicate_ci[0], low_variance_ratio,
+                skewness_ci[0]
+            )
+        ],
+        "metrics_ci": {
+            "duplicate_ratio": [round(v, 4) for v in duplicate_ci],
+            "skewness_ratio": [round(v, 4) for v in skewness_ci]
+        }
+    }
+
+
+def _sampled_intervals(sampled: dict) -> dict:
+    """
+    Per-column intervals of the risk metrics estimated on a row sample.
+    They decide the VIF and target correlation risk flags, not the score.
+    """
+    n_rows = sampled["sample_rows"]
+    intervals = {"sample_rows": n_rows}
+    for name, interval in (
+        ("vif", vif_interval),
+        ("target_correlation", correlation_interval)
+    ):
+        values = sampled[name]
+        bounds = interval(
+            np.array(list(values.values()), dtype=np.float64), n_rows
+        )
+        intervals[f"{name}_ci"] = {
+            col: [round(float(low), 4), round(float(high), 4)]
+            for col, (low, high) in zip(values, bounds.reshape(-1, 2))
+        }
+    return intervals
@@ -1,72 +1,96 @@
-import numpy as np
-import pandas as pd
+from app.utils.statistics import DatasetProfile
 
 
 def generate_recommendations(
-    df: pd.DataFrame,
+    profile: DatasetProfile,
     feature_diagnostics: list,
     risk_analysis: dict,
     target_col: str | None = None
 ):
     recommendations = []
+    for feature_info in feature_diagnostics:
+        recommendations += feature_recommendations(
+            feature_info, risk_analysis.get(feature_info["feature"])
+        )
+    return recommendations + dataset_recommendations(profile, target_col)
+
+
+def feature_recommendations(
+    feature_info: dict,
+    risk_info: dict | None
+) -> list:
+    """
+    Recommendations for one feature, from its diagnostics and risks.
+    """
+    recommendations = []
 
     # ---------- Feature-level recommendations ----------
-    for feature_info in feature_diagnostics:
-        feature = feature_info["feature"]
-        missing_pct = feature_info["missing_percentage"]
-        dtype = feature_info["dtype"]
+    feature = feature_info["feature"]
+    missing_pct = feature_info["missing_percentage"]
+    dtype = feature_info["dtype"]
+
+    # Missing values
+    if missing_pct > 0:
+        if "float" in dtype or "int" in dtype:
+            recommendations.append({
+                "type": "Preprocessing",
+                "scope": "Feature",
+                "target": feature,
+                "issue": "Missing Values",
+                "recommended_action": "Median Imputation",
+                "reason": f"{missing_pct}% missing values in numeric feature",
+                "impact": "High" if missing_pct > 20 else "Medium"
+            })
+        else:
+            recommendations.append({
+                "type": "Preprocessing",
+                "scope": "Feature",
+                "target": feature,
+                "issue": "Missing Values",
+                "recommended_action": "Mode Imputation",
+                "reason": f"{missing_pct}% missing values in categorical feature",
+                "impact": "Medium"
+            })
 
-        # Missing values
-        if missing_pct > 0:
-            if "float" in dtype or "int" in dtype:
-                recommendations.append({
-                    "type": "Preprocessing",
-                    "scope": "Feature",
-                    "target": feature,
-                    "issue": "Missing Values",
-                    "recommended_action": "Median Imputation",
-                    "reason": f"{missing_pct}% missing values in numeric feature",
-                    "impact": "High" if missing_pct > 20 else "Medium"
-                })
-            else:
-                recommendations.append({
-                    "type": "Preprocessing",
-                    "scope": "Feature",
-                    "target": feature,
-                    "issue": "Missing Values",
-                    "recommended_action": "Mode Imputation",
-                    "reason": f"{missing_pct}% missing values in categorical feature",
-                    "impact": "Medium"
-                })
+    # Risk & leakage based
+    if risk_info:
+        if "Leakage-Prone" in risk_info["risk_label"]:
+            recommendations.append({
+                "type": "Risk Mitigation",
+                "scope": "Feature",
+                "target": feature,
+                "issue": "Target Leakage",
+                "recommended_action": "Drop Feature",
+                "reason": ", ".join(risk_info["reason"]),
+                "impact": "High"
+            })
 
-        # Risk & leakage based
-        risk_info = risk_analysis.get(feature)
-        if risk_info:
-            if "Leakage-Prone" in risk_info["risk_label"]:
-                recommendations.append({
-                    "type": "Risk Mitigation",
-                    "scope": "Feature",
-                    "target": feature,
-                    "issue": "Target Leakage",
-                    "recommended_action": "Drop Feature",
-                    "reason": ", ".join(risk_info["reason"]),
-                    "impact": "High"
-                })
+        if "High Risk" in risk_info["risk_label"]:
+            recommendations.append({
+                "type": "Risk Mitigation",
+                "scope": "Feature",
+                "target": feature,
+                "issue": "Multicollinearity",
+                "recommended_action": "Drop or Transform",
+                "reason": ", ".join(risk_info["reason"]),
+                "impact": "Medium"
+            })
 
-            if "High Risk" in risk_info["risk_label"]:
-                recommendations.append({
-                    "type": "Risk Mitigation",
-                    "scope": "Feature",
-                    "target": feature,
-                    "issue": "Multicollinearity",
-                    "recommended_action": "Drop or Transform",
-                    "reason": ", ".join(risk_info["reason"]),
-                    "impact": "Medium"
-                })
+    return recommendations
+
+
+def dataset_recommendations(
+    profile: DatasetProfile,
+    target_col: str | None = None
+) -> list:
+    """
+    Recommendations for the dataset as a whole.
+    """
+    recommendations = []
 
     # ---------- Dataset-level recommendations ----------
-    if target_col and target_col in df.columns:
-        target_counts = df[target_col].value_counts(normalize=True)
+    if target_col and profile.target_distribution is not None:
+        target_counts = profile.target_distribution
         if len(target_counts) == 2 and target_counts.min() < 0.2:
             recommendations.append({
                 "type": "Preprocessing",
@@ -1,21 +1,73 @@
+import io
 import os
 import json
+import hashlib
+import multiprocessing
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pandas as pd
+import reportlab
 from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase.pdfmetrics import stringWidth
 from reportlab.pdfgen import canvas
 
-from app.services.rescoring_service import rescore_dataset
+from app.services.rescoring_service import compare_analyses
 from app.services.quality_scoring_service import compute_quality_score
+from app.services.job_service import report_progress
+from app.services.cache_service import get_cached_sections, store_sections
+from app.services.storage_service import (
+    read_journal,
+    count_journal,
+    get_latest_version,
+    get_column_fingerprints,
+    read_version
+)
+from app.core.config import (
+    REPORT_RENDER_WORKERS,
+    REPORT_PARALLEL_MIN_FEATURES
+)
+from app.core.logger import Stage, track_stage
+from app.utils.helpers import json_default
 
 DATASET_STORAGE_PATH = "app/storage/datasets"
 REPORT_STORAGE_PATH = "app/storage/reports"
 
+# Most recent execution steps included in a report
+REPORT_LOG_TAIL = 100
+
+# Bump whenever the layout of a section changes, so cached sections are
+# rendered again
+REPORT_RENDER_FORMAT = 3
+
+# Feature sections rendered per worker task
+REPORT_FEATURES_PER_TASK = 100
+
+HISTOGRAM_BINS = 20
+HISTOGRAM_TOP_CATEGORIES = 10
+
+# Recommendations listed in a feature's section
+FEATURE_RECOMMENDATIONS_SHOWN = 3
+
+_render_executor = None
+
 
 def generate_report(dataset_id: str, target_col: str | None = None) -> dict:
     """
     Generates dataset quality report in JSON and PDF formats.
     """
+    with track_stage("reporting") as stage:
+        report = _generate_report(dataset_id, target_col, stage)
+    return report
 
+
+def _generate_report(
+    dataset_id: str,
+    target_col: str | None,
+    stage: Stage
+) -> dict:
     dataset_dir = os.path.join(DATASET_STORAGE_PATH, dataset_id)
     report_dir = os.path.join(REPORT_STORAGE_PATH, dataset_id)
 
@@ -25,25 +77,35 @@ def generate_report(dataset_id: str, target_col: str | None = None) -> dict:
     os.makedirs(report_dir, exist_ok=True)
 
     # ---------- Collect analysis ----------
-    rescore_result = rescore_dataset(dataset_id, target_col)
-
+    # One analysis per version feeds both the JSON and the PDF report
+    report_progress(0.1, "Analysing initial and final versions")
+    initial_version = "v0_raw"
+    final_version = get_latest_version(dataset_id)
+    initial_analysis = compute_quality_score(
+        dataset_id=dataset_id,
+        target_col=target_col,
+        version=initial_version
+    )
     final_analysis = compute_quality_score(
         dataset_id=dataset_id,
         target_col=target_col,
-        version=rescore_result["final_version"]
+        version=final_version
+    )
+    rescore_result = compare_analyses(
+        dataset_id, initial_version, initial_analysis, final_version,
+        final_analysis
     )
+    stage.rows = final_analysis["rows"]
 
     # ---------- Load execution history ----------
-    log_path = os.path.join(dataset_dir, "execution_log.json")
-    execution_log = []
-    if os.path.exists(log_path):
-        with open(log_path, "r") as f:
-            execution_log = json.load(f)
+    execution_log = read_journal(dataset_id, tail=REPORT_LOG_TAIL)
+    execution_steps = count_journal(dataset_id)
 
     # ---------- Assemble report ----------
     report_data = {
         "dataset_id": dataset_id,
         "generated_at": datetime.utcnow().isoformat(),
+        "final_version": final_version,
         "initial_score": rescore_result["initial_score"],
         "final_score": rescore_result["final_score"],
         "improvement": rescore_result["improvement"],
@@ -51,17 +113,32 @@ def generate_report(dataset_id: str, target_col: str | None = None) -> dict:
         "final_metrics": rescore_result["final_metrics"],
         "feature_diagnostics": final_analysis["feature_diagnostics"],
         "recommendations": final_analysis["recommendations"],
-        "execution_log": execution_log
+        "execution_log": execution_log,
+        "execution_steps": execution_steps
+    }
+
+    # ---------- Render sections ----------
+    report_progress(0.3, "Rendering report sections")
+    with track_stage("report_render", stage.rows):
+        sections = _render_sections(
+            dataset_id, final_version, final_analysis, report_data
+        )
+    report_data["feature_histograms"] = {
+        section["feature"]: section["histogram"]
+        for section in sections if "feature" in section
     }
 
     # ---------- Save JSON ----------
+    report_progress(0.9, "Writing JSON and PDF reports")
     json_path = os.path.join(report_dir, "report.json")
     with open(json_path, "w") as f:
-        json.dump(report_data, f, indent=2)
+        json.dump(report_data, f, indent=2, default=json_default)
 
     # ---------- Generate PDF ----------
     pdf_path = os.path.join(report_dir, "report.pdf")
-    _generate_pdf(report_data, pdf_path)
+    footer = f"{dataset_id} - generated {report_data['generated_at']}"
+    with track_stage("report_pdf", stage.rows):
+        _write_pdf(sections, pdf_path, footer)
 
     return {
         "dataset_id": dataset_id,
@@ -70,47 +147,626 @@ def generate_report(dataset_id: str, target_col: str | None = None) -> dict:
     }
 
 
-def _generate_pdf(report_data: dict, output_path: str):
+# ---------- Sections ----------
+#
+# A report is a sequence of sections, each rendered into blocks: a height
+# and the PDF content stream code of the block, relative to its top left
+# corner. Sections are cached by a hash of
+# everything they are rendered from, so a new report only renders the
+# sections whose inputs changed, typically the features a step rewrote.
+# Feature sections read their column to draw its histogram and are
+# rendered in worker processes.
+
+def _section_key(kind: str, inputs) -> str:
+    payload = json.dumps(
+        [
+            REPORT_RENDER_FORMAT, reportlab.Version,
+            _get_scratch_canvas()[1], kind, inputs
+        ],
+        sort_keys=True,
+        default=json_default
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _render_sections(
+    dataset_id: str,
+    version: str,
+    analysis: dict,
+    report_data: dict
+) -> list[dict]:
+    """
+    Rendered sections of a report, in order, taken from the cache where
+    their inputs did not change.
+    """
+    summary = {
+        key: report_data[key] for key in (
+            "dataset_id", "final_version", "initial_score", "final_score",
+            "improvement", "initial_metrics", "final_metrics"
+        )
+    }
+    summary["rows"] = analysis["rows"]
+    summary["columns"] = analysis["columns"]
+
+    specs = [
+        ("summary", summary),
+        ("execution", {
+            "execution_log": [
+                step["description"] for step in report_data["execution_log"]
+            ],
+            "execution_steps": report_data["execution_steps"]
+        }),
+        ("recommendations", analysis["recommendations"]),
+        ("features_heading", None)
+    ]
+
+    feature_recommendations = {}
+    for rec in analysis["recommendations"]:
+        if rec["scope"] == "Feature":
+            feature_recommendations.setdefault(rec["target"], []).append(rec)
+
+    fingerprints = get_column_fingerprints(dataset_id, version)
+    for info in analysis["feature_diagnostics"]:
+        feature = info["feature"]
+        specs.append(("feature", {
+            "diagnostics": info,
+            "recommendations": feature_recommendations.get(feature, [])[
+                :FEATURE_RECOMMENDATIONS_SHOWN
+            ],
+            "column": fingerprints[feature]
+        }))
+
+    keys = [_section_key(kind, inputs) for kind, inputs in specs]
+    cached = get_cached_sections(keys)
+
+    rendered = {}
+    features_to_render = []
+    for key, (kind, inputs) in zip(keys, specs):
+        if key in cached:
+            continue
+        if kind == "feature":
+            features_to_render.append((key, inputs))
+        else:
+            rendered[key] = _SECTION_RENDERERS[kind](inputs)
+
+    rendered.update(_render_features(dataset_id, version, features_to_render))
+    store_sections(rendered)
+
+    return [cached.get(key) or rendered[key] for key in keys]
+
+
+def _render_features(
+    dataset_id: str,
+    version: str,
+    items: list[tuple[str, dict]]
+) -> dict:
+    """
+    Render feature sections, in worker processes when there are enough
+    of them to make up for starting the workers.
+    """
+    tasks = [
+        items[start:start + REPORT_FEATURES_PER_TASK]
+        for start in range(0, len(items), REPORT_FEATURES_PER_TASK)
+    ]
+    rendered = {}
+
+    def done(result: dict):
+        rendered.update(result)
+        report_progress(
+            0.3 + 0.6 * len(rendered) / len(items),
+            f"Rendered {len(rendered)} of {len(items)} feature sections"
+        )
+
+    parallel = (
+        len(items) >= REPORT_PARALLEL_MIN_FEATURES
+        and REPORT_RENDER_WORKERS > 1
+    )
+    if parallel:
+        try:
+            futures = {
+                _get_render_executor().submit(
+                    _render_feature_task, dataset_id, version, task
+                ): index
+                for index, task in enumerate(tasks)
+            }
+            for future in as_completed(futures):
+                done(future.result())
+                tasks[futures[future]] = None
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory); finish in process
+            shutdown_report_workers()
+
+    for task in tasks:
+        if task is not None:
+            done(_render_feature_task(dataset_id, version, task))
+
+    return rendered
+
+
+def _get_render_executor() -> ProcessPoolExecutor:
+    global _render_executor
+    if _render_executor is None:
+        # spawn: forking a threaded server process is not safe
+        _render_executor = ProcessPoolExecutor(
+            max_workers=REPORT_RENDER_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _render_executor
+
+
+def shutdown_report_workers() -> None:
+    global _render_executor
+    if _render_executor is not None:
+        _render_executor.shutdown(wait=False, cancel_futures=True)
+        _render_executor = None
+
+
+def _render_feature_task(
+    dataset_id: str,
+    version: str,
+    items: list[tuple[str, dict]]
+) -> dict:
+    """
+    Entry point inside the worker process: render the sections of a
+    batch of features, reading only their columns.
+    """
+    columns = [inputs["diagnostics"]["feature"] for _, inputs in items]
+    df = read_version(dataset_id, version, columns=columns)
+    return {
+        key: _render_feature(
+            inputs, _histogram(df[inputs["diagnostics"]["feature"]])
+        )
+        for key, inputs in items
+    }
+
+
+def _histogram(series: pd.Series) -> dict | None:
+    """
+    Value distribution of a column: binned counts for numeric columns,
+    the most frequent values for the others.
+    """
+    if (
+        pd.api.types.is_numeric_dtype(series)
+        and not pd.api.types.is_bool_dtype(series)
+    ):
+        values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+        values = values[np.isfinite(values)]
+        if len(values) == 0:
+            return None
+        counts, edges = np.histogram(values, bins=HISTOGRAM_BINS)
+        return {
+            "kind": "numeric",
+            "edges": edges.tolist(),
+            "counts": counts.tolist()
+        }
+
+    counts = series.value_counts(dropna=True)
+    if counts.empty:
+        return None
+    top = counts.iloc[:HISTOGRAM_TOP_CATEGORIES]
+    return {
+        "kind": "categorical",
+        "labels": [str(label) for label in top.index],
+        "counts": top.tolist(),
+        "other": int(counts.iloc[HISTOGRAM_TOP_CATEGORIES:].sum())
+    }
+
+
+# ---------- Layout ----------
+#
+# Blocks are built from drawing operations in points, with y measured
+# down from the top of the block, and compiled to PDF content stream code
+# where they are rendered; assembling the PDF then only positions the
+# cached code on pages. Code refers to fonts by the canvas's internal
+# names. The report fonts are registered first on every canvas, and the
+# names a block uses are kept with it and checked against the canvas it
+# is pasted into; they are also part of the section keys. Text is
+# fitted with the font metrics of the installed reportlab, hence its
+# version in the keys too.
+
+PAGE_WIDTH, PAGE_HEIGHT = A4
+MARGIN = 40
+CONTENT_WIDTH = PAGE_WIDTH - 2 * MARGIN
+CONTENT_TOP = PAGE_HEIGHT - MARGIN
+# Room for the footer
+CONTENT_BOTTOM = MARGIN + 20
+SECTION_GAP = 14
+LINE_HEIGHT = 14
+FEATURE_BLOCK_HEIGHT = 172
+
+REPORT_FONTS = ("Helvetica", "Helvetica-Bold")
+
+
+def _fit(text: str, width: float, font: str, size: float) -> str:
+    """
+    Truncate text with an ellipsis so it fits `width` points.
+    """
+    text = str(text)
+    if stringWidth(text, font, size) <= width:
+        return text
+    while text and stringWidth(text + "...", font, size) > width:
+        text = text[:-1]
+    return text + "..."
+
+
+def _text(
+    x: float,
+    dy: float,
+    text: str,
+    size: float = 9,
+    font: str = "Helvetica",
+    width: float | None = None
+) -> list:
+    if font not in REPORT_FONTS:
+        raise ValueError(f"Font '{font}' is not a report font")
+    if width is not None:
+        text = _fit(text, width, font, size)
+    return ["text", x, dy, font, size, str(text)]
+
+
+def _rect(x: float, dy: float, w: float, h: float, gray: float) -> list:
+    return ["rect", x, dy, w, h, gray]
+
+
+def _rule(x1: float, dy1: float, x2: float, dy2: float, gray: float) -> list:
+    return ["line", x1, dy1, x2, dy2, gray]
+
+
+def _line_block(text: str, indent: float = 0, **style) -> dict:
+    return _block(LINE_HEIGHT, [_text(
+        MARGIN + indent, 10, text, width=CONTENT_WIDTH - indent, **style
+    )])
+
+
+def _heading_block(title: str) -> dict:
+    return _block(28, [
+        _text(MARGIN, 16, title, size=13, font="Helvetica-Bold"),
+        _rule(MARGIN, 22, MARGIN + CONTENT_WIDTH, 22, 0.6)
+    ])
+
+
+_scratch_canvas = None
+
+
+def _new_canvas(output) -> canvas.Canvas:
+    """
+    A canvas with the report fonts registered first, in a fixed order.
+    """
+    c = canvas.Canvas(output, pagesize=A4)
+    for name in REPORT_FONTS:
+        c.setFont(name, 9)
+    return c
+
+
+def _font_aliases(c: canvas.Canvas) -> dict:
+    """
+    The names a canvas refers to the report fonts by in content stream
+    code, read from the code of text objects that select them.
     """
-    Internal helper to generate PDF report.
+    aliases = {}
+    for name in REPORT_FONTS:
+        text = c.beginText()
+        text.setFont(name, 9)
+        tokens = text.getCode().split()
+        aliases[name] = tokens[tokens.index("Tf") - 2]
+    return aliases
+
+
+def _get_scratch_canvas() -> tuple[canvas.Canvas, dict]:
     """
-    c = canvas.Canvas(output_path, pagesize=A4)
-    width, height = A4
+    The canvas blocks are compiled on in this process, and its font
+    aliases.
+    """
+    global _scratch_canvas
+    if _scratch_canvas is None:
+        c = _new_canvas(io.BytesIO())
+        _scratch_canvas = (c, _font_aliases(c))
+    return _scratch_canvas
+
+
+def _pdf_number(value: float) -> str:
+    return f"{value:.2f}".rstrip("0").rstrip(".")
+
+
+def _block(height: float, ops: list) -> dict:
+    """
+    A block of the given height, its operations compiled to content
+    stream code with the origin at the block's top left corner. The
+    font names the code uses are kept with it, so that it is only pasted
+    into canvases that define the same ones.
+    """
+    scratch, aliases = _get_scratch_canvas()
+    code = []
+    text = None
+    font = None
+    fonts = set()
+    for op in ops:
+        kind = op[0]
+        if kind == "rect":
+            _, x, dy, w, h, gray = op
+            numbers = map(_pdf_number, (gray, x, -dy - h, w, h))
+            code.append("{} g {} {} {} {} re f".format(*numbers))
+        elif kind == "line":
+            _, x1, dy1, x2, dy2, gray = op
+            numbers = map(_pdf_number, (gray, x1, -dy1, x2, -dy2))
+            code.append("{} G {} {} m {} {} l S".format(*numbers))
+        elif kind == "text" and op[5]:
+            _, x, dy, name, size, value = op
+            if text is None:
+                text = scratch.beginText()
+            if (name, size) != font:
+                text.setFont(name, size)
+                font = (name, size)
+                fonts.add(name)
+            text.setTextOrigin(x, -dy)
+            text.textOut(value)
+
+    # Text is drawn last, in black, over any bars
+    if text is not None:
+        code.append("0 g " + text.getCode())
+
+    return {
+        "height": height,
+        "code": "\n".join(code),
+        "fonts": {name: aliases[name] for name in sorted(fonts)}
+    }
+
 
-    y = height - 40
+def _format_number(value) -> str:
+    if isinstance(value, float):
+        return f"{value:.4g}"
+    return str(value)
 
-    def draw_line(text):
-        nonlocal y
-        c.drawString(40, y, text)
-        y -= 18
-        if y < 40:
-            c.showPage()
-            y = height - 40
 
-    draw_line("Dataset Quality Report")
-    draw_line("-" * 60)
+def _render_summary(inputs: dict) -> dict:
+    blocks = [
+        _block(34, [_text(
+            MARGIN, 20, "Dataset Quality Report", size=18,
+            font="Helvetica-Bold"
+        )]),
+        _line_block(f"Dataset ID: {inputs['dataset_id']}"),
+        _line_block(f"Version: {inputs['final_version']}"),
+        _line_block(f"Rows: {inputs['rows']}   Columns: {inputs['columns']}"),
+        _line_block(""),
+        _line_block(f"Initial Quality Score: {inputs['initial_score']}"),
+        _line_block(f"Final Quality Score: {inputs['final_score']}"),
+        _line_block(f"Improvement: {inputs['improvement']}"),
+        _line_block("")
+    ]
 
-    draw_line(f"Dataset ID: {report_data['dataset_id']}")
-    draw_line(f"Generated At: {report_data['generated_at']}")
+    columns = (MARGIN, MARGIN + 200, MARGIN + 300)
+    blocks.append(_block(LINE_HEIGHT, [
+        _text(x, 10, label, font="Helvetica-Bold")
+        for x, label in zip(columns, ("Metric", "Initial", "Final"))
+    ]))
+    for metric, initial in inputs["initial_metrics"].items():
+        final = inputs["final_metrics"].get(metric)
+        blocks.append(_block(LINE_HEIGHT, [
+            _text(x, 10, value)
+            for x, value in zip(columns, (
+                metric.replace("_", " ").capitalize(),
+                _format_number(initial),
+                _format_number(final)
+            ))
+        ]))
+    return {"blocks": blocks}
 
-    draw_line("")
-    draw_line(f"Initial Quality Score: {report_data['initial_score']}")
-    draw_line(f"Final Quality Score: {report_data['final_score']}")
-    draw_line(f"Improvement: {report_data['improvement']}")
 
-    draw_line("")
-    draw_line("Executed Preprocessing Steps:")
-    if report_data["execution_log"]:
-        for step in report_data["execution_log"]:
-            draw_line(f"- {step['description']}")
+def _render_execution(inputs: dict) -> dict:
+    blocks = [_heading_block("Executed Preprocessing Steps")]
+    earlier_steps = inputs["execution_steps"] - len(inputs["execution_log"])
+    if earlier_steps > 0:
+        blocks.append(
+            _line_block(f"({earlier_steps} earlier steps not shown)")
+        )
+    if inputs["execution_log"]:
+        blocks.extend(
+            _line_block(f"- {description}")
+            for description in inputs["execution_log"]
+        )
     else:
-        draw_line("No preprocessing executed.")
+        blocks.append(_line_block("No preprocessing executed."))
+    return {"blocks": blocks}
+
 
-    draw_line("")
-    draw_line("Top Recommendations:")
-    for rec in report_data["recommendations"][:5]:
-        draw_line(
-            f"- {rec['target']}: {rec['recommended_action']} ({rec['impact']})"
+def _render_recommendations(recommendations: list) -> dict:
+    blocks = [_heading_block("Recommendations")]
+    if not recommendations:
+        blocks.append(_line_block("No recommendations."))
+        return {"blocks": blocks}
+
+    # Target, action, impact and reason columns: x offset and width
+    columns = ((0, 115), (120, 135), (260, 45), (310, 205))
+    blocks.append(_block(LINE_HEIGHT, [
+        _text(MARGIN + x, 10, label, font="Helvetica-Bold", width=width)
+        for (x, width), label in zip(
+            columns, ("Target", "Action", "Impact", "Reason")
         )
+    ]))
+    for rec in recommendations:
+        blocks.append(_block(12, [
+            _text(MARGIN + x, 9, value, size=8, width=width)
+            for (x, width), value in zip(columns, (
+                rec["target"], rec["recommended_action"], rec["impact"],
+                rec["reason"]
+            ))
+        ]))
+    return {"blocks": blocks}
+
+
+def _render_features_heading(_inputs) -> dict:
+    return {"blocks": [_heading_block("Feature Details")]}
+
+
+def _render_feature(inputs: dict, histogram: dict | None) -> dict:
+    """
+    One block per feature: its diagnostics on the left, its value
+    distribution on the right.
+    """
+    info = inputs["diagnostics"]
+    risk = info.get("risk_analysis") or {}
+    right = MARGIN + CONTENT_WIDTH
+
+    ops = [
+        _text(
+            MARGIN, 13, info["feature"], size=11, font="Helvetica-Bold",
+            width=CONTENT_WIDTH
+        ),
+        _rule(MARGIN, 19, right, 19, 0.75)
+    ]
+
+    rows = [
+        ("Type", info["dtype"]),
+        ("Missing", f"{info['missing_percentage']}%"),
+        ("Unique values", info["unique_values"]),
+        ("Quality flags", ", ".join(info["quality_flags"]) or "None"),
+        ("Risk", ", ".join(risk.get("risk_label", [])) or "-"),
+        ("Reason", "; ".join(risk.get("reason", [])) or "-"),
+        ("Suggested", ", ".join(risk.get("suggested_action", [])) or "-")
+    ]
+    dy = 32
+    for label, value in rows:
+        ops.append(_text(MARGIN, dy, label, size=8.5, font="Helvetica-Bold"))
+        ops.append(_text(MARGIN + 75, dy, value, size=8.5, width=190))
+        dy += 12
+
+    if inputs["recommendations"]:
+        ops.append(_text(
+            MARGIN, dy, "Recommendations", size=8.5, font="Helvetica-Bold"
+        ))
+        for rec in inputs["recommendations"]:
+            ops.append(_text(
+                MARGIN + 75, dy,
+                f"{rec['recommended_action']} ({rec['impact']})",
+                size=8.5, width=190
+            ))
+            dy += 12
+
+    ops.extend(_histogram_ops(histogram, MARGIN + 285, 30, 230, 112))
+    ops.append(_rule(
+        MARGIN, FEATURE_BLOCK_HEIGHT - 6, right, FEATURE_BLOCK_HEIGHT - 6,
+        0.85
+    ))
+
+    return {
+        "feature": info["feature"],
+        "histogram": histogram,
+        "blocks": [_block(FEATURE_BLOCK_HEIGHT, ops)]
+    }
 
+
+def _histogram_ops(
+    histogram: dict | None,
+    x: float,
+    dy: float,
+    width: float,
+    height: float
+) -> list:
+    if histogram is None:
+        return [_text(x, dy + height / 2, "No values to plot", size=8)]
+
+    ops = []
+    if histogram["kind"] == "numeric":
+        counts = histogram["counts"]
+        edges = histogram["edges"]
+        top = max(counts) or 1
+        bar_width = width / len(counts)
+        base = dy + height
+        for i, count in enumerate(counts):
+            bar_height = height * count / top
+            if bar_height > 0:
+                ops.append(_rect(
+                    x + i * bar_width, base - bar_height,
+                    max(bar_width - 1, 0.5), bar_height, 0.55
+                ))
+        ops.append(_rule(x, base, x + width, base, 0.3))
+        ops.append(_text(x, base + 10, _format_number(edges[0]), size=7))
+        ops.append(_text(
+            x + width - 40, base + 10, _format_number(edges[-1]), size=7,
+            width=40
+        ))
+        ops.append(_text(
+            x + width / 2 - 30, base + 10, f"max count {max(counts)}",
+            size=7, width=60
+        ))
+        return ops
+
+    labels = histogram["labels"]
+    counts = histogram["counts"]
+    if histogram["other"]:
+        labels = [*labels, "(other)"]
+        counts = [*counts, histogram["other"]]
+
+    top = max(counts) or 1
+    row_height = min(11, height / len(labels))
+    label_width = 70
+    bar_space = width - label_width - 40
+    for i, (label, count) in enumerate(zip(labels, counts)):
+        row_dy = dy + i * row_height
+        ops.append(_text(
+            x, row_dy + row_height - 2, label, size=7, width=label_width - 4
+        ))
+        bar_width = bar_space * count / top
+        ops.append(_rect(
+            x + label_width, row_dy + 1, max(bar_width, 0.5),
+            row_height - 2, 0.55
+        ))
+        ops.append(_text(
+            x + label_width + bar_width + 3, row_dy + row_height - 2,
+            count, size=7
+        ))
+    return ops
+
+
+_SECTION_RENDERERS = {
+    "summary": _render_summary,
+    "execution": _render_execution,
+    "recommendations": _render_recommendations,
+    "features_heading": _render_features_heading
+}
+
+
+# ---------- PDF ----------
+
+def _write_pdf(sections: list[dict], output_path: str, footer: str):
+    """
+    Lay the rendered blocks out on pages and write the PDF.
+    """
+    c = _new_canvas(output_path)
+    aliases = _font_aliases(c)
+    page = 1
+    y = CONTENT_TOP
+
+    for section in sections:
+        if y < CONTENT_TOP:
+            y -= SECTION_GAP
+        for block in section["blocks"]:
+            if y - block["height"] < CONTENT_BOTTOM and y < CONTENT_TOP:
+                _draw_footer(c, footer, page)
+                c.showPage()
+                page += 1
+                y = CONTENT_TOP
+            if block["code"]:
+                for name, alias in block["fonts"].items():
+                    if aliases.get(name) != alias:
+                        raise RuntimeError(
+                            f"Section compiled with {alias} for {name}, "
+                            f"which this canvas names {aliases.get(name)}"
+                        )
+                c.addLiteral(
+                    f"q 1 0 0 1 0 {_pdf_number(y)} cm\n{block['code']}\nQ"
+                )
+            y -= block["height"]
+
+    _draw_footer(c, footer, page)
     c.save()
+
+
+def _draw_footer(c: canvas.Canvas, footer: str, page: int):
+    c.setFont("Helvetica", 7)
+    c.setFillGray(0.4)
+    c.drawString(
+        MARGIN, MARGIN, _fit(footer, CONTENT_WIDTH - 60, "Helvetica", 7)
+    )
+    c.drawRightString(PAGE_WIDTH - MARGIN, MARGIN, f"Page {page}")
+    c.setFillGray(0)
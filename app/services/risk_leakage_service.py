@@ -1,46 +1,127 @@
 import pandas as pd
 import numpy as np
 from sklearn.preprocessing import LabelEncoder
-from statsmodels.stats.outliers_influence import variance_inflation_factor
 
+from app.core.logger import track_stage
 
-def detect_feature_risks(df: pd.DataFrame, target_col: str | None = None):
-    results = {}
+from app.utils.statistics import (
+    VIF_SAMPLE_ROWS,
+    DatasetProfile,
+    approximate_profile_dataframe,
+    complete_rows,
+    cross_products,
+    profile_columns,
+    reservoir_sample,
+    target_correlations,
+    variance_inflation_factors
+)
 
-    numeric_df = df.select_dtypes(include=[np.number]).copy()
+
+def detect_feature_risks(
+    df: pd.DataFrame,
+    target_col: str | None = None,
+    profile: DatasetProfile | None = None,
+    mode: str = "exact"
+):
+    """
+    Leakage and multicollinearity risks per feature. In "approximate"
+    mode cardinalities may come from sketches, and VIF and target
+    correlation are computed on a reservoir sample of rows; the sampled
+    values are recorded on the profile for their confidence intervals.
+    """
+    return dict(iter_feature_risks(df, target_col, profile, mode))
+
+
+def iter_feature_risks(
+    df: pd.DataFrame,
+    target_col: str | None = None,
+    profile: DatasetProfile | None = None,
+    mode: str = "exact"
+):
+    """
+    detect_feature_risks as an iterator of (feature, risks) pairs. The
+    dataset-wide statistics (VIF, target correlation) are computed by
+    this call, each feature's risks as the iterator reaches it.
+    """
+    if mode == "approximate":
+        if profile is None:
+            profile = approximate_profile_dataframe(df)
+        df = reservoir_sample(df)
+    sampled = mode == "approximate" and len(df) < profile.n_rows
+
+    # With a profile, df only needs the numeric and target columns
+    if profile is not None:
+        n_unique = profile.columns["n_unique"]
+        n_rows = profile.n_rows
+    else:
+        n_unique = profile_columns(df)["n_unique"]
+        n_rows = len(df)
+
+    numeric_df = df.select_dtypes(include=[np.number])
 
     # ---------- VIF (Multicollinearity) ----------
-    vif_scores = {}
-    if numeric_df.shape[1] >= 2:
-        vif_df = numeric_df.dropna()
-        if vif_df.shape[0] > 0:
-            for i, col in enumerate(vif_df.columns):
-                try:
-                    vif_scores[col] = variance_inflation_factor(
-                        vif_df.values, i
-                    )
-                except Exception:
-                    vif_scores[col] = np.nan
+    # Reused from the profile when a step could not have changed it;
+    # exact results are recorded there for the caller to store, with
+    # the cross products they came from, which steps then update.
+    if profile is not None and profile.vif is not None:
+        vif_scores = profile.vif
+    elif profile is not None and mode == "exact":
+        with track_stage("vif", n_rows):
+            complete = complete_rows(numeric_df)
+            if complete.sum() <= VIF_SAMPLE_ROWS:
+                products = cross_products(numeric_df, complete)
+                vif_scores = products.variance_inflation_factors()
+                profile.cross_products = products
+            else:
+                vif_scores = _vif_scores(numeric_df)
+        profile.vif = vif_scores
+    else:
+        with track_stage("vif", n_rows):
+            vif_scores = _vif_scores(numeric_df)
 
     # ---------- Correlation with target ----------
     target_corr = {}
     if target_col and target_col in df.columns:
-        target_series = df[target_col]
+        target_values = _encode_target(df[target_col])
+        feature_cols = [
+            col for col in numeric_df.columns if col != target_col
+        ]
+
+        if feature_cols:
+            target_corr = dict(zip(
+                feature_cols,
+                target_correlations(
+                    numeric_df[feature_cols].to_numpy(
+                        dtype=np.float64, na_value=np.nan
+                    ),
+                    target_values
+                )
+            ))
+
+    if sampled:
+        profile.sampled = {
+            "sample_rows": len(df),
+            "vif": {} if profile.vif is not None else vif_scores,
+            "target_correlation": target_corr
+        }
 
-        for col in numeric_df.columns:
-            if col == target_col:
-                continue
-            corr = df[[col, target_col]].dropna().corr().iloc[0, 1]
-            target_corr[col] = corr
+    return _feature_risks(n_unique, n_rows, target_corr, vif_scores)
 
+
+def _feature_risks(
+    n_unique: pd.Series,
+    n_rows: int,
+    target_corr: dict,
+    vif_scores: dict
+):
     # ---------- Feature-level analysis ----------
-    for col in df.columns:
+    for col in n_unique.index:
         flags = []
         reason = []
         action = []
 
         # ID-like detection
-        if df[col].nunique() / max(len(df), 1) > 0.95:
+        if n_unique[col] / max(n_rows, 1) > 0.95:
             flags.append("Leakage-Prone")
             reason.append("High cardinality (ID-like)")
             action.append("Drop")
@@ -62,10 +143,42 @@ def detect_feature_risks(df: pd.DataFrame, target_col: str | None = None):
             reason.append("No significant risk detected")
             action.append("Retain")
 
-        results[col] = {
+        yield col, {
             "risk_label": flags,
             "reason": reason,
             "suggested_action": action
         }
 
-    return results
+
+def _vif_scores(numeric_df: pd.DataFrame) -> dict:
+    if numeric_df.shape[1] < 2:
+        return {}
+
+    vif_df = numeric_df.dropna()
+    if vif_df.shape[0] == 0:
+        return {}
+
+    return {
+        col: float(vif)
+        for col, vif in zip(
+            vif_df.columns,
+            variance_inflation_factors(vif_df.to_numpy(dtype=np.float64))
+        )
+    }
+
+
+def _encode_target(target: pd.Series) -> np.ndarray:
+    """
+    Target as floats with NaN for missing values; categorical targets are
+    label encoded so they can be correlated like numeric ones.
+    """
+    if target.dtype != bool and pd.api.types.is_numeric_dtype(target):
+        return target.to_numpy(dtype=np.float64, na_value=np.nan)
+
+    encoded = np.full(len(target), np.nan)
+    present = target.notna().to_numpy()
+    if present.any():
+        encoded[present] = LabelEncoder().fit_transform(
+            target[present].astype(str)
+        )
+    return encoded
@@ -0,0 +1,1488 @@
+import os
+import json
+import shutil
+import hashlib
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from contextlib import contextmanager
+from datetime import datetime
+
+from app.core.logger import record_stage
+from app.utils.statistics import (
+    CrossProducts,
+    DatasetProfile,
+    PROFILE_FIELDS
+)
+
+try:
+    import fcntl
+except ImportError:  # Windows: the lock then only covers one process
+    fcntl = None
+
+DATASET_STORAGE_PATH = "app/storage/datasets"
+
+VERSION_FILE_EXTENSION = ".arrow"
+CATALOG_FILE_NAME = "catalog.db"
+LEGACY_MANIFEST_FILE_NAME = "versions.json"
+LEGACY_LOG_FILE_NAME = "execution_log.json"
+EXPORT_DIR_NAME = "exports"
+PROFILE_DIR_NAME = "profiles"
+CROSS_PRODUCTS_SUFFIX = ".cross"
+LOCK_FILE_NAME = ".lock"
+
+# Streamed versions may extend a dictionary column batch by batch
+_STREAM_WRITE_OPTIONS = pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+
+
+class VersionInUseError(ValueError):
+    pass
+
+
+def normalize_version(version: str) -> str:
+    """
+    Strip any file extension from a version identifier, so that
+    'v1_median_impute_Age', 'v1_median_impute_Age.csv' and
+    'v1_median_impute_Age.arrow' all address the same version.
+    """
+    for ext in (VERSION_FILE_EXTENSION, ".csv"):
+        if version.endswith(ext):
+            return version[: -len(ext)]
+    return version
+
+
+def extract_version_number(version: str) -> int:
+    """
+    Extract the version number from identifiers such as:
+    v0_raw
+    v1.csv
+    v10_drop_feature_Name
+    """
+    name = normalize_version(version)
+    if not name.startswith("v"):
+        raise ValueError(f"Invalid version identifier: {version}")
+
+    number_part = name[1:].split("_")[0]
+    return int(number_part)
+
+
+def get_dataset_dir(dataset_id: str) -> str:
+    dataset_dir = os.path.join(DATASET_STORAGE_PATH, dataset_id)
+    if not os.path.exists(dataset_dir):
+        raise FileNotFoundError("Dataset not found")
+    return dataset_dir
+
+
+def get_version_path(dataset_id: str, version: str) -> str:
+    dataset_dir = get_dataset_dir(dataset_id)
+    return os.path.join(
+        dataset_dir, normalize_version(version) + VERSION_FILE_EXTENSION
+    )
+
+
+# ---------- Concurrency ----------
+#
+# Operations that create or delete versions run under dataset_lock, an
+# flock on a file in the dataset directory, so they are serialized across
+# threads and across worker processes sharing the storage; the OS drops
+# the lock if its holder dies. Readers never lock: the catalog is read
+# from a WAL snapshot, data files are only ever replaced atomically, and
+# files that are open or memory-mapped stay readable after an undo
+# unlinks them.
+
+_held_locks = threading.local()
+_fallback_locks = {}
+_fallback_locks_guard = threading.Lock()
+
+
+@contextmanager
+def dataset_lock(dataset_id: str):
+    """
+    Hold the exclusive writer lock of a dataset. Re-entrant within a
+    thread.
+    """
+    held = _held_locks.__dict__.setdefault("datasets", set())
+    if dataset_id in held:
+        yield
+        return
+
+    lock_path = os.path.join(get_dataset_dir(dataset_id), LOCK_FILE_NAME)
+    held.add(dataset_id)
+    try:
+        if fcntl is None:
+            with _fallback_locks_guard:
+                lock = _fallback_locks.setdefault(
+                    dataset_id, threading.Lock()
+                )
+            with lock:
+                yield
+            return
+
+        with open(lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    finally:
+        held.discard(dataset_id)
+
+
+def _temp_path(path: str) -> str:
+    # Unique per call: server threads are reused across requests, so a
+    # thread id does not identify a write
+    return f"{path}.{uuid.uuid4().hex}.tmp"
+
+
+@contextmanager
+def _atomic_path(path: str):
+    """
+    Yield a temporary path to write to; it replaces `path` atomically on
+    success and is removed on error, so readers never see partial files.
+    """
+    tmp_path = _temp_path(path)
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+# ---------- Version catalog ----------
+#
+# Each version is a row of the per-dataset SQLite catalog (catalog.db):
+#   number    - version number, indexed for the latest-version lookup
+#   parent    - version this one was derived from (None for v0)
+#   columns   - full ordered column list of this version
+#   written   - columns stored in this version's own Arrow file
+#   dropped   - columns removed relative to the parent
+#   snapshot  - the Arrow file holds every column, lineage stops here
+#   content_hash - fingerprint of the version's data, derived from its
+#                  own file hash and its parent's content hash
+#   n_rows / n_cols - shape of the version
+#   bytes     - size of the version's own Arrow file (0 if it has none)
+#
+# A column of any version is read from the nearest ancestor that wrote
+# it, so a step only stores the columns it touched and a rollback is a
+# record pointing at an older version, with no data file at all.
+
+CATALOG_FIELDS = [
+    "version", "number", "parent", "columns", "written", "dropped",
+    "snapshot", "content_hash", "n_rows", "n_cols", "bytes", "created_at"
+]
+_CATALOG_LIST_FIELDS = ("columns", "written", "dropped")
+
+
+def _get_catalog_path(dataset_id: str) -> str:
+    return os.path.join(get_dataset_dir(dataset_id), CATALOG_FILE_NAME)
+
+
+def _connect_catalog(dataset_id: str) -> sqlite3.Connection:
+    catalog_path = _get_catalog_path(dataset_id)
+    is_new = not os.path.exists(catalog_path)
+
+    conn = sqlite3.connect(catalog_path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS versions (
+            version TEXT PRIMARY KEY,
+            number INTEGER NOT NULL,
+            parent TEXT,
+            columns TEXT NOT NULL,
+            written TEXT NOT NULL,
+            dropped TEXT NOT NULL,
+            snapshot INTEGER NOT NULL,
+            content_hash TEXT NOT NULL,
+            n_rows INTEGER NOT NULL,
+            n_cols INTEGER NOT NULL,
+            bytes INTEGER NOT NULL,
+            created_at TEXT NOT NULL
+        )
+        """
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_versions_number "
+        "ON versions (number)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_versions_parent "
+        "ON versions (parent)"
+    )
+
+    has_journal = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+        ("journal",)
+    ).fetchone() is not None
+    if not has_journal:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS journal (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                version TEXT NOT NULL,
+                action TEXT NOT NULL,
+                entry TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                undone_at TEXT
+            )
+            """
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_journal_version "
+            "ON journal (version)"
+        )
+
+    dataset_dir = os.path.dirname(catalog_path)
+    if is_new:
+        with conn:
+            _import_legacy_manifest(conn, dataset_dir)
+    if not has_journal:
+        with conn:
+            _import_legacy_log(conn, dataset_dir)
+    return conn
+
+
+def _import_legacy_manifest(conn: sqlite3.Connection, dataset_dir: str):
+    """
+    One-time import of the versions.json manifest that preceded the
+    catalog. Its records are in creation order, parents first.
+    """
+    manifest_path = os.path.join(dataset_dir, LEGACY_MANIFEST_FILE_NAME)
+    if not os.path.exists(manifest_path):
+        return
+
+    with open(manifest_path, "r") as f:
+        records = json.load(f)["versions"]
+
+    n_rows = {}
+    for record in records:
+        path = os.path.join(
+            dataset_dir, record["version"] + VERSION_FILE_EXTENSION
+        )
+        if record["snapshot"]:
+            n_rows[record["version"]] = _count_rows(path)
+        else:
+            n_rows[record["version"]] = n_rows[record["parent"]]
+
+        _insert_record(conn, {
+            **record,
+            "number": extract_version_number(record["version"]),
+            "n_rows": n_rows[record["version"]],
+            "n_cols": len(record["columns"]),
+            "bytes": os.path.getsize(path) if record["written"] else 0
+        })
+
+    os.replace(manifest_path, manifest_path + ".imported")
+
+
+@contextmanager
+def _open_catalog(dataset_id: str):
+    conn = _connect_catalog(dataset_id)
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def _row_to_record(row: sqlite3.Row) -> dict:
+    record = dict(row)
+    for field in _CATALOG_LIST_FIELDS:
+        record[field] = json.loads(record[field])
+    record["snapshot"] = bool(record["snapshot"])
+    return record
+
+
+def get_version_record(dataset_id: str, version: str) -> dict:
+    with _open_catalog(dataset_id) as conn:
+        row = conn.execute(
+            "SELECT * FROM versions WHERE version = ?",
+            (normalize_version(version),)
+        ).fetchone()
+
+    if row is None:
+        raise FileNotFoundError("Dataset version not found")
+    return _row_to_record(row)
+
+
+def get_version_columns(dataset_id: str, version: str) -> list[str]:
+    return get_version_record(dataset_id, version)["columns"]
+
+
+def get_content_hash(dataset_id: str, version: str) -> str:
+    return get_version_record(dataset_id, version)["content_hash"]
+
+
+def list_version_records(dataset_id: str) -> list[dict]:
+    """
+    Catalog records of every version, ordered by version number.
+    """
+    with _open_catalog(dataset_id) as conn:
+        rows = conn.execute(
+            "SELECT * FROM versions ORDER BY number, created_at"
+        ).fetchall()
+    return [_row_to_record(row) for row in rows]
+
+
+def list_versions(dataset_id: str) -> list[str]:
+    """
+    List version identifiers ordered by version number.
+    """
+    with _open_catalog(dataset_id) as conn:
+        rows = conn.execute(
+            "SELECT version FROM versions ORDER BY number, created_at"
+        ).fetchall()
+    return [row[0] for row in rows]
+
+
+def get_latest_version(dataset_id: str) -> str:
+    with _open_catalog(dataset_id) as conn:
+        row = conn.execute(
+            "SELECT version FROM versions "
+            "ORDER BY number DESC, created_at DESC LIMIT 1"
+        ).fetchone()
+
+    if row is None:
+        raise FileNotFoundError("No dataset versions found")
+    return row[0]
+
+
+def _load_lineage(dataset_id: str, version: str) -> dict:
+    """
+    Records of `version` and all of its ancestors, keyed by version.
+    """
+    with _open_catalog(dataset_id) as conn:
+        rows = conn.execute(
+            """
+            WITH RECURSIVE lineage(version) AS (
+                SELECT ?
+                UNION
+                SELECT v.parent FROM versions v
+                JOIN lineage l ON v.version = l.version
+                WHERE v.parent IS NOT NULL
+            )
+            SELECT v.* FROM versions v
+            JOIN lineage l ON v.version = l.version
+            """,
+            (normalize_version(version),)
+        ).fetchall()
+    return {row["version"]: _row_to_record(row) for row in rows}
+
+
+def _insert_record(conn: sqlite3.Connection, record: dict) -> None:
+    conn.execute(
+        f"INSERT INTO versions ({', '.join(CATALOG_FIELDS)}) "
+        f"VALUES ({', '.join('?' * len(CATALOG_FIELDS))})",
+        [
+            json.dumps(record[field]) if field in _CATALOG_LIST_FIELDS
+            else record[field]
+            for field in CATALOG_FIELDS
+        ]
+    )
+
+
+def _append_record(
+    dataset_id: str,
+    record: dict,
+    journal: list[dict] | None = None
+) -> None:
+    """
+    Register a version, together with the journal entries describing it,
+    in one catalog transaction.
+    """
+    record["number"] = extract_version_number(record["version"])
+    record["n_cols"] = len(record["columns"])
+    record["created_at"] = datetime.utcnow().isoformat()
+
+    try:
+        with _open_catalog(dataset_id) as conn:
+            _insert_record(conn, record)
+            if journal:
+                _insert_journal_entries(conn, journal)
+    except sqlite3.IntegrityError:
+        raise ValueError(f"Version '{record['version']}' already exists")
+
+
+def _ensure_new_version(dataset_id: str, version: str) -> None:
+    """
+    Refuse to write files for a version that already exists, before they
+    could replace the files of that version.
+    """
+    with _open_catalog(dataset_id) as conn:
+        row = conn.execute(
+            "SELECT 1 FROM versions WHERE version = ?", (version,)
+        ).fetchone()
+    if row is not None:
+        raise ValueError(f"Version '{version}' already exists")
+
+
+# ---------- Execution journal ----------
+#
+# Executed steps, rollbacks and pipelines are appended to the journal
+# table of the catalog, one row per version they created. Rows are never
+# rewritten: undo only stamps undone_at, so the history stays auditable
+# while the active log skips undone entries.
+
+def _import_legacy_log(conn: sqlite3.Connection, dataset_dir: str):
+    """
+    One-time import of the execution_log.json file that preceded the
+    journal.
+    """
+    log_path = os.path.join(dataset_dir, LEGACY_LOG_FILE_NAME)
+    if not os.path.exists(log_path):
+        return
+
+    with open(log_path, "r") as f:
+        entries = json.load(f)
+
+    _insert_journal_entries(conn, entries)
+    os.replace(log_path, log_path + ".imported")
+
+
+def _insert_journal_entries(conn: sqlite3.Connection, entries: list):
+    conn.executemany(
+        "INSERT INTO journal (version, action, entry, created_at) "
+        "VALUES (?, ?, ?, ?)",
+        [
+            (
+                entry["version"],
+                entry["action"],
+                json.dumps(entry, default=str),
+                entry.get("timestamp") or datetime.utcnow().isoformat()
+            )
+            for entry in entries
+        ]
+    )
+
+
+def append_journal(dataset_id: str, entries: list[dict]) -> None:
+    """
+    Atomically append log entries; each needs "version" and "action".
+    """
+    with _open_catalog(dataset_id) as conn:
+        _insert_journal_entries(conn, entries)
+
+
+def read_journal(dataset_id: str, tail: int | None = None) -> list[dict]:
+    """
+    Active (not undone) journal entries, oldest first; with `tail` only
+    the last `tail` of them, read from the end of the index.
+    """
+    query = (
+        "SELECT entry FROM journal WHERE undone_at IS NULL "
+        "ORDER BY seq DESC"
+    )
+    params = ()
+    if tail is not None:
+        query += " LIMIT ?"
+        params = (tail,)
+
+    with _open_catalog(dataset_id) as conn:
+        rows = conn.execute(query, params).fetchall()
+    return [json.loads(row[0]) for row in reversed(rows)]
+
+
+def count_journal(dataset_id: str) -> int:
+    with _open_catalog(dataset_id) as conn:
+        return conn.execute(
+            "SELECT COUNT(*) FROM journal WHERE undone_at IS NULL"
+        ).fetchone()[0]
+
+
+def get_journal_entry(dataset_id: str, version: str) -> dict | None:
+    """
+    The active journal entry that created `version`, if any.
+    """
+    with _open_catalog(dataset_id) as conn:
+        row = conn.execute(
+            "SELECT entry FROM journal "
+            "WHERE version = ? AND undone_at IS NULL "
+            "ORDER BY seq DESC LIMIT 1",
+            (normalize_version(version),)
+        ).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+# ---------- Arrow conversion ----------
+
+def dataframe_to_table(df: pd.DataFrame) -> pa.Table:
+    """
+    Convert a DataFrame to an Arrow table without the pandas schema
+    metadata, which goes stale as soon as a step changes a column dtype.
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    return table.replace_schema_metadata(None)
+
+
+def series_to_array(series: pd.Series) -> pa.Array:
+    return pa.Array.from_pandas(series)
+
+
+# Strings stay in Arrow memory (for versions, the memory-mapped file)
+# instead of becoming one Python object per value; missing values are
+# NaN, as in object columns.
+_ARROW_STRING_DTYPE = pd.StringDtype("pyarrow", na_value=np.nan)
+
+
+def _pandas_type(arrow_type: pa.DataType):
+    if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+        return _ARROW_STRING_DTYPE
+    return None
+
+
+def table_to_dataframe(table: pa.Table | pa.RecordBatch) -> pd.DataFrame:
+    """
+    Convert Arrow data to pandas keeping the stored schema: compact
+    numeric types as they are, strings Arrow-backed and dictionary
+    columns as categoricals, with categories sorted so that results do
+    not depend on the order values were first seen in.
+    """
+    df = table.to_pandas(types_mapper=_pandas_type)
+    for col, dtype in df.dtypes.items():
+        if (
+            isinstance(dtype, pd.CategoricalDtype)
+            and not dtype.categories.is_monotonic_increasing
+        ):
+            df[col] = df[col].cat.reorder_categories(
+                dtype.categories.sort_values()
+            )
+    return df
+
+
+def _read_arrow_file(path: str, columns: list[str]) -> pa.Table:
+    with pa.memory_map(path, "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+    return table.select(columns)
+
+
+def _write_arrow_file(path: str, table: pa.Table) -> str:
+    with _atomic_path(path) as tmp_path:
+        _write_stored_table(tmp_path, _storage_table(table))
+        file_hash = _hash_file(tmp_path)
+    return file_hash
+
+
+def _write_stored_table(path: str, table: pa.Table) -> None:
+    with pa.OSFile(path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+def _count_rows(path: str) -> int:
+    with pa.memory_map(path, "r") as source:
+        reader = pa.ipc.open_file(source)
+        return sum(
+            reader.get_batch(i).num_rows
+            for i in range(reader.num_record_batches)
+        )
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _content_hash(
+    parent_hash: str | None,
+    columns: list[str],
+    file_hash: str | None
+) -> str:
+    payload = json.dumps([parent_hash, columns, file_hash])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+# ---------- Storage layout ----------
+#
+# A version file holds a single record batch, so each column is one
+# contiguous array, and missing floats are stored as NaN, with no
+# validity bitmap. Numeric columns without missing values (all float
+# columns) are then read as zero-copy NumPy views of the memory-mapped
+# file: concurrent requests on a dataset share one copy of them, the
+# page cache. Integer columns with missing values, other types, and
+# files written in batches before this layout go through the Arrow
+# conversion. Exports turn the NaNs back into nulls.
+
+def _is_fixed_numeric(data_type: pa.DataType) -> bool:
+    return pa.types.is_integer(data_type) or pa.types.is_floating(data_type)
+
+
+def _nan_filled(column: pa.ChunkedArray | pa.Array):
+    if pa.types.is_floating(column.type) and column.null_count:
+        return pc.fill_null(column, np.nan)
+    return column
+
+
+def _storage_table(table: pa.Table) -> pa.Table:
+    table = table.combine_chunks()
+    return pa.Table.from_arrays(
+        [_nan_filled(column) for column in table.columns],
+        schema=table.schema
+    )
+
+
+def _compact_file(staged_path: str, path: str) -> None:
+    """
+    Rewrite a file written batch by batch in the storage layout. Numeric
+    columns are assembled in a scratch file rather than in memory, so
+    compacting a large upload takes about as much memory as its text
+    columns.
+    """
+    with pa.memory_map(staged_path, "r") as source:
+        staged = pa.ipc.open_file(source).read_all()
+
+    n_rows = staged.num_rows
+    numeric = [
+        i for i, column in enumerate(staged.columns)
+        if n_rows and _is_fixed_numeric(column.type)
+        and (pa.types.is_floating(column.type) or not column.null_count)
+    ]
+    if not numeric:
+        _write_stored_table(path, _storage_table(staged))
+        return
+
+    # 64-byte aligned slots, one per numeric column
+    slots = {}
+    size = 0
+    for i in numeric:
+        slots[i] = size
+        nbytes = n_rows * staged.schema.field(i).type.bit_width // 8
+        size += -(-nbytes // 64) * 64
+
+    scratch_path = f"{_temp_path(path)}.scratch"
+    scratch = np.memmap(scratch_path, dtype=np.uint8, mode="w+", shape=size)
+    arrays = []
+    values = None
+    try:
+        for i, column in enumerate(staged.columns):
+            if i not in slots:
+                arrays.append(_nan_filled(column.combine_chunks()))
+                continue
+
+            dtype = np.dtype(column.type.to_pandas_dtype())
+            values = scratch[slots[i]:].view(dtype)[:n_rows]
+            start = 0
+            for chunk in column.chunks:
+                values[start:start + len(chunk)] = (
+                    chunk.to_numpy(zero_copy_only=False)
+                )
+                start += len(chunk)
+            arrays.append(pa.Array.from_buffers(
+                column.type, n_rows, [None, pa.py_buffer(values)]
+            ))
+
+        _write_stored_table(
+            path, pa.Table.from_arrays(arrays, schema=staged.schema)
+        )
+    finally:
+        # Unmapped before removal, which Windows requires
+        arrays.clear()
+        del scratch, values
+        os.remove(scratch_path)
+
+
+def _numpy_view(column: pa.ChunkedArray) -> np.ndarray | None:
+    """
+    Read-only view of a stored numeric column, or None when it has no
+    single contiguous buffer without missing values.
+    """
+    if (
+        column.num_chunks != 1
+        or column.null_count
+        or not _is_fixed_numeric(column.type)
+    ):
+        return None
+    return column.chunk(0).to_numpy(zero_copy_only=True)
+
+
+# ---------- Reading ----------
+
+def _resolve_column_sources(
+    records: dict,
+    version: str,
+    columns: list[str]
+) -> dict:
+    """
+    Map each requested column to the version whose Arrow file holds its
+    data, walking the lineage from `version` back to the last snapshot.
+    """
+    sources = {}
+    remaining = list(columns)
+    record = records[version]
+
+    while remaining:
+        if record["snapshot"]:
+            written = set(record["columns"])
+        else:
+            written = set(record["written"])
+
+        found = [c for c in remaining if c in written]
+        if found:
+            sources[record["version"]] = found
+            remaining = [c for c in remaining if c not in written]
+
+        if not remaining:
+            break
+        if record["snapshot"] or record["parent"] is None:
+            raise ValueError(
+                f"Columns {remaining} cannot be resolved for {version}"
+            )
+        record = records[record["parent"]]
+
+    return sources
+
+
+def _locate_columns(
+    dataset_id: str,
+    version: str,
+    columns: list[str] | None
+) -> tuple[list[str], dict]:
+    """
+    The requested columns of a version (all by default) and the versions
+    whose files hold them.
+    """
+    version = normalize_version(version)
+    records = _load_lineage(dataset_id, version)
+    if version not in records:
+        raise FileNotFoundError("Dataset version not found")
+
+    available = records[version]["columns"]
+    if columns is None:
+        columns = available
+    else:
+        missing = [c for c in columns if c not in available]
+        if missing:
+            raise ValueError(f"Feature '{missing[0]}' not found")
+
+    return columns, _resolve_column_sources(records, version, columns)
+
+
+def read_version_table(
+    dataset_id: str,
+    version: str,
+    columns: list[str] | None = None
+) -> pa.Table:
+    """
+    Rebuild a version as an Arrow table from its lineage. Files are
+    memory-mapped, so only the requested columns are paged in from disk.
+    """
+    columns, sources = _locate_columns(dataset_id, version, columns)
+
+    arrays = {}
+    for source_version, source_columns in sources.items():
+        path = get_version_path(dataset_id, source_version)
+        source_table = _read_arrow_file(path, source_columns)
+        for col in source_columns:
+            arrays[col] = source_table.column(col)
+
+    return pa.Table.from_arrays(
+        [arrays[col] for col in columns], names=list(columns)
+    )
+
+
+def get_version_schema(dataset_id: str, version: str) -> pa.Schema:
+    """
+    Arrow schema of a version, from the file footers only; no column data
+    is read.
+    """
+    version = normalize_version(version)
+    records = _load_lineage(dataset_id, version)
+    if version not in records:
+        raise FileNotFoundError("Dataset version not found")
+
+    columns = records[version]["columns"]
+    fields = {}
+    sources = _resolve_column_sources(records, version, columns)
+    for source_version, source_columns in sources.items():
+        path = get_version_path(dataset_id, source_version)
+        with pa.memory_map(path, "r") as source:
+            schema = pa.ipc.open_file(source).schema
+        for col in source_columns:
+            fields[col] = schema.field(col)
+
+    return pa.schema([fields[col] for col in columns])
+
+
+def get_column_fingerprints(dataset_id: str, version: str) -> dict:
+    """
+    Identify the data of each column of a version: the version file
+    holding it and that version's content hash. A column keeps its
+    fingerprint until a step rewrites it.
+    """
+    version = normalize_version(version)
+    records = _load_lineage(dataset_id, version)
+    if version not in records:
+        raise FileNotFoundError("Dataset version not found")
+
+    sources = _resolve_column_sources(
+        records, version, records[version]["columns"]
+    )
+    return {
+        col: f"{source}:{records[source]['content_hash']}"
+        for source, source_columns in sources.items()
+        for col in source_columns
+    }
+
+
+def read_version(
+    dataset_id: str,
+    version: str,
+    columns: list[str] | None = None
+) -> pd.DataFrame:
+    """
+    Load a version, or some of its columns, as a DataFrame. Numeric
+    columns are read-only views of the memory-mapped version files; the
+    others are converted from Arrow.
+    """
+    columns, sources = _locate_columns(dataset_id, version, columns)
+
+    data = {}
+    for source_version, source_columns in sources.items():
+        path = get_version_path(dataset_id, source_version)
+        table = _read_arrow_file(path, source_columns)
+
+        rest = []
+        for col in source_columns:
+            view = _numpy_view(table.column(col))
+            if view is None:
+                rest.append(col)
+            else:
+                data[col] = view
+        if rest:
+            data.update(table_to_dataframe(table.select(rest)))
+
+    # copy=False keeps one block per view instead of consolidating them
+    return pd.DataFrame({col: data[col] for col in columns}, copy=False)
+
+
+# ---------- Writing ----------
+
+def _snapshot_record(
+    version: str,
+    parent: str | None,
+    columns: list[str],
+    file_hash: str,
+    n_rows: int,
+    path: str
+) -> dict:
+    return {
+        "version": version,
+        "parent": normalize_version(parent) if parent else None,
+        "columns": columns,
+        "written": columns,
+        "dropped": [],
+        "snapshot": True,
+        "content_hash": _content_hash(None, columns, file_hash),
+        "n_rows": n_rows,
+        "bytes": os.path.getsize(path)
+    }
+
+
+def write_version(
+    dataset_id: str,
+    version: str,
+    data: pd.DataFrame | pa.Table,
+    parent: str | None = None
+) -> str:
+    """
+    Persist a full snapshot version as an uncompressed Arrow IPC file,
+    which keeps dtypes intact and can be memory-mapped on read. Used for
+    v0 and for any step that changes the rows of the dataset.
+    """
+    if isinstance(data, pd.DataFrame):
+        data = dataframe_to_table(data)
+
+    version = normalize_version(version)
+    _ensure_new_version(dataset_id, version)
+    path = get_version_path(dataset_id, version)
+    file_hash = _write_arrow_file(path, data)
+
+    _append_record(dataset_id, _snapshot_record(
+        version, parent, data.column_names, file_hash, data.num_rows, path
+    ))
+    return version
+
+
+@contextmanager
+def write_version_stream(
+    dataset_id: str,
+    version: str,
+    schema: pa.Schema,
+    parent: str | None = None
+):
+    """
+    Write a snapshot version batch by batch. Yields an Arrow IPC writer;
+    the file only appears, and the version is only registered, once the
+    block exits cleanly. Dictionary columns may grow from batch to batch,
+    as long as earlier entries keep their positions. The batches are
+    staged in a scratch file and compacted into the storage layout.
+    """
+    version = normalize_version(version)
+    _ensure_new_version(dataset_id, version)
+    path = get_version_path(dataset_id, version)
+
+    with _atomic_path(path) as tmp_path:
+        staged_path = f"{tmp_path}.staged"
+        try:
+            with pa.OSFile(staged_path, "wb") as sink:
+                with pa.ipc.new_file(
+                    sink, schema, options=_STREAM_WRITE_OPTIONS
+                ) as writer:
+                    yield writer
+            _compact_file(staged_path, tmp_path)
+        finally:
+            if os.path.exists(staged_path):
+                os.remove(staged_path)
+        file_hash = _hash_file(tmp_path)
+        n_rows = _count_rows(tmp_path)
+
+    _append_record(dataset_id, _snapshot_record(
+        version, parent, schema.names, file_hash, n_rows, path
+    ))
+
+
+def write_delta(
+    dataset_id: str,
+    version: str,
+    parent: str,
+    changed: pd.DataFrame | pa.Table | None = None,
+    dropped: list[str] | None = None,
+    journal: list[dict] | None = None
+) -> str:
+    """
+    Persist a copy-on-write version holding only the columns a step
+    changed or added, plus drop markers for removed columns. Changed
+    columns keep their position, new columns are appended. `journal`
+    entries are committed together with the version.
+    """
+    if isinstance(changed, pd.DataFrame):
+        changed = dataframe_to_table(changed)
+
+    version = normalize_version(version)
+    parent = normalize_version(parent)
+    dropped = list(dropped or [])
+    _ensure_new_version(dataset_id, version)
+
+    parent_record = get_version_record(dataset_id, parent)
+    columns = [c for c in parent_record["columns"] if c not in dropped]
+    written = changed.column_names if changed is not None else []
+    columns += [c for c in written if c not in columns]
+
+    if written and changed.num_rows != parent_record["n_rows"]:
+        raise ValueError(
+            f"Changed columns have {changed.num_rows} rows, "
+            f"expected {parent_record['n_rows']}"
+        )
+
+    file_hash = None
+    n_bytes = 0
+    if written:
+        path = get_version_path(dataset_id, version)
+        file_hash = _write_arrow_file(path, changed)
+        n_bytes = os.path.getsize(path)
+
+    _append_record(dataset_id, {
+        "version": version,
+        "parent": parent,
+        "columns": columns,
+        "written": written,
+        "dropped": dropped,
+        "snapshot": False,
+        "content_hash": _content_hash(
+            parent_record["content_hash"], columns, file_hash
+        ),
+        "n_rows": parent_record["n_rows"],
+        "bytes": n_bytes
+    }, journal)
+    return version
+
+
+def write_pointer(
+    dataset_id: str,
+    version: str,
+    target: str,
+    journal: list[dict] | None = None
+) -> str:
+    """
+    Create a version that is identical to `target` without copying data.
+    """
+    target = normalize_version(target)
+    version = normalize_version(version)
+    target_record = get_version_record(dataset_id, target)
+
+    _append_record(dataset_id, {
+        "version": version,
+        "parent": target,
+        "columns": target_record["columns"],
+        "written": [],
+        "dropped": [],
+        "snapshot": False,
+        "content_hash": target_record["content_hash"],
+        "n_rows": target_record["n_rows"],
+        "bytes": 0
+    }, journal)
+    return version
+
+
+def delete_version(dataset_id: str, version: str) -> None:
+    """
+    Remove a version that no other version derives from, marking the
+    journal entries that created it as undone in the same transaction.
+    Its files are unlinked afterwards; readers holding them open keep
+    their snapshot.
+    """
+    version = normalize_version(version)
+
+    with _open_catalog(dataset_id) as conn:
+        child = conn.execute(
+            "SELECT 1 FROM versions WHERE parent = ? LIMIT 1", (version,)
+        ).fetchone()
+        if child is not None:
+            raise VersionInUseError(
+                f"Version '{version}' is referenced by a later version"
+            )
+        conn.execute("DELETE FROM versions WHERE version = ?", (version,))
+        conn.execute(
+            "UPDATE journal SET undone_at = ? "
+            "WHERE version = ? AND undone_at IS NULL",
+            (datetime.utcnow().isoformat(), version)
+        )
+
+    path = get_version_path(dataset_id, version)
+    if os.path.exists(path):
+        os.remove(path)
+
+    shutil.rmtree(_get_export_dir(dataset_id, version), ignore_errors=True)
+
+    for profile_path in (
+        _get_profile_path(dataset_id, version),
+        _get_cross_products_path(dataset_id, version)
+    ):
+        if os.path.exists(profile_path):
+            os.remove(profile_path)
+
+
+# ---------- Stored profiles ----------
+
+def _get_profile_path(dataset_id: str, version: str) -> str:
+    dataset_dir = get_dataset_dir(dataset_id)
+    return os.path.join(
+        dataset_dir,
+        PROFILE_DIR_NAME,
+        normalize_version(version) + VERSION_FILE_EXTENSION
+    )
+
+
+def save_profile(
+    dataset_id: str,
+    version: str,
+    profile: DatasetProfile
+) -> None:
+    """
+    Store the target-independent part of a profile next to its version,
+    tagged with the version's content hash.
+    """
+    path = _get_profile_path(dataset_id, version)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    table = pa.Table.from_pandas(
+        profile.columns.rename_axis("feature").reset_index(),
+        preserve_index=False
+    )
+    metadata = {
+        "n_rows": str(profile.n_rows),
+        "duplicate_count": str(profile.duplicate_count),
+        "content_hash": get_content_hash(dataset_id, version)
+    }
+    if profile.vif is not None:
+        metadata["vif"] = json.dumps(profile.vif)
+    _write_arrow_file(path, table.replace_schema_metadata(metadata))
+
+    if profile.cross_products is not None and profile.cross_products.columns:
+        _save_cross_products(dataset_id, version, profile.cross_products)
+
+
+def load_profile(dataset_id: str, version: str) -> DatasetProfile | None:
+    """
+    Return the stored profile of a version, or None when there is none
+    or it was computed for different content.
+    """
+    path = _get_profile_path(dataset_id, version)
+    if not os.path.exists(path):
+        return None
+
+    with pa.memory_map(path, "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+
+    metadata = {
+        key.decode(): value.decode()
+        for key, value in (table.schema.metadata or {}).items()
+    }
+    if metadata.get("content_hash") != get_content_hash(dataset_id, version):
+        return None
+
+    columns = table.to_pandas().set_index("feature")
+    columns.index = columns.index.astype(object)
+    columns.index.name = None
+
+    return DatasetProfile(
+        n_rows=int(metadata["n_rows"]),
+        duplicate_count=int(metadata["duplicate_count"]),
+        columns=columns[PROFILE_FIELDS],
+        vif=json.loads(metadata["vif"]) if "vif" in metadata else None
+    )
+
+
+def _get_cross_products_path(dataset_id: str, version: str) -> str:
+    dataset_dir = get_dataset_dir(dataset_id)
+    return os.path.join(
+        dataset_dir,
+        PROFILE_DIR_NAME,
+        normalize_version(version) + CROSS_PRODUCTS_SUFFIX
+        + VERSION_FILE_EXTENSION
+    )
+
+
+def _save_cross_products(
+    dataset_id: str,
+    version: str,
+    products: CrossProducts
+) -> None:
+    """
+    Store a profile's cross products as one row per column, tagged with
+    the version's content hash like the profile itself.
+    """
+    k = len(products.columns)
+    table = pa.table({
+        "feature": pa.array(products.columns, type=pa.string()),
+        "shift": products.shift,
+        "sums": products.sums,
+        "cross": pa.FixedSizeListArray.from_arrays(
+            pa.array(products.cross.reshape(-1)), k
+        )
+    })
+    metadata = {
+        "count": str(products.count),
+        "content_hash": get_content_hash(dataset_id, version)
+    }
+    _write_arrow_file(
+        _get_cross_products_path(dataset_id, version),
+        table.replace_schema_metadata(metadata)
+    )
+
+
+def load_cross_products(
+    dataset_id: str,
+    version: str
+) -> CrossProducts | None:
+    """
+    Return the stored cross products of a version's numeric columns, or
+    None when there are none for its current content.
+    """
+    path = _get_cross_products_path(dataset_id, version)
+    if not os.path.exists(path):
+        return None
+
+    with pa.memory_map(path, "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+
+    metadata = table.schema.metadata or {}
+    content_hash = metadata.get(b"content_hash", b"").decode()
+    if content_hash != get_content_hash(dataset_id, version):
+        return None
+
+    k = table.num_rows
+    return CrossProducts(
+        columns=table["feature"].to_pylist(),
+        count=int(metadata[b"count"]),
+        shift=table["shift"].to_numpy(),
+        sums=table["sums"].to_numpy(),
+        cross=table["cross"].combine_chunks().flatten().to_numpy().reshape(
+            k, k
+        )
+    )
+
+
+# ---------- Exports ----------
+#
+# Versions are downloaded as CSV (optionally gzip or zstd compressed),
+# Parquet or Arrow. Encoding streams batch by batch from the mapped
+# version, and the encoded bytes are kept under exports/<version>/ so
+# later downloads, and ranges of them, are served from the file. The
+# file name carries the content hash, so an artifact written for earlier
+# content under the same version name is never served.
+
+# Compressions each format accepts; the first one is the default
+EXPORT_COMPRESSIONS = {
+    "csv": ("none", "gzip", "zstd"),
+    "parquet": ("zstd", "snappy", "gzip", "none"),
+    "arrow": ("none", "zstd", "lz4")
+}
+
+# Rows encoded per batch; each batch is handed out as soon as it is
+EXPORT_BATCH_ROWS = 100_000
+
+_EXPORT_SUFFIXES = {
+    ("csv", "none"): ".csv",
+    ("csv", "gzip"): ".csv.gz",
+    ("csv", "zstd"): ".csv.zst"
+}
+
+_EXPORT_MEDIA_TYPES = {
+    ("csv", "none"): "text/csv",
+    ("csv", "gzip"): "application/gzip",
+    ("csv", "zstd"): "application/zstd",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.file"
+}
+
+
+def resolve_export_format(
+    file_format: str,
+    compression: str | None = None
+) -> tuple[str, str]:
+    """
+    Validate a format and compression, filling in the format's default
+    compression.
+    """
+    if file_format not in EXPORT_COMPRESSIONS:
+        raise ValueError(
+            f"Unsupported format '{file_format}'; expected one of "
+            f"{', '.join(EXPORT_COMPRESSIONS)}"
+        )
+    allowed = EXPORT_COMPRESSIONS[file_format]
+    if compression is None:
+        return file_format, allowed[0]
+    if compression not in allowed:
+        raise ValueError(
+            f"Unsupported compression '{compression}' for {file_format}; "
+            f"expected one of {', '.join(allowed)}"
+        )
+    return file_format, compression
+
+
+def export_suffix(file_format: str, compression: str) -> str:
+    return _EXPORT_SUFFIXES.get((file_format, compression), f".{file_format}")
+
+
+def export_media_type(file_format: str, compression: str) -> str:
+    return _EXPORT_MEDIA_TYPES.get(
+        (file_format, compression), _EXPORT_MEDIA_TYPES.get(file_format)
+    )
+
+
+def _get_export_dir(dataset_id: str, version: str) -> str:
+    dataset_dir = get_dataset_dir(dataset_id)
+    return os.path.join(
+        dataset_dir, EXPORT_DIR_NAME, normalize_version(version)
+    )
+
+
+def get_export_path(
+    dataset_id: str,
+    version: str,
+    file_format: str,
+    compression: str
+) -> str:
+    content_hash = get_content_hash(dataset_id, version)
+    return os.path.join(
+        _get_export_dir(dataset_id, version),
+        f"{content_hash[:16]}-{compression}.{file_format}"
+    )
+
+
+def export_version(
+    dataset_id: str,
+    version: str,
+    file_format: str = "csv",
+    compression: str | None = None
+) -> str:
+    """
+    Path of a version encoded in the given format, encoding it first
+    when it is not cached yet.
+    """
+    file_format, compression = resolve_export_format(file_format, compression)
+    export_path = get_export_path(
+        dataset_id, version, file_format, compression
+    )
+    if not os.path.exists(export_path):
+        for _ in stream_export(dataset_id, version, file_format, compression):
+            pass
+    return export_path
+
+
+def stream_export(
+    dataset_id: str,
+    version: str,
+    file_format: str = "csv",
+    compression: str | None = None
+):
+    """
+    Encode a version batch by batch, yielding the bytes as they are
+    produced, and cache them once the encoding completes. Nothing is
+    cached when the consumer stops early.
+    """
+    file_format, compression = resolve_export_format(file_format, compression)
+    export_path = get_export_path(
+        dataset_id, version, file_format, compression
+    )
+    table = read_version_table(dataset_id, version)
+    os.makedirs(os.path.dirname(export_path), exist_ok=True)
+
+    encode_seconds = 0.0
+    # Overlapping downloads of one artifact each encode into their own
+    # file, published only once the encoding ran to completion
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(export_path),
+        prefix=f"{os.path.basename(export_path)}.",
+        suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            chunks = _ENCODERS[file_format](table, compression)
+            while True:
+                start = time.perf_counter()
+                chunk = next(chunks, None)
+                encode_seconds += time.perf_counter() - start
+                if chunk is None:
+                    break
+                if chunk:
+                    f.write(chunk)
+                    yield chunk
+        try:
+            os.replace(tmp_path, export_path)
+        except FileNotFoundError:
+            pass  # the version was deleted while it was being encoded
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    record_stage("export", encode_seconds, table.num_rows)
+
+
+class _ChunkSink:
+    """
+    Writable file object collecting what an encoder writes until it is
+    taken, so encoded bytes can be handed out between batches.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def writable(self) -> bool:
+        return True
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _encode_csv(table: pa.Table, compression: str):
+    sink = _ChunkSink()
+    stream = sink
+    if compression != "none":
+        stream = pa.CompressedOutputStream(sink, compression)
+
+    header = pd.DataFrame(columns=table.column_names).to_csv(index=False)
+    stream.write(header.encode())
+    for batch in _export_batches(table):
+        stream.write(
+            _csv_frame(batch).to_csv(index=False, header=False).encode()
+        )
+        yield sink.take()
+
+    stream.close()
+    yield sink.take()
+
+
+def _encode_parquet(table: pa.Table, compression: str):
+    sink = _ChunkSink()
+    # One row group per batch, written as soon as the batch is encoded
+    with pq.ParquetWriter(sink, table.schema, compression=compression) as w:
+        for batch in _export_batches(table):
+            w.write_batch(batch)
+            yield sink.take()
+    yield sink.take()
+
+
+def _encode_arrow(table: pa.Table, compression: str):
+    sink = _ChunkSink()
+    options = pa.ipc.IpcWriteOptions(
+        compression=None if compression == "none" else compression,
+        emit_dictionary_deltas=True
+    )
+    # An IPC file holds a single dictionary per field, only ever extended
+    if any(pa.types.is_dictionary(field.type) for field in table.schema):
+        table = table.unify_dictionaries()
+
+    with pa.ipc.new_file(sink, table.schema, options=options) as writer:
+        for batch in _export_batches(table):
+            writer.write_batch(batch)
+            yield sink.take()
+    yield sink.take()
+
+
+def _export_batches(table: pa.Table):
+    """
+    A version in batches, with missing floats as nulls again.
+    """
+    for batch in table.to_batches(max_chunksize=EXPORT_BATCH_ROWS):
+        yield pa.RecordBatch.from_arrays(
+            [_float_nulls(column) for column in batch.columns],
+            schema=batch.schema
+        )
+
+
+def _float_nulls(array: pa.Array) -> pa.Array:
+    if not pa.types.is_floating(array.type):
+        return array
+    return pc.if_else(pc.is_nan(array), pa.scalar(None, array.type), array)
+
+
+_ENCODERS = {
+    "csv": _encode_csv,
+    "parquet": _encode_parquet,
+    "arrow": _encode_arrow
+}
+
+
+def _csv_frame(batch: pa.RecordBatch) -> pd.DataFrame:
+    """
+    A batch as pandas for CSV output. float32 columns are written as
+    float64: their values are exactly those parsed at ingestion, and
+    float64 text reads back as the same values.
+    """
+    df = batch.to_pandas()
+    float32_cols = df.columns[df.dtypes == np.float32]
+    if len(float32_cols):
+        df[float32_cols] = df[float32_cols].astype(np.float64)
+    return df
@@ -1,42 +1,42 @@
-import os
-import json
-import shutil
 from datetime import datetime
 
-DATASET_STORAGE_PATH = "app/storage/datasets"
+from app.services.storage_service import (
+    get_latest_version,
+    list_versions,
+    extract_version_number,
+    normalize_version,
+    delete_version,
+    write_pointer,
+    read_journal,
+    load_profile,
+    save_profile,
+    dataset_lock
+)
+from app.services.cache_service import invalidate_analysis_cache
 
 
 def rollback_to_version(dataset_id: str, target_version: str) -> dict:
     """
-    Rollback dataset to a previous version by creating a new version copy.
+    Rollback dataset to a previous version by creating a new version
+    that points at it. No data is copied.
     """
+    with dataset_lock(dataset_id):
+        return _rollback_to_version(dataset_id, target_version)
 
-    dataset_dir = os.path.join(DATASET_STORAGE_PATH, dataset_id)
-    if not os.path.exists(dataset_dir):
-        raise FileNotFoundError("Dataset not found")
 
-    target_path = os.path.join(dataset_dir, target_version)
-    if not os.path.exists(target_path):
+def _rollback_to_version(dataset_id: str, target_version: str) -> dict:
+    target_version = normalize_version(target_version)
+
+    if target_version not in list_versions(dataset_id):
         raise FileNotFoundError("Target version does not exist")
 
     # ---------- Determine next version ----------
-    versions = sorted(
-        f for f in os.listdir(dataset_dir)
-        if f.endswith(".csv") and f.split("_")[0].startswith("v")
-    )
-
-    latest_version = versions[-1]
-    next_version_number = int(latest_version[1]) + 1
-    new_version_name = f"v{next_version_number}_rollback_to_{target_version.replace('.csv','')}.csv"
-
-    new_version_path = os.path.join(dataset_dir, new_version_name)
-
-    # ---------- Create rollback version ----------
-    shutil.copyfile(target_path, new_version_path)
+    latest_version = get_latest_version(dataset_id)
+    next_version_number = extract_version_number(latest_version) + 1
+    new_version_name = f"v{next_version_number}_rollback_to_{target_version}"
 
-    # ---------- Log rollback ----------
-    log_path = os.path.join(dataset_dir, "execution_log.json")
-    rollback_entry = {
+    # ---------- Create and log rollback version ----------
+    write_pointer(dataset_id, new_version_name, target_version, journal=[{
         "version": new_version_name,
         "action": "rollback",
         "params": {
@@ -44,18 +44,12 @@ def rollback_to_version(dataset_id: str, target_version: str) -> dict:
         },
         "description": f"Rolled back to {target_version}",
         "timestamp": datetime.utcnow().isoformat()
-    }
-
-    if os.path.exists(log_path):
-        with open(log_path, "r") as f:
-            logs = json.load(f)
-    else:
-        logs = []
+    }])
 
-    logs.append(rollback_entry)
-
-    with open(log_path, "w") as f:
-        json.dump(logs, f, indent=2)
+    # Same content, so the target's profile applies as is
+    profile = load_profile(dataset_id, target_version)
+    if profile is not None:
+        save_profile(dataset_id, new_version_name, profile)
 
     return {
         "dataset_id": dataset_id,
@@ -64,28 +58,21 @@ def rollback_to_version(dataset_id: str, target_version: str) -> dict:
     }
 
 def undo_last_execution(dataset_id: str) -> dict:
-    dataset_dir = os.path.join(DATASET_STORAGE_PATH, dataset_id)
-    log_path = os.path.join(dataset_dir, "execution_log.json")
+    with dataset_lock(dataset_id):
+        return _undo_last_execution(dataset_id)
 
-    if not os.path.exists(log_path):
-        raise ValueError("No execution history found")
 
-    with open(log_path, "r") as f:
-        logs = json.load(f)
+def _undo_last_execution(dataset_id: str) -> dict:
+    last_steps = read_journal(dataset_id, tail=1)
 
-    if not logs:
+    if not last_steps:
         raise ValueError("No execution to undo")
 
-    last_step = logs.pop()
-
-    # Remove dataset version file
-    version_file = os.path.join(dataset_dir, last_step["version"])
-    if os.path.exists(version_file):
-        os.remove(version_file)
+    last_step = last_steps[0]
 
-    # Save updated log
-    with open(log_path, "w") as f:
-        json.dump(logs, f, indent=2)
+    # Remove the version; its journal entry is kept, marked as undone
+    delete_version(dataset_id, last_step["version"])
+    invalidate_analysis_cache(dataset_id, last_step["version"])
 
     return {
         "undone_version": last_step["version"],
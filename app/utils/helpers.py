@@ -0,0 +1,101 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+import numpy as np
+import orjson
+
+
+def json_default(value):
+    """
+    `default=` hook for json.dump(s) that unwraps NumPy scalars.
+    """
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def dumps_json(value) -> bytes:
+    """
+    Encode an API payload with orjson, which is much faster than the
+    default encoder on large responses. NumPy values are serialized
+    natively and NaN becomes null.
+    """
+    return orjson.dumps(
+        value,
+        default=json_default,
+        option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+    )
+
+
+# ---------- Conditional requests ----------
+
+def make_etag(*parts) -> str:
+    """
+    Strong entity tag derived from the values a representation depends on.
+    """
+    digest = hashlib.sha256(":".join(map(str, parts)).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def http_date(timestamp: str) -> str:
+    """
+    An ISO timestamp in UTC, as stored in the catalog, as an HTTP date.
+    """
+    moment = datetime.fromisoformat(timestamp).replace(tzinfo=timezone.utc)
+    return format_datetime(moment, usegmt=True)
+
+
+def _parse_http_date(value: str) -> datetime | None:
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment
+
+
+def _not_after(last_modified: str, value: str) -> bool:
+    """
+    Whether `last_modified` (an HTTP date) is not later than the date in
+    `value`, at the one-second resolution of HTTP dates.
+    """
+    since = _parse_http_date(value)
+    return since is not None and _parse_http_date(last_modified) <= since
+
+
+def is_not_modified(headers, etag: str, last_modified: str) -> bool:
+    """
+    Whether a GET with these request headers can be answered with 304.
+    If-None-Match takes precedence over If-Modified-Since.
+    """
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        # Weak comparison: a W/ prefix does not matter here
+        tags = {
+            tag.strip().removeprefix("W/") for tag in if_none_match.split(",")
+        }
+        return etag in tags
+
+    if_modified_since = headers.get("if-modified-since")
+    return if_modified_since is not None and _not_after(
+        last_modified, if_modified_since
+    )
+
+
+def range_still_valid(headers, etag: str, last_modified: str) -> bool:
+    """
+    Whether a Range request applies to the current representation: true
+    without If-Range, or when If-Range names its entity tag (strongly) or
+    a date not before its last modification.
+    """
+    if_range = headers.get("if-range")
+    if if_range is None:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith(("\"", "W/")):
+        return if_range == etag
+    return _not_after(last_modified, if_range)
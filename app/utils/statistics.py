@@ -0,0 +1,1137 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+# Numeric columns are profiled in blocks of this many columns, which
+# bounds the size of the temporary arrays built for sorting and moments.
+PROFILE_BLOCK_COLUMNS = 256
+
+PROFILE_FIELDS = [
+    "dtype", "is_numeric", "count", "null_count", "n_unique",
+    "mean", "m2", "m3", "skew"
+]
+
+
+@dataclass
+class DatasetProfile:
+    """
+    Column statistics for one dataset version, computed in a single pass.
+
+    `columns` is indexed by feature name and holds, per column: dtype,
+    is_numeric, count (non-null values), null_count, n_unique, mean,
+    m2 / m3 (sums of squared / cubed deviations from the mean) and skew.
+
+    `vif` maps numeric columns to their variance inflation factor once
+    risk detection has computed it; it is target-independent and stored
+    with the profile.
+
+    `approximation` is set on profiles built by ApproximateProfileAccumulator
+    and describes the error of their estimated statistics.
+
+    `sampled` is set by approximate risk detection when it read a row
+    sample: the sample size and the VIF and target correlations it
+    estimated from it. Neither is stored with the profile.
+
+    `cross_products` holds the CrossProducts the VIF was computed from,
+    when it was computed exactly. It is stored next to the profile but
+    only loaded on request, by the steps that update it.
+    """
+    n_rows: int
+    duplicate_count: int
+    columns: pd.DataFrame
+    target_col: str | None = None
+    target_distribution: pd.Series | None = None
+    vif: dict | None = None
+    approximation: dict | None = None
+    sampled: dict | None = None
+    cross_products: "CrossProducts | None" = None
+
+    @property
+    def n_cols(self) -> int:
+        return len(self.columns)
+
+    @property
+    def numeric_columns(self) -> list[str]:
+        return self.columns.index[self.columns["is_numeric"]].tolist()
+
+    @property
+    def missing_ratio(self) -> float:
+        total_cells = self.n_rows * self.n_cols
+        return self.columns["null_count"].sum() / max(total_cells, 1)
+
+    @property
+    def duplicate_ratio(self) -> float:
+        return self.duplicate_count / max(self.n_rows, 1)
+
+
+def skewness(count, m2, m3):
+    """
+    Adjusted Fisher-Pearson skewness from central moment sums, matching
+    pandas' Series.skew(): 0 for constant columns, NaN below 3 values.
+    """
+    count = np.asarray(count, dtype=np.float64)
+    m2 = np.asarray(m2, dtype=np.float64)
+    m3 = np.asarray(m3, dtype=np.float64)
+
+    # Same float error clean-up pandas applies before dividing
+    m2 = np.where(np.abs(m2) < 1e-14, 0.0, m2)
+    m3 = np.where(np.abs(m3) < 1e-14, 0.0, m3)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        result = (count * (count - 1) ** 0.5 / (count - 2)) * (m3 / m2 ** 1.5)
+
+    result = np.where(m2 == 0, 0.0, result)
+    return np.where(count < 3, np.nan, result)
+
+
+def _block_moments(values: np.ndarray) -> dict:
+    """
+    Null counts and central moments for every column of a 2-D numeric
+    block at once, with missing cells contributing nothing.
+    """
+    n_rows = values.shape[0]
+
+    if values.dtype.kind == "f":
+        null_mask = np.isnan(values)
+        null_count = null_mask.sum(axis=0)
+    else:
+        null_mask = None
+        null_count = np.zeros(values.shape[1], dtype=np.int64)
+    count = n_rows - null_count
+
+    block = values.astype(np.float64)
+    if null_mask is not None:
+        block[null_mask] = 0.0
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = block.sum(axis=0) / count
+    block -= mean
+    if null_mask is not None:
+        block[null_mask] = 0.0
+
+    squared = block * block
+    m2 = squared.sum(axis=0)
+    m3 = (squared * block).sum(axis=0)
+
+    return {
+        "count": count,
+        "null_count": null_count,
+        "mean": mean,
+        "m2": m2,
+        "m3": m3
+    }
+
+
+def _block_n_unique(values: np.ndarray, count: np.ndarray) -> np.ndarray:
+    """
+    Cardinality of every column of a 2-D block: sort each column (NaN
+    sorts last) and count where the value changes within the non-null
+    prefix.
+    """
+    n_rows = values.shape[0]
+    if n_rows <= 1:
+        return (count > 0).astype(np.int64)
+
+    ordered = np.sort(values, axis=0)
+    changes = ordered[1:] != ordered[:-1]
+    in_prefix = np.arange(1, n_rows)[:, None] < count[None, :]
+    return (changes & in_prefix).sum(axis=0) + (count > 0)
+
+
+def merge_moments(a: dict, b: dict) -> dict:
+    """
+    Combine count / mean / m2 / m3 of two disjoint row sets (Chan et al.
+    pairwise update), column-wise.
+    """
+    n_a = np.asarray(a["count"], dtype=np.float64)
+    n_b = np.asarray(b["count"], dtype=np.float64)
+    n = n_a + n_b
+
+    mean_a = np.where(n_a > 0, a["mean"], 0.0)
+    mean_b = np.where(n_b > 0, b["mean"], 0.0)
+    m2_a = np.where(n_a > 0, a["m2"], 0.0)
+    m2_b = np.where(n_b > 0, b["m2"], 0.0)
+    m3_a = np.where(n_a > 0, a["m3"], 0.0)
+    m3_b = np.where(n_b > 0, b["m3"], 0.0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        delta = mean_b - mean_a
+        mean = mean_a + delta * n_b / n
+        m2 = m2_a + m2_b + delta ** 2 * n_a * n_b / n
+        m3 = (
+            m3_a + m3_b
+            + delta ** 3 * n_a * n_b * (n_a - n_b) / n ** 2
+            + 3 * delta * (n_a * m2_b - n_b * m2_a) / n
+        )
+
+    empty = n == 0
+    return {
+        "count": np.asarray(a["count"]) + np.asarray(b["count"]),
+        "null_count": np.asarray(a["null_count"]) + np.asarray(b["null_count"]),
+        "mean": np.where(empty, np.nan, mean),
+        "m2": np.where(empty, np.nan, m2),
+        "m3": np.where(empty, np.nan, m3)
+    }
+
+
+def _numeric_blocks(df: pd.DataFrame, numeric_cols: list[str]):
+    """
+    Yield (columns, 2-D array) blocks grouped by dtype, so integer columns
+    are sorted natively and only nullable extension dtypes are converted.
+    """
+    dtypes = df.dtypes[numeric_cols]
+
+    for dtype in dtypes.unique():
+        cols = dtypes.index[dtypes == dtype].tolist()
+
+        for start in range(0, len(cols), PROFILE_BLOCK_COLUMNS):
+            block_cols = cols[start:start + PROFILE_BLOCK_COLUMNS]
+            if isinstance(dtype, np.dtype):
+                values = df[block_cols].to_numpy()
+            else:
+                values = df[block_cols].to_numpy(
+                    dtype=np.float64, na_value=np.nan
+                )
+            yield block_cols, values
+
+
+def profile_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Build the per-column statistics table described in DatasetProfile.
+    """
+    numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
+    numeric_set = set(numeric_cols)
+
+    stats = pd.DataFrame(index=pd.Index(df.columns, dtype=object))
+    stats["dtype"] = [str(dtype) for dtype in df.dtypes]
+    stats["is_numeric"] = [col in numeric_set for col in df.columns]
+    for field in ("count", "null_count", "n_unique"):
+        stats[field] = 0
+    for field in ("mean", "m2", "m3"):
+        stats[field] = np.nan
+
+    # ---------- Numeric blocks ----------
+    for block_cols, values in _numeric_blocks(df, numeric_cols):
+        block_stats = _block_moments(values)
+        block_stats["n_unique"] = _block_n_unique(
+            values, block_stats["count"]
+        )
+        for field, field_values in block_stats.items():
+            stats.loc[block_cols, field] = field_values
+
+    # ---------- Non-numeric columns ----------
+    other_cols = [col for col in df.columns if col not in numeric_set]
+    if other_cols:
+        null_count = df[other_cols].isna().sum().to_numpy()
+        stats.loc[other_cols, "null_count"] = null_count
+        stats.loc[other_cols, "count"] = len(df) - null_count
+        stats.loc[other_cols, "n_unique"] = [
+            df[col].nunique(dropna=True) for col in other_cols
+        ]
+
+    stats["skew"] = skewness(stats["count"], stats["m2"], stats["m3"])
+    stats.loc[~stats["is_numeric"], "skew"] = np.nan
+
+    return stats[PROFILE_FIELDS]
+
+
+def update_profile(
+    profile: DatasetProfile,
+    changed: pd.DataFrame,
+    dropped: list[str],
+    duplicate_count: int,
+    vif: dict | None = None
+) -> DatasetProfile:
+    """
+    Profile of a version derived from its parent's: `changed` holds the
+    statistics of the columns a step rewrote (profile_columns output),
+    which keep their position; new columns are appended.
+    """
+    stats = profile.columns.drop(index=dropped)
+    if len(changed):
+        kept = [col for col in changed.index if col in stats.index]
+        stats.loc[kept] = changed.loc[kept]
+        stats = pd.concat([stats, changed.drop(index=kept)])
+
+    return DatasetProfile(
+        n_rows=profile.n_rows,
+        duplicate_count=duplicate_count,
+        columns=stats[PROFILE_FIELDS],
+        vif=vif
+    )
+
+
+def attach_target(
+    profile: DatasetProfile,
+    target: pd.Series | None
+) -> DatasetProfile:
+    """
+    Add the class distribution of the target column to a profile.
+    """
+    if target is not None:
+        profile.target_col = target.name
+        profile.target_distribution = target.value_counts(normalize=True)
+    return profile
+
+
+def profile_dataframe(
+    df: pd.DataFrame,
+    target_col: str | None = None
+) -> DatasetProfile:
+    """
+    Profile a dataset version once; scoring, diagnostics, risk detection
+    and recommendations all read from the returned object.
+    """
+    profile = DatasetProfile(
+        n_rows=len(df),
+        duplicate_count=count_duplicate_rows(df),
+        columns=profile_columns(df)
+    )
+
+    if target_col and target_col in df.columns:
+        attach_target(profile, df[target_col])
+    return profile
+
+
+class ProfileAccumulator:
+    """
+    Builds a DatasetProfile from a stream of row chunks sharing one
+    schema, so a dataset never has to be loaded as a whole.
+
+    Null counts and moments are merged exactly per chunk. Cardinality
+    and duplicate rows are exact too: distinct values (hashed for
+    non-numeric columns) are kept per column and duplicates are counted
+    by a DuplicateRowCounter, so memory grows with the number of
+    distinct values, not with rows.
+    """
+
+    def __init__(self):
+        self.n_rows = 0
+        self.columns = None
+        self.dtypes = None
+        self.numeric_cols = None
+        self.null_counts = None
+        self.moments = None
+        self.distinct = None
+        self.duplicates = DuplicateRowCounter()
+
+    def _start(self, chunk: pd.DataFrame) -> None:
+        self.columns = chunk.columns.tolist()
+        self.dtypes = [str(dtype) for dtype in chunk.dtypes]
+        self.numeric_cols = chunk.select_dtypes(
+            include=[np.number]
+        ).columns.tolist()
+        self.null_counts = np.zeros(len(self.columns), dtype=np.int64)
+        self.distinct = {col: [] for col in self.columns}
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        if self.columns is None:
+            self._start(chunk)
+
+        self.n_rows += len(chunk)
+        self.null_counts += chunk.isna().sum().to_numpy()
+
+        # ---------- Moments (numeric) ----------
+        if self.numeric_cols:
+            values = chunk[self.numeric_cols].to_numpy(
+                dtype=np.float64, na_value=np.nan
+            )
+            chunk_moments = _block_moments(values)
+            if self.moments is None:
+                self.moments = chunk_moments
+            else:
+                self.moments = merge_moments(self.moments, chunk_moments)
+
+        # ---------- Distinct values ----------
+        numeric_set = set(self.numeric_cols)
+        for col in self.columns:
+            series = chunk[col].dropna()
+            if col in numeric_set:
+                values = np.unique(series.to_numpy())
+            else:
+                values = np.unique(
+                    pd.util.hash_array(series.to_numpy(dtype=object))
+                )
+            self._add_distinct(col, values)
+
+        # ---------- Duplicate rows ----------
+        self.duplicates.update(chunk)
+
+    def _add_distinct(self, col: str, values: np.ndarray) -> None:
+        self.distinct[col].append(values)
+        self.distinct[col] = _compact(self.distinct[col])
+
+    def finalize(self) -> DatasetProfile:
+        if self.columns is None:
+            raise ValueError("No rows were profiled")
+
+        numeric_set = set(self.numeric_cols)
+        stats = pd.DataFrame(index=pd.Index(self.columns, dtype=object))
+        stats["dtype"] = self.dtypes
+        stats["is_numeric"] = [col in numeric_set for col in self.columns]
+        stats["n_unique"] = [
+            len(np.unique(np.concatenate(self.distinct[col])))
+            for col in self.columns
+        ]
+        stats["null_count"] = self.null_counts
+        stats["count"] = self.n_rows - self.null_counts
+        for field in ("mean", "m2", "m3"):
+            stats[field] = np.nan
+
+        if self.numeric_cols:
+            for field in ("mean", "m2", "m3"):
+                stats.loc[self.numeric_cols, field] = self.moments[field]
+
+        stats["skew"] = skewness(stats["count"], stats["m2"], stats["m3"])
+        stats.loc[~stats["is_numeric"], "skew"] = np.nan
+
+        return DatasetProfile(
+            n_rows=self.n_rows,
+            duplicate_count=self.duplicates.duplicate_count,
+            columns=stats[PROFILE_FIELDS]
+        )
+
+
+def _compact(parts: list) -> list:
+    """
+    Merge pending sorted unique arrays once they outgrow the merged one,
+    which keeps the amortized cost of the running union linear.
+    """
+    if len(parts) > 1 and sum(len(p) for p in parts[1:]) >= len(parts[0]):
+        return [np.unique(np.concatenate(parts))]
+    return parts
+
+
+# ---------- Duplicate rows ----------
+
+# Rows hashed at a time when counting duplicates of an in-memory frame
+DUPLICATE_CHUNK_ROWS = 1_000_000
+
+
+_ROW_HASH_PRIME = np.uint64(0x100000001B3)
+
+
+def column_hashes(values: np.ndarray) -> np.ndarray:
+    """
+    64-bit hash of every value, equal for values pandas considers equal:
+    floats are canonicalized first, since -0.0 and NaNs with different
+    bit patterns would otherwise hash apart.
+    """
+    if values.dtype.kind == "f":
+        values = values + 0.0
+        values[np.isnan(values)] = np.nan
+    return pd.util.hash_array(values)
+
+
+def row_hashes(chunk: pd.DataFrame) -> np.ndarray:
+    """
+    64-bit hash of every row, equal for rows df.duplicated() considers
+    equal (missing values included).
+    """
+    combined = np.zeros(len(chunk), dtype=np.uint64)
+    for i in range(chunk.shape[1]):
+        combined *= _ROW_HASH_PRIME
+        combined ^= column_hashes(chunk.iloc[:, i].to_numpy())
+    return combined
+
+
+class DuplicateRowCounter:
+    """
+    Counts rows equal to an earlier row over a stream of chunks, like
+    df.duplicated().sum() without holding the frame.
+
+    Rows are reduced to 64-bit hashes and the hashes seen so far are kept
+    as a few sorted unique arrays (8 bytes per distinct row). Two
+    different rows sharing a hash would be miscounted, which at 64 bits
+    is negligible below billions of rows. Optionally collects the
+    positions of the first `sample_size` duplicate rows.
+    """
+
+    def __init__(self, sample_size: int = 0):
+        self.sample_size = sample_size
+        self.n_rows = 0
+        self.duplicate_count = 0
+        self.seen = []
+        self.samples = []
+
+    @property
+    def sample_indices(self) -> list[int]:
+        if not self.samples:
+            return []
+        return np.concatenate(self.samples)[:self.sample_size].tolist()
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        hashes = row_hashes(chunk)
+
+        # First occurrence of each hash within the chunk, and whether an
+        # earlier chunk already had it
+        unique, first = np.unique(hashes, return_index=True)
+        seen_before = self._contains(unique)
+
+        is_duplicate = np.ones(len(hashes), dtype=bool)
+        is_duplicate[first[~seen_before]] = False
+        self.duplicate_count += int(is_duplicate.sum())
+
+        collected = sum(len(s) for s in self.samples)
+        if collected < self.sample_size:
+            positions = np.flatnonzero(is_duplicate)
+            self.samples.append(
+                self.n_rows + positions[:self.sample_size - collected]
+            )
+
+        self.seen.append(unique[~seen_before])
+        self.seen = _compact(self.seen)
+        self.n_rows += len(hashes)
+
+    def _contains(self, values: np.ndarray) -> np.ndarray:
+        found = np.zeros(len(values), dtype=bool)
+        for part in self.seen:
+            if len(part) == 0:
+                continue
+            at = np.minimum(np.searchsorted(part, values), len(part) - 1)
+            found |= part[at] == values
+        return found
+
+
+def merged_rows(before: pd.Series, after: pd.Series) -> np.ndarray:
+    """
+    Mask of the rows whose new value is shared by several distinct old
+    values (missing counts as a value). Only these rows can become equal
+    to other rows; every other row keeps a value no other old value maps
+    to, so its duplicates are unchanged.
+    """
+    old_codes = pd.factorize(before, use_na_sentinel=False)[0]
+    new_codes = pd.factorize(after, use_na_sentinel=False)[0]
+
+    pairs = np.unique(
+        new_codes.astype(np.int64) * (old_codes.max(initial=0) + 1)
+        + old_codes
+    )
+    pair_new_codes = pairs // (old_codes.max(initial=0) + 1)
+    shared, counts = np.unique(pair_new_codes, return_counts=True)
+    return np.isin(new_codes, shared[counts > 1])
+
+
+def count_duplicate_rows(
+    df: pd.DataFrame,
+    chunk_rows: int = DUPLICATE_CHUNK_ROWS
+) -> int:
+    counter = DuplicateRowCounter()
+    for start in range(0, len(df), chunk_rows):
+        counter.update(df.iloc[start:start + chunk_rows])
+    return counter.duplicate_count
+
+
+# ---------- Multicollinearity ----------
+
+# Above this many complete rows, VIFs are estimated from a row sample
+VIF_SAMPLE_ROWS = 1_000_000
+
+# Floor for the eigenvalues of a singular correlation matrix; exactly
+# collinear columns then get a VIF of roughly 1 / VIF_MIN_EIGENVALUE.
+VIF_MIN_EIGENVALUE = 1e-10
+
+
+def correlation_matrix(values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Pearson correlation matrix of the columns of a 2-D array without
+    missing values, from one centered cross-product. Also returns the
+    mask of columns with non-zero variance; the others have no
+    correlation and are left out of the matrix.
+    """
+    block = values.astype(np.float64)
+    mean = block.mean(axis=0)
+    block -= mean
+    cross = block.T @ block
+    return _cross_correlation(cross, np.diag(cross) + len(block) * mean ** 2)
+
+
+def _cross_correlation(
+    cross: np.ndarray,
+    magnitude: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Correlation matrix from centered cross products. A column varies when
+    its sum of squared deviations is not rounding error relative to its
+    own sum of squares (`magnitude`), so rescaling never changes it.
+    """
+    variance = np.diag(cross).copy()
+    varying = variance > 1e-14 * magnitude
+
+    scale = np.sqrt(variance[varying])
+    corr = cross[np.ix_(varying, varying)] / np.outer(scale, scale)
+    np.fill_diagonal(corr, 1.0)
+    return corr, varying
+
+
+def inverse_diagonal(corr: np.ndarray) -> np.ndarray:
+    """
+    Diagonal of the inverse of a correlation matrix via its Cholesky
+    factor, or via a floored eigendecomposition when it is singular.
+    """
+    try:
+        lower = np.linalg.cholesky(corr)
+    except np.linalg.LinAlgError:
+        eigenvalues, eigenvectors = np.linalg.eigh(corr)
+        eigenvalues = np.maximum(eigenvalues, VIF_MIN_EIGENVALUE)
+        return (eigenvectors * eigenvectors / eigenvalues).sum(axis=1)
+
+    # R^-1 = L^-T L^-1, so diag(R^-1) is the column sums of (L^-1)^2
+    inverse_lower = np.linalg.inv(lower)
+    return (inverse_lower * inverse_lower).sum(axis=0)
+
+
+def variance_inflation_factors(
+    values: np.ndarray,
+    sample_rows: int | None = VIF_SAMPLE_ROWS,
+    seed: int = 0
+) -> np.ndarray:
+    """
+    VIF of every column of a 2-D array without missing values, computed
+    at once as the diagonal of the inverse correlation matrix instead of
+    one OLS fit per column. Constant columns get NaN. Rows are sampled
+    when there are more than `sample_rows`.
+    """
+    n_rows, n_cols = values.shape
+    vif = np.full(n_cols, np.nan)
+    if n_rows < 2 or n_cols == 0:
+        return vif
+
+    if sample_rows is not None and n_rows > sample_rows:
+        rng = np.random.default_rng(seed)
+        rows = np.sort(rng.choice(n_rows, size=sample_rows, replace=False))
+        values = values[rows]
+
+    corr, varying = correlation_matrix(values)
+    if varying.any():
+        vif[varying] = np.maximum(inverse_diagonal(corr), 1.0)
+    return vif
+
+
+@dataclass
+class CrossProducts:
+    """
+    Cross products of the numeric columns of a version over its complete
+    rows (no value missing in any of them). Each column is shifted by a
+    constant close to its mean, so centering loses no precision:
+    `sums` is sum(x - shift) and `cross` is sum((x - shift)(x - shift)^T).
+
+    The VIF follows from them without reading the data. A step that
+    rewrites some columns, or changes which rows are complete, only
+    updates the entries it affects (update_cross_products).
+    """
+    columns: list[str]
+    count: int
+    shift: np.ndarray
+    sums: np.ndarray
+    cross: np.ndarray
+
+    def variance_inflation_factors(self) -> dict:
+        """
+        VIF per column, as risk detection computes it from the data.
+        """
+        if len(self.columns) < 2 or self.count == 0:
+            return {}
+
+        vif = np.full(len(self.columns), np.nan)
+        if self.count >= 2:
+            cross = self.cross - np.outer(self.sums, self.sums) / self.count
+            mean = self.shift + self.sums / self.count
+            corr, varying = _cross_correlation(
+                cross, np.diag(cross) + self.count * mean ** 2
+            )
+            if varying.any():
+                vif[varying] = np.maximum(inverse_diagonal(corr), 1.0)
+        return {col: float(value) for col, value in zip(self.columns, vif)}
+
+
+def complete_rows(
+    df: pd.DataFrame,
+    columns: list[str] | None = None
+) -> np.ndarray:
+    """
+    Mask of the rows of `df` without missing values in `columns` (all by
+    default), built column by column.
+    """
+    complete = np.ones(len(df), dtype=bool)
+    for col in df.columns if columns is None else columns:
+        values = df[col].to_numpy()
+        if values.dtype.kind == "f":
+            complete &= ~np.isnan(values)
+        elif values.dtype.kind not in "iub":
+            complete &= df[col].notna().to_numpy()
+    return complete
+
+
+def cross_products(
+    df: pd.DataFrame,
+    complete: np.ndarray | None = None
+) -> CrossProducts:
+    """
+    CrossProducts of the columns of a numeric DataFrame, optionally given
+    its complete_rows mask.
+    """
+    if complete is None:
+        complete = complete_rows(df)
+    values = df.iloc[np.flatnonzero(complete)].to_numpy(dtype=np.float64)
+    shift = values.mean(axis=0) if len(values) else np.zeros(df.shape[1])
+    values -= shift
+    return CrossProducts(
+        columns=df.columns.tolist(),
+        count=len(values),
+        shift=shift,
+        sums=values.sum(axis=0),
+        cross=values.T @ values
+    )
+
+
+def update_cross_products(
+    products: CrossProducts,
+    df: pd.DataFrame,
+    written: list[str],
+    old_complete: np.ndarray,
+    complete: np.ndarray
+) -> CrossProducts:
+    """
+    CrossProducts of `df`, the numeric columns of a step's version, from
+    those of its parent. The `written` columns are recomputed against
+    every column, over the complete rows. The other columns keep their
+    entries: they only lose the rows that stopped being complete
+    (`old_complete` is the parent's mask) and gain the rows that became
+    complete. When most rows changed, everything is recomputed.
+    """
+    written_set = set(written)
+    kept = [col for col in df.columns if col not in written_set]
+    leaving = np.flatnonzero(old_complete & ~complete)
+    entering = np.flatnonzero(complete & ~old_complete)
+    rows = np.flatnonzero(complete)
+    if not kept or len(leaving) + len(entering) > len(rows) // 2:
+        return cross_products(df, complete)
+
+    # ---------- Kept columns ----------
+    position = {col: i for i, col in enumerate(products.columns)}
+    kept_positions = [position[col] for col in kept]
+    shift = products.shift[kept_positions]
+    sums = products.sums[kept_positions].copy()
+    cross = products.cross[np.ix_(kept_positions, kept_positions)].copy()
+    for changed_rows, sign in ((leaving, -1.0), (entering, 1.0)):
+        if len(changed_rows):
+            values = df.iloc[changed_rows][kept].to_numpy(dtype=np.float64)
+            values -= shift
+            sums += sign * values.sum(axis=0)
+            cross += sign * (values.T @ values)
+
+    # ---------- Written columns ----------
+    written = [col for col in df.columns if col in written_set]
+    values = df[written].to_numpy(dtype=np.float64)[rows]
+    written_shift = (
+        values.mean(axis=0) if len(values) else np.zeros(len(written))
+    )
+    values -= written_shift
+
+    # Against the kept columns one at a time, so no copy of the whole
+    # numeric table is ever made
+    between = np.zeros((len(kept), len(written)))
+    for i, col in enumerate(kept if written else []):
+        column = df[col].to_numpy(dtype=np.float64)[rows]
+        column -= shift[i]
+        between[i] = column @ values
+
+    # Back in the column order of df
+    order = {col: i for i, col in enumerate(kept + written)}
+    permutation = [order[col] for col in df.columns]
+    full = np.block([[cross, between], [between.T, values.T @ values]])
+    return CrossProducts(
+        columns=df.columns.tolist(),
+        count=len(rows),
+        shift=np.concatenate([shift, written_shift])[permutation],
+        sums=np.concatenate([sums, values.sum(axis=0)])[permutation],
+        cross=full[np.ix_(permutation, permutation)]
+    )
+
+
+def rescale_cross_products(
+    products: CrossProducts,
+    scale: dict,
+    offset: dict
+) -> CrossProducts:
+    """
+    CrossProducts after columns were transformed as x * scale + offset;
+    the shifts follow the transform, so only the scale enters the sums.
+    """
+    factor = np.array([scale.get(col, 1.0) for col in products.columns])
+    added = np.array([offset.get(col, 0.0) for col in products.columns])
+    return CrossProducts(
+        columns=products.columns,
+        count=products.count,
+        shift=products.shift * factor + added,
+        sums=products.sums * factor,
+        cross=products.cross * np.outer(factor, factor)
+    )
+
+
+# ---------- Target correlation ----------
+
+def target_correlations(values: np.ndarray, target: np.ndarray) -> np.ndarray:
+    """
+    Pearson correlation of every column of a 2-D float array with a
+    target vector, each over the rows where both are present (pandas'
+    pairwise-complete corr), for all columns in one pass per block.
+    """
+    target = np.asarray(target, dtype=np.float64)
+    target_present = ~np.isnan(target)
+    result = np.full(values.shape[1], np.nan)
+
+    for start in range(0, values.shape[1], PROFILE_BLOCK_COLUMNS):
+        block = values[:, start:start + PROFILE_BLOCK_COLUMNS].astype(
+            np.float64
+        )
+        present = ~np.isnan(block) & target_present[:, None]
+        count = present.sum(axis=0)
+
+        block[~present] = 0.0
+        paired_target = np.where(present, target[:, None], 0.0)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            block -= block.sum(axis=0) / count
+            paired_target -= paired_target.sum(axis=0) / count
+            block[~present] = 0.0
+            paired_target[~present] = 0.0
+
+            result[start:start + block.shape[1]] = (
+                (block * paired_target).sum(axis=0)
+                / np.sqrt(
+                    (block * block).sum(axis=0)
+                    * (paired_target * paired_target).sum(axis=0)
+                )
+            )
+
+    return np.clip(result, -1.0, 1.0)
+
+
+# ---------- Approximate profiling ----------
+
+# Rows kept by the reservoir sample (moments, VIF, target correlation) and
+# targeted by the hash sample used to estimate duplicate rows
+APPROX_SAMPLE_ROWS = 100_000
+
+# HyperLogLog registers are 2 ** HLL_PRECISION bytes per column; the
+# relative standard error of distinct counts is 1.04 / sqrt(2 ** p).
+HLL_PRECISION = 14
+
+# Two-sided 95% normal quantile used for all confidence intervals
+APPROX_Z = 1.96
+
+
+class HyperLogLog:
+    """
+    Distinct count sketch over 64-bit hashes with constant memory.
+    """
+
+    def __init__(self, precision: int = HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / np.sqrt(len(self.registers))
+
+    def update(self, hashes: np.ndarray) -> None:
+        if len(hashes) == 0:
+            return
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        tail_bits = 64 - self.precision
+
+        index = (hashes >> np.uint64(tail_bits)).astype(np.intp)
+        tail = hashes & np.uint64((1 << tail_bits) - 1)
+
+        # Position of the leftmost 1-bit of the tail; frexp's exponent is
+        # the bit length, and the tail fits a float64 mantissa exactly.
+        bit_length = np.frexp(tail.astype(np.float64))[1]
+        rank = (tail_bits - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def estimate(self) -> float:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.ldexp(1.0, -self.registers.astype(int)).sum()
+
+        # Linear counting is far more accurate for small cardinalities
+        zeros = int((self.registers == 0).sum())
+        if raw <= 2.5 * m and zeros:
+            return m * np.log(m / zeros)
+        return raw
+
+
+class ReservoirSampler:
+    """
+    Uniform sample of `size` row positions from a stream of chunks of
+    unknown total length (Algorithm R, vectorized per chunk).
+    """
+
+    def __init__(self, size: int = APPROX_SAMPLE_ROWS, seed: int = 0):
+        self.size = size
+        self.seen = 0
+        self.reservoir = np.empty(size, dtype=np.int64)
+        self.rng = np.random.default_rng(seed)
+
+    @property
+    def indices(self) -> np.ndarray:
+        return np.sort(self.reservoir[:min(self.seen, self.size)])
+
+    def update(self, n_rows: int) -> None:
+        start = self.seen
+        self.seen += n_rows
+
+        fill_end = min(self.seen, self.size)
+        if start < fill_end:
+            self.reservoir[start:fill_end] = np.arange(start, fill_end)
+
+        positions = np.arange(max(start, self.size), self.seen)
+        if len(positions) == 0:
+            return
+
+        # Row i replaces a random slot with probability size / (i + 1);
+        # of several rows drawing the same slot the last one wins.
+        slots = self.rng.integers(0, positions + 1)
+        accepted = slots < self.size
+        slots, positions = slots[accepted], positions[accepted]
+        _, last = np.unique(slots[::-1], return_index=True)
+        self.reservoir[slots[::-1][last]] = positions[::-1][last]
+
+
+def reservoir_sample(
+    df: pd.DataFrame,
+    sample_rows: int = APPROX_SAMPLE_ROWS,
+    seed: int = 0
+) -> pd.DataFrame:
+    """
+    Uniform row sample of `df`, or `df` itself when it is small enough.
+    """
+    if len(df) <= sample_rows:
+        return df
+    sampler = ReservoirSampler(sample_rows, seed)
+    sampler.update(len(df))
+    return df.iloc[sampler.indices]
+
+
+def skewness_standard_error(count) -> np.ndarray:
+    """
+    Standard error of the sample skewness of `count` normal values.
+    """
+    n = np.asarray(count, dtype=np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.sqrt(6 * n * (n - 1) / ((n - 2) * (n + 1) * (n + 3)))
+
+
+def correlation_interval(r, n_rows: int) -> np.ndarray:
+    """
+    Confidence bounds, shape (..., 2), of Pearson correlations estimated
+    from `n_rows` sampled rows, by Fisher's z-transform.
+    """
+    r = np.clip(np.asarray(r, dtype=np.float64), -1.0, 1.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = np.arctanh(r)
+        margin = APPROX_Z / np.sqrt(max(n_rows - 3, 1))
+        return np.tanh(np.stack([z - margin, z + margin], axis=-1))
+
+
+def vif_interval(vif, n_rows: int) -> np.ndarray:
+    """
+    Confidence bounds, shape (..., 2), of VIFs estimated from `n_rows`
+    sampled rows. VIF = 1 / (1 - R^2), where R is the multiple
+    correlation of the column with the others, so the interval of R
+    (Fisher's z, an approximation for multiple correlation) is mapped
+    through it.
+    """
+    vif = np.asarray(vif, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r = np.sqrt(np.clip(1 - 1 / vif, 0.0, 1.0))
+        bounds = np.clip(correlation_interval(r, n_rows), 0.0, 1.0)
+        return 1 / (1 - bounds ** 2)
+
+
+class ApproximateProfileAccumulator:
+    """
+    Builds an estimated DatasetProfile from a stream of row chunks in
+    constant memory, for datasets too large to profile exactly.
+
+    Null counts are exact. Cardinalities come from one HyperLogLog per
+    column. Duplicate rows are counted exactly within a hash sample: rows
+    whose hash falls below a threshold, which is halved whenever the
+    sample outgrows its budget, so all copies of a row are kept or
+    dropped together. Moments come from a reservoir sample of rows that
+    finalize() receives.
+    """
+
+    def __init__(
+        self,
+        sample_rows: int = APPROX_SAMPLE_ROWS,
+        precision: int = HLL_PRECISION,
+        seed: int = 0
+    ):
+        self.sample_rows = sample_rows
+        self.precision = precision
+        self.n_rows = 0
+        self.columns = None
+        self.dtypes = None
+        self.numeric_cols = None
+        self.null_counts = None
+        self.sketches = None
+        self.sampler = ReservoirSampler(sample_rows, seed)
+        self.hash_level = 0
+        self.hash_sample = []
+        self.hash_sample_size = 0
+
+    @property
+    def sample_indices(self) -> np.ndarray:
+        """
+        Row positions of the reservoir sample seen so far.
+        """
+        return self.sampler.indices
+
+    def _start(self, chunk: pd.DataFrame) -> None:
+        self.columns = chunk.columns.tolist()
+        self.dtypes = [str(dtype) for dtype in chunk.dtypes]
+        self.numeric_cols = chunk.select_dtypes(
+            include=[np.number]
+        ).columns.tolist()
+        self.null_counts = np.zeros(len(self.columns), dtype=np.int64)
+        self.sketches = [HyperLogLog(self.precision) for _ in self.columns]
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        if self.columns is None:
+            self._start(chunk)
+
+        self.n_rows += len(chunk)
+        self.sampler.update(len(chunk))
+
+        null_mask = chunk.isna().to_numpy()
+        self.null_counts += null_mask.sum(axis=0)
+
+        # ---------- Distinct values ----------
+        # Row hashes are combined from the column hashes already computed
+        combined = np.zeros(len(chunk), dtype=np.uint64)
+        for i, col in enumerate(self.columns):
+            hashes = column_hashes(chunk[col].to_numpy())
+            self.sketches[i].update(hashes[~null_mask[:, i]])
+            combined *= _ROW_HASH_PRIME
+            combined ^= hashes
+
+        # ---------- Duplicate rows ----------
+        self._add_hashes(combined)
+
+    def _threshold(self) -> np.uint64 | None:
+        if self.hash_level == 0:
+            return None
+        return np.uint64(1 << (64 - self.hash_level))
+
+    def _add_hashes(self, row_hashes: np.ndarray) -> None:
+        threshold = self._threshold()
+        if threshold is not None:
+            row_hashes = row_hashes[row_hashes < threshold]
+        self.hash_sample.append(row_hashes)
+        self.hash_sample_size += len(row_hashes)
+
+        while self.hash_sample_size > 2 * self.sample_rows:
+            self.hash_level += 1
+            threshold = self._threshold()
+            self.hash_sample = [
+                hashes[hashes < threshold] for hashes in self.hash_sample
+            ]
+            self.hash_sample_size = sum(len(h) for h in self.hash_sample)
+
+    def _duplicate_estimate(self) -> tuple[float, float]:
+        """
+        Duplicate row ratio and its standard error. Whole groups of equal
+        rows are sampled with probability q, so the sample ratio is a
+        ratio estimator over groups.
+        """
+        if self.hash_sample_size == 0:
+            return 0.0, 0.0
+
+        _, group_sizes = np.unique(
+            np.concatenate(self.hash_sample), return_counts=True
+        )
+        sampled = group_sizes.sum()
+        ratio = (sampled - len(group_sizes)) / sampled
+
+        q = 2.0 ** -self.hash_level
+        residuals = (group_sizes - 1) - ratio * group_sizes
+        variance = (1 - q) / (q * sampled ** 2) * (residuals ** 2).sum()
+        return float(ratio), float(np.sqrt(variance))
+
+    def finalize(self, sample: pd.DataFrame) -> DatasetProfile:
+        """
+        Build the profile; `sample` holds the rows at `sample_indices`.
+        """
+        if self.columns is None:
+            raise ValueError("No rows were profiled")
+
+        numeric_set = set(self.numeric_cols)
+        stats = pd.DataFrame(index=pd.Index(self.columns, dtype=object))
+        stats["dtype"] = self.dtypes
+        stats["is_numeric"] = [col in numeric_set for col in self.columns]
+        stats["null_count"] = self.null_counts
+        stats["count"] = self.n_rows - self.null_counts
+        stats["n_unique"] = np.minimum(
+            [int(round(sketch.estimate())) for sketch in self.sketches],
+            stats["count"]
+        )
+        for field in ("mean", "m2", "m3"):
+            stats[field] = np.nan
+        stats["skew"] = np.nan
+
+        # Moments from the sample, with the sums of deviations scaled up
+        # to the full column
+        sample_count = np.zeros(len(self.numeric_cols))
+        if self.numeric_cols and len(sample):
+            moments = _block_moments(sample[self.numeric_cols].to_numpy(
+                dtype=np.float64, na_value=np.nan
+            ))
+            sample_count = moments["count"]
+            full_count = stats.loc[self.numeric_cols, "count"].to_numpy()
+            with np.errstate(invalid="ignore", divide="ignore"):
+                scale = full_count / sample_count
+            stats.loc[self.numeric_cols, "mean"] = moments["mean"]
+            stats.loc[self.numeric_cols, "m2"] = moments["m2"] * scale
+            stats.loc[self.numeric_cols, "m3"] = moments["m3"] * scale
+            stats.loc[self.numeric_cols, "skew"] = skewness(
+                sample_count, moments["m2"], moments["m3"]
+            )
+
+        duplicate_ratio, duplicate_error = self._duplicate_estimate()
+        return DatasetProfile(
+            n_rows=self.n_rows,
+            duplicate_count=int(round(duplicate_ratio * self.n_rows)),
+            columns=stats[PROFILE_FIELDS],
+            approximation={
+                "sample_rows": len(sample),
+                "duplicate_sample_rows": self.hash_sample_size,
+                "duplicate_ratio": duplicate_ratio,
+                "duplicate_ratio_error": duplicate_error,
+                "distinct_relative_error": float(
+                    self.sketches[0].relative_error
+                ) if self.sketches else 0.0,
+                "skew_error": dict(zip(
+                    self.numeric_cols,
+                    skewness_standard_error(sample_count)
+                ))
+            }
+        )
+
+
+def approximate_profile_dataframe(
+    df: pd.DataFrame,
+    sample_rows: int = APPROX_SAMPLE_ROWS,
+    chunk_rows: int = 1_000_000
+) -> DatasetProfile:
+    """
+    Estimated profile of an in-memory frame, see
+    ApproximateProfileAccumulator.
+    """
+    accumulator = ApproximateProfileAccumulator(sample_rows)
+    for start in range(0, max(len(df), 1), chunk_rows):
+        accumulator.update(df.iloc[start:start + chunk_rows])
+    return accumulator.finalize(df.iloc[accumulator.sample_indices])
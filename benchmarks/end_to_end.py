@@ -0,0 +1,262 @@
+"""
+Time ingest, analyze, execute, rescore, report and download end to end on
+a synthetic dataset, plus the analysis internals on their own, and save
+the timings as JSON so runs can be compared.
+
+    python benchmarks/end_to_end.py --rows 200000 --numeric 40
+    python benchmarks/end_to_end.py --rows 200000 --numeric 40 \\
+        --compare benchmarks/results/<earlier run>.json
+
+Requests go through FastAPI's TestClient (needs httpx) against storage in
+a temporary directory, so the real routes and services are measured.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+from datetime import datetime
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app.services.storage_service import read_version  # noqa: E402
+from app.services.risk_leakage_service import detect_feature_risks  # noqa: E402
+from app.utils.statistics import profile_dataframe  # noqa: E402
+from benchmarks.synthetic import (  # noqa: E402
+    TARGET_COL,
+    generate_dataset,
+    to_csv_bytes
+)
+
+RESULTS_DIR = os.path.join(REPO_DIR, "benchmarks", "results")
+
+# Stages timed through the API, in the order they run
+API_STAGES = [
+    "ingest", "analyze", "analyze_cached", "execute", "rescore", "report",
+    "download"
+]
+
+# Analysis internals, timed on the v0 frame outside of the API
+INTERNAL_STAGES = ["profile", "risks"]
+
+
+@contextmanager
+def timed(timings: dict, stage: str):
+    start = time.perf_counter()
+    yield
+    timings[stage] = time.perf_counter() - start
+
+
+def check(response, stage: str):
+    if response.status_code >= 400:
+        raise RuntimeError(
+            f"{stage} failed with {response.status_code}: {response.text}"
+        )
+    return response
+
+
+def execute_request(df: pd.DataFrame) -> dict:
+    """
+    An imputation on the first feature column with missing values.
+    """
+    for col in df.columns:
+        if col != TARGET_COL and df[col].isna().any():
+            numeric = pd.api.types.is_numeric_dtype(df[col])
+            action = "median_impute" if numeric else "mode_impute"
+            return {"action": action, "params": {"feature": col}}
+    return {"action": "drop_feature", "params": {"feature": df.columns[0]}}
+
+
+def run_once(client: TestClient, csv_bytes: bytes, step: dict) -> dict:
+    timings = {}
+    params = {"target_col": TARGET_COL}
+    start = time.perf_counter()
+
+    with timed(timings, "ingest"):
+        response = check(client.post(
+            "/upload/", files={"file": ("bench.csv", csv_bytes, "text/csv")}
+        ), "ingest")
+    dataset_id = response.json()["dataset"]["dataset_id"]
+
+    with timed(timings, "analyze"):
+        check(client.get(f"/analyze/{dataset_id}", params=params), "analyze")
+
+    with timed(timings, "analyze_cached"):
+        check(
+            client.get(f"/analyze/{dataset_id}", params=params),
+            "analyze_cached"
+        )
+
+    with timed(timings, "execute"):
+        check(client.post(f"/execute/{dataset_id}", json=step), "execute")
+
+    with timed(timings, "rescore"):
+        check(client.get(f"/rescore/{dataset_id}", params=params), "rescore")
+
+    with timed(timings, "report"):
+        check(client.post(f"/report/{dataset_id}", params=params), "report")
+
+    with timed(timings, "download"):
+        check(client.get(f"/download/{dataset_id}"), "download")
+
+    timings["end_to_end"] = time.perf_counter() - start
+
+    # ---------- Internals ----------
+    df = read_version(dataset_id, "v0_raw")
+    with timed(timings, "profile"):
+        profile = profile_dataframe(df)
+    with timed(timings, "risks"):
+        detect_feature_risks(df, TARGET_COL, profile=profile)
+
+    return timings
+
+
+def summarize(runs: list[dict]) -> dict:
+    return {
+        stage: {
+            "median": statistics.median(run[stage] for run in runs),
+            "best": min(run[stage] for run in runs),
+            "runs": [run[stage] for run in runs]
+        }
+        for stage in API_STAGES + ["end_to_end"] + INTERNAL_STAGES
+    }
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "pyarrow": pa.__version__
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> bool:
+    """
+    Print median timings against a baseline; True when no stage got
+    slower by more than `threshold` (a ratio, e.g. 1.2).
+    """
+    if baseline["params"] != current["params"]:
+        print("warning: baseline was run with different parameters\n")
+
+    print(f"{'stage':<16}{'baseline (s)':>14}{'current (s)':>14}{'ratio':>8}")
+    ok = True
+    for stage, result in current["stages"].items():
+        if stage not in baseline["stages"]:
+            continue
+        before = baseline["stages"][stage]["median"]
+        after = result["median"]
+        ratio = after / before if before > 0 else float("inf")
+        slower = ratio > threshold
+        ok = ok and not slower
+        print(
+            f"{stage:<16}{before:>14.4f}{after:>14.4f}{ratio:>8.2f}"
+            + ("  slower" if slower else "")
+        )
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--numeric", type=int, default=10)
+    parser.add_argument("--categorical", type=int, default=4)
+    parser.add_argument("--boolean", type=int, default=1)
+    parser.add_argument("--missing", type=float, default=0.05)
+    parser.add_argument("--skewed", type=float, default=0.3)
+    parser.add_argument("--duplicates", type=float, default=0.01)
+    parser.add_argument("--collinear", type=float, default=0.2)
+    parser.add_argument("--cardinality", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--output", help="result file (default: benchmarks/results/...)"
+    )
+    parser.add_argument("--compare", help="earlier result file to compare")
+    parser.add_argument(
+        "--threshold", type=float, default=1.2,
+        help="with --compare, exit 1 if a stage is this many times slower"
+    )
+    args = parser.parse_args()
+
+    dataset_params = {
+        key: getattr(args, key) for key in (
+            "rows", "numeric", "categorical", "boolean", "missing",
+            "skewed", "duplicates", "collinear", "cardinality", "seed"
+        )
+    }
+    df = generate_dataset(**dataset_params)
+    csv_bytes = to_csv_bytes(df)
+    step = execute_request(df)
+    print(
+        f"{len(df):,} rows x {df.shape[1]} columns, "
+        f"{len(csv_bytes) / 1e6:.1f} MB CSV, {args.repeat} runs\n"
+    )
+
+    # The app stores everything under relative paths
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="dqe-bench-") as workdir:
+        os.chdir(workdir)
+        try:
+            client = TestClient(app)
+            runs = [
+                run_once(client, csv_bytes, step) for _ in range(args.repeat)
+            ]
+        finally:
+            os.chdir(cwd)
+
+    result = {
+        "benchmark": "end_to_end",
+        "created_at": datetime.utcnow().isoformat(),
+        "environment": environment(),
+        "params": {**dataset_params, "repeat": args.repeat, "step": step},
+        "stages": summarize(runs)
+    }
+
+    print(f"{'stage':<16}{'median (s)':>12}{'best (s)':>12}")
+    for stage, timing in result["stages"].items():
+        print(f"{stage:<16}{timing['median']:>12.4f}{timing['best']:>12.4f}")
+
+    output = args.output or os.path.join(
+        RESULTS_DIR,
+        f"end_to_end-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"\nSaved {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print()
+        if not compare(result, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Synthetic datasets for the benchmarks, with control over the properties
+the analysis reacts to: dtype mix, missingness, skew, duplicate rows and
+collinearity. Every dataset has a binary "target" column.
+"""
+import numpy as np
+import pandas as pd
+
+TARGET_COL = "target"
+
+
+def generate_dataset(
+    rows: int,
+    numeric: int = 10,
+    categorical: int = 4,
+    boolean: int = 1,
+    missing: float = 0.05,
+    skewed: float = 0.3,
+    duplicates: float = 0.01,
+    collinear: float = 0.2,
+    cardinality: int = 20,
+    seed: int = 0
+) -> pd.DataFrame:
+    """
+    Build a dataset of `rows` rows.
+
+    - numeric / categorical / boolean: number of columns of each kind
+    - missing: share of missing cells in every feature column
+    - skewed: share of independent numeric columns drawn log-normal
+    - duplicates: share of rows that repeat an earlier row
+    - collinear: share of numeric columns that are noisy linear
+      combinations of the independent ones
+    - cardinality: distinct values per categorical column
+    """
+    rng = np.random.default_rng(seed)
+    n_duplicates = int(rows * duplicates)
+    n_unique = rows - n_duplicates
+
+    data = {}
+
+    # ---------- Numeric ----------
+    n_collinear = int(numeric * collinear)
+    n_independent = numeric - n_collinear
+    if n_independent == 0 and numeric:
+        n_independent, n_collinear = 1, numeric - 1
+
+    base = rng.standard_normal((n_unique, max(n_independent, 1)))
+    n_skewed = int(round(n_independent * skewed))
+    for i in range(n_independent):
+        values = base[:, i]
+        data[f"num_{i}"] = np.exp(values) if i < n_skewed else values
+
+    for j in range(n_collinear):
+        weights = rng.standard_normal(n_independent)
+        noise = rng.standard_normal(n_unique) * 0.05
+        data[f"lin_{j}"] = base[:, :n_independent] @ weights + noise
+
+    # ---------- Categorical ----------
+    labels = np.array([f"c{k}" for k in range(cardinality)], dtype=object)
+    for j in range(categorical):
+        data[f"cat_{j}"] = labels[rng.integers(0, cardinality, n_unique)]
+
+    # ---------- Boolean ----------
+    for j in range(boolean):
+        data[f"flag_{j}"] = rng.random(n_unique) < 0.5
+
+    df = pd.DataFrame(data)
+
+    # ---------- Missingness ----------
+    if missing > 0:
+        for col in df.columns:
+            mask = rng.random(n_unique) < missing
+            if df[col].dtype == bool:
+                df[col] = df[col].astype(object)
+            df.loc[mask, col] = None
+
+    score = base[:, 0] + rng.standard_normal(n_unique)
+    df[TARGET_COL] = (score > 0).astype(np.int64)
+
+    # ---------- Duplicate rows ----------
+    if n_duplicates:
+        copies = df.iloc[rng.integers(0, n_unique, n_duplicates)]
+        df = pd.concat([df, copies], ignore_index=True)
+        df = df.iloc[rng.permutation(rows)].reset_index(drop=True)
+
+    return df
+
+
+def to_csv_bytes(df: pd.DataFrame) -> bytes:
+    return df.to_csv(index=False).encode()
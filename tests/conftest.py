@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+
+@pytest.fixture(autouse=True)
+def storage(tmp_path, monkeypatch):
+    """
+    Run every test against empty storage: all storage paths are relative
+    to the working directory.
+    """
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def frame() -> pd.DataFrame:
+    """
+    A small dataset with the column kinds ingestion treats differently:
+    compact integers, floats with missing values, floats exact in
+    float32, wide integers, low-cardinality text with missing values and
+    ID-like text, plus duplicate rows.
+    """
+    rng = np.random.default_rng(0)
+    n_rows = 600
+    df = pd.DataFrame({
+        "age": rng.integers(18, 90, n_rows),
+        "income": rng.lognormal(10, 1, n_rows).round(2),
+        "score": rng.integers(0, 400, n_rows) / 4,
+        "account": rng.integers(0, 10 ** 12, n_rows),
+        "city": rng.choice(["Lyon", "Oslo", "Pune"], n_rows),
+        "name": [f"user{i}" for i in range(n_rows)],
+        "target": rng.integers(0, 2, n_rows)
+    })
+    df.loc[rng.choice(n_rows, 60, replace=False), "income"] = np.nan
+    df.loc[rng.choice(n_rows, 30, replace=False), "city"] = np.nan
+
+    # Exact copies of earlier rows
+    return pd.concat([df, df.iloc[:25]], ignore_index=True)
+
+
+@pytest.fixture
+def upload(client):
+    """
+    Upload a DataFrame as CSV and return the new dataset id.
+    """
+    def upload_frame(df: pd.DataFrame) -> str:
+        response = client.post("/upload/", files={
+            "file": ("data.csv", df.to_csv(index=False).encode(), "text/csv")
+        })
+        assert response.status_code == 200, response.text
+        return response.json()["dataset"]["dataset_id"]
+
+    return upload_frame
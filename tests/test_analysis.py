@@ -0,0 +1,180 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from app.services import storage_service
+from app.services.execution_service import execute_step
+from app.services.quality_scoring_service import (
+    _sampled_intervals,
+    compute_quality_score,
+    compute_selected_quality_score,
+    iter_quality_analysis
+)
+from app.services.risk_leakage_service import detect_feature_risks
+from app.services.storage_service import load_profile
+from app.utils.statistics import APPROX_SAMPLE_ROWS, profile_dataframe
+
+
+def test_approximate_mode_sketches_versions_without_a_profile(
+    upload, frame
+):
+    dataset_id = upload(frame)
+    exact = compute_quality_score(dataset_id, "target")
+
+    os.remove(storage_service._get_profile_path(dataset_id, "v0_raw"))
+    approximate = compute_quality_score(
+        dataset_id, "target", mode="approximate"
+    )
+
+    intervals = approximate["approximation"]
+    assert intervals["exact_profile"] is False
+    low, high = intervals["quality_score_ci"]
+    assert low <= approximate["quality_score"] <= high
+    assert low <= exact["quality_score"] <= high
+    assert approximate["metrics"]["missing_ratio"] == (
+        exact["metrics"]["missing_ratio"]
+    )
+    # The sketch is not stored in place of the exact profile
+    assert not os.path.exists(
+        storage_service._get_profile_path(dataset_id, "v0_raw")
+    )
+
+
+def test_stored_profile_is_exact_in_approximate_mode(upload, frame):
+    dataset_id = upload(frame)
+    exact = compute_quality_score(dataset_id, "target")
+    approximate = compute_quality_score(
+        dataset_id, "target", mode="approximate"
+    )
+
+    intervals = approximate["approximation"]
+    assert intervals["exact_profile"] is True
+    assert intervals["quality_score_ci"] == [exact["quality_score"]] * 2
+    # Small enough to read whole: nothing was sampled
+    assert "sampled_metrics" not in intervals
+
+
+def test_sampled_risk_metrics_have_intervals():
+    rng = np.random.default_rng(0)
+    n_rows = APPROX_SAMPLE_ROWS + 20_000
+    x = rng.normal(size=n_rows)
+    df = pd.DataFrame({
+        "x": x,
+        "y": x + rng.normal(scale=0.5, size=n_rows),
+        "z": rng.normal(size=n_rows),
+        "target": (x + rng.normal(size=n_rows) > 0).astype(int)
+    })
+    profile = profile_dataframe(df)
+    detect_feature_risks(df, "target", profile=profile, mode="approximate")
+
+    sampled = profile.sampled
+    assert sampled["sample_rows"] == APPROX_SAMPLE_ROWS
+    assert set(sampled["vif"]) == {"x", "y", "z", "target"}
+    assert set(sampled["target_correlation"]) == {"x", "y", "z"}
+
+    exact_corr = df[["x", "y", "z"]].corrwith(df["target"])
+    intervals = _sampled_intervals(sampled)
+    for col, (low, high) in intervals["target_correlation_ci"].items():
+        assert low <= sampled["target_correlation"][col] <= high
+        assert low <= exact_corr[col] <= high
+    for col, (low, high) in intervals["vif_ci"].items():
+        assert 1 <= low <= sampled["vif"][col] <= high
+
+
+def stream(client, url: str, **params) -> list[dict]:
+    response = client.get(url, params=params)
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"] == "application/x-ndjson"
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_stream_matches_the_analysis(client, upload, frame):
+    dataset_id = upload(frame)
+    # Computed by the stream first, then replayed from the cache
+    for _ in range(2):
+        lines = stream(
+            client, f"/analyze/{dataset_id}/stream", target_col="target"
+        )
+        analysis = client.get(
+            f"/analyze/{dataset_id}", params={"target_col": "target"}
+        ).json()
+
+        summary, *features, last = lines
+        assert summary == {
+            "type": "summary",
+            **{
+                key: analysis[key]
+                for key in ("dataset_id", "rows", "columns",
+                            "quality_score", "metrics")
+            }
+        }
+        assert [
+            {key: value for key, value in line.items()
+             if key not in ("type", "recommendations")}
+            for line in features
+        ] == analysis["feature_diagnostics"]
+        assert [
+            rec for line in features for rec in line["recommendations"]
+        ] + last["recommendations"] == analysis["recommendations"]
+        assert last["pagination"]["matching_features"] == len(features)
+
+
+def test_stream_yields_the_summary_before_risk_detection(upload, frame):
+    dataset_id = upload(frame)
+    records = iter_quality_analysis(dataset_id, "target")
+
+    assert next(records)["type"] == "summary"
+    assert load_profile(dataset_id, "v0_raw").vif is None
+    assert [record["type"] for record in records][-1] == "recommendations"
+    assert load_profile(dataset_id, "v0_raw").vif is not None
+
+
+def test_stream_pages_and_filters(client, upload, frame):
+    dataset_id = upload(frame)
+    lines = stream(
+        client, f"/analyze/{dataset_id}/stream",
+        flag="Safe", offset=1, limit=2
+    )
+    analysis = client.get(
+        f"/analyze/{dataset_id}", params={"flag": "Safe", "offset": 1,
+                                         "limit": 2}
+    ).json()
+
+    features = [line for line in lines if line["type"] == "feature"]
+    assert [line["feature"] for line in features] == [
+        info["feature"] for info in analysis["feature_diagnostics"]
+    ]
+    assert lines[-1]["pagination"] == analysis["pagination"]
+
+
+def test_version_stream_revalidates(client, upload, frame):
+    dataset_id = upload(frame)
+    version = execute_step(
+        dataset_id, "median_impute", {"feature": "income"}
+    )["new_version"]
+    url = f"/analyze/{dataset_id}/versions/{version}/stream"
+
+    response = client.get(url)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert etag != client.get(f"/analyze/{dataset_id}/stream").headers["ETag"]
+
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert client.get(
+        f"/analyze/{dataset_id}/versions/v9_missing/stream"
+    ).status_code == 404
+
+
+def test_background_analysis_applies_the_selection(upload, frame):
+    dataset_id = upload(frame)
+    analysis = compute_selected_quality_score(
+        dataset_id, None, None, "exact", None, None, 2, 3
+    )
+    assert [info["feature"] for info in analysis["feature_diagnostics"]] == (
+        list(frame.columns[2:5])
+    )
+    assert analysis["pagination"]["returned_features"] == 3
@@ -0,0 +1,184 @@
+import io
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from app.services import storage_service
+from app.services.storage_service import stream_export
+
+
+@pytest.fixture
+def dataset_id(upload, frame):
+    return upload(frame)
+
+
+def download(client, dataset_id: str, headers: dict | None = None, **params):
+    return client.get(
+        f"/download/{dataset_id}", params=params, headers=headers or {}
+    )
+
+
+@pytest.mark.parametrize("params", [
+    {"format": "csv"},
+    {"format": "csv", "compression": "gzip"},
+    {"format": "csv", "compression": "zstd"},
+    {"format": "parquet"},
+    {"format": "arrow", "compression": "lz4"}
+])
+def test_formats_decode_to_the_stored_data(
+    client, frame, dataset_id, params
+):
+    missing = frame["income"].isna().sum()
+    response = download(client, dataset_id, **params)
+    assert response.status_code == 200
+    data = response.content
+
+    if params["format"] == "csv":
+        compression = params.get("compression")
+        if compression == "zstd":
+            data = pa.input_stream(
+                pa.py_buffer(data), compression="zstd"
+            ).read()
+        df = pd.read_csv(
+            io.BytesIO(data),
+            compression="gzip" if compression == "gzip" else None
+        )
+        assert len(df) == len(frame)
+        assert df["income"].isna().sum() == missing
+        return
+
+    if params["format"] == "parquet":
+        table = pq.read_table(io.BytesIO(data))
+    else:
+        table = pa.ipc.open_file(pa.py_buffer(data)).read_all()
+    assert table.num_rows == len(frame)
+    # Missing floats are nulls again, as ingested
+    assert table.column("income").null_count == missing
+
+
+def test_range_requests(client, dataset_id):
+    full = download(client, dataset_id).content
+    size = len(full)
+
+    response = download(client, dataset_id, {"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes 10-19/{size}"
+    assert response.content == full[10:20]
+
+    response = download(client, dataset_id, {"Range": "bytes=-5"})
+    assert response.status_code == 206
+    assert response.content == full[-5:]
+
+    response = download(client, dataset_id, {"Range": f"bytes={size}-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{size}"
+
+    # Unparsable ranges are ignored
+    response = download(client, dataset_id, {"Range": "lines=1-2"})
+    assert response.status_code == 200
+    assert response.content == full
+
+
+def test_open_range_on_uncached_export_streams(client, dataset_id):
+    response = download(
+        client, dataset_id, {"Range": "bytes=0-"}, format="parquet"
+    )
+    assert response.status_code == 200
+    cached = download(client, dataset_id, format="parquet")
+    assert response.content == cached.content
+    assert cached.headers["content-length"] == str(len(cached.content))
+
+
+def test_conditional_requests(client, dataset_id):
+    response = download(client, dataset_id)
+    etag = response.headers["etag"]
+    last_modified = response.headers["last-modified"]
+
+    response = download(client, dataset_id, {"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    response = download(
+        client, dataset_id, {"If-Modified-Since": last_modified}
+    )
+    assert response.status_code == 304
+
+    # Another encoding is another entity
+    response = download(
+        client, dataset_id, {"If-None-Match": etag}, format="parquet"
+    )
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_if_range_with_stale_validator_sends_everything(client, dataset_id):
+    full = download(client, dataset_id)
+
+    response = download(client, dataset_id, {
+        "Range": "bytes=0-9", "If-Range": full.headers["etag"]
+    })
+    assert response.status_code == 206
+
+    response = download(client, dataset_id, {
+        "Range": "bytes=0-9", "If-Range": '"stale"'
+    })
+    assert response.status_code == 200
+    assert response.content == full.content
+
+
+def test_new_version_gets_new_etag(client, dataset_id):
+    before = download(client, dataset_id).headers["etag"]
+    response = client.post(f"/execute/{dataset_id}", json={
+        "action": "median_impute", "params": {"feature": "income"}
+    })
+    assert response.status_code == 200
+
+    response = download(client, dataset_id, {"If-None-Match": before})
+    assert response.status_code == 200
+    assert response.headers["etag"] != before
+
+    # The earlier version is still served, unchanged
+    response = client.get(
+        f"/download/{dataset_id}/versions/v0_raw",
+        headers={"If-None-Match": before}
+    )
+    assert response.status_code == 304
+
+
+def test_unknown_version_and_format(client, dataset_id):
+    response = client.get(f"/download/{dataset_id}/versions/v9")
+    assert response.status_code == 404
+
+    response = download(client, dataset_id, format="xlsx")
+    assert response.status_code == 400
+
+    response = download(client, "no-such-dataset")
+    assert response.status_code == 404
+
+
+def test_overlapping_streams_do_not_corrupt_the_cache(
+    client, frame, dataset_id, monkeypatch
+):
+    """
+    Two encodes of one artifact on the same thread, as when the server
+    reuses a worker thread: the first completes and is cached, the second
+    is abandoned midway by its client.
+    """
+    monkeypatch.setattr(storage_service, "EXPORT_BATCH_ROWS", 50)
+    first = stream_export(dataset_id, "v0_raw", "csv", "none")
+    second = stream_export(dataset_id, "v0_raw", "csv", "none")
+
+    # Enough of the first encode to be flushed to disk before the
+    # second one opens its file
+    encoded = b"".join(next(first) for _ in range(6))
+    next(second)
+    encoded += b"".join(first)
+    next(second)
+    second.close()
+
+    cached = download(client, dataset_id).content
+    assert cached == encoded
+    df = pd.read_csv(io.BytesIO(cached))
+    assert len(df) == len(frame)
@@ -0,0 +1,71 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+from app.services import ingestion_service
+from app.services.storage_service import read_version, read_version_table
+
+
+def test_compact_dtypes_are_stored_and_read_back(upload, frame):
+    dataset_id = upload(frame)
+    df = read_version(dataset_id, "v0_raw")
+
+    assert df["age"].dtype == np.int8
+    assert df["target"].dtype == np.int8
+    assert df["score"].dtype == np.float32
+    assert df["account"].dtype == np.int64
+    assert isinstance(df["city"].dtype, pd.CategoricalDtype)
+    assert list(df["city"].cat.categories) == ["Lyon", "Oslo", "Pune"]
+    assert not isinstance(df["name"].dtype, pd.CategoricalDtype)
+
+
+def test_stored_values_match_the_csv(upload, frame):
+    dataset_id = upload(frame)
+    expected = pd.read_csv(io.BytesIO(frame.to_csv(index=False).encode()))
+    df = read_version(dataset_id, "v0_raw")
+
+    for col in expected.columns:
+        if df[col].dtype == np.float32:
+            # float32 only where every parsed value survives the cast
+            np.testing.assert_array_equal(
+                df[col].to_numpy(np.float64),
+                expected[col].to_numpy(np.float32).astype(np.float64)
+            )
+        else:
+            pd.testing.assert_series_equal(
+                df[col].astype(object),
+                expected[col].astype(object),
+                check_names=False
+            )
+
+
+def test_later_chunk_widens_compact_dtype(upload, monkeypatch):
+    monkeypatch.setattr(ingestion_service, "INGEST_CHUNK_ROWS", 100)
+    df = pd.DataFrame({
+        "count": np.r_[np.arange(100) % 50, [40_000, 7]],
+        "ratio": np.r_[np.full(100, 0.5), [0.1, 0.25]]
+    })
+
+    dataset_id = upload(df)
+    stored = read_version(dataset_id, "v0_raw")
+
+    # 0.1 is not exact in float32, 40000 does not fit int8
+    assert stored["count"].dtype == np.int32
+    assert stored["ratio"].dtype == np.float64
+    np.testing.assert_array_equal(stored["count"], df["count"])
+    np.testing.assert_array_equal(stored["ratio"], df["ratio"])
+
+
+def test_chunked_upload_is_stored_as_one_batch(upload, frame, monkeypatch):
+    monkeypatch.setattr(ingestion_service, "INGEST_CHUNK_ROWS", 64)
+    dataset_id = upload(frame)
+
+    table = read_version_table(dataset_id, "v0_raw")
+    assert all(column.num_chunks == 1 for column in table.columns)
+    # Missing floats are NaN, so float columns map without conversion
+    assert table.column("income").null_count == 0
+
+    df = read_version(dataset_id, "v0_raw")
+    assert df["income"].isna().sum() == frame["income"].isna().sum()
+    assert not df["income"].to_numpy().flags.writeable
@@ -0,0 +1,107 @@
+import os
+from concurrent.futures import Future
+from datetime import datetime
+
+import pytest
+
+from app.services import job_service
+from app.services.job_service import (
+    JobLimitError,
+    get_job,
+    reconcile_jobs,
+    submit_job
+)
+from app.services.storage_service import VersionInUseError
+
+
+def write_job(job_id: str, dataset_id: str, status: str, owner_pid: int):
+    """
+    A job record as another server process would have left it.
+    """
+    job_service._save_job({
+        "job_id": job_id,
+        "dataset_id": dataset_id,
+        "kind": "analyze",
+        "status": status,
+        "progress": 0.0,
+        "message": status.capitalize(),
+        "owner_pid": owner_pid,
+        "owner_start_time": job_service._process_start_time(owner_pid),
+        "submitted_at": datetime.utcnow().isoformat(),
+        "started_at": None,
+        "finished_at": None,
+        "result": None,
+        "error": None
+    })
+    active_dir = job_service._get_active_dir(dataset_id)
+    os.makedirs(active_dir, exist_ok=True)
+    open(os.path.join(active_dir, job_id), "w").close()
+
+
+def dead_pid() -> int:
+    pid = 2 ** 22 - 1
+    while True:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return pid
+        except PermissionError:
+            pass
+        pid -= 1
+
+
+def test_orphaned_jobs_fail_at_startup():
+    write_job("queued-job", "ds", "queued", dead_pid())
+    write_job("running-job", "ds", "running", dead_pid())
+    write_job("live-job", "ds", "running", os.getpid())
+
+    assert reconcile_jobs() == 2
+    for job_id in ("queued-job", "running-job"):
+        job = get_job(job_id)
+        assert job["status"] == "failed"
+        assert job["finished_at"] is not None
+    assert get_job("live-job")["status"] == "running"
+
+
+def test_orphaned_job_result_is_an_error(client):
+    write_job("orphan", "ds", "running", dead_pid())
+
+    response = client.get("/jobs/orphan/result")
+    assert response.status_code == 500
+
+
+def test_limit_counts_jobs_of_every_process():
+    # One job from this process and one from a sibling server process
+    write_job("mine", "ds", "running", os.getpid())
+    write_job("sibling", "ds", "queued", os.getppid())
+
+    with pytest.raises(JobLimitError):
+        submit_job("analyze", "ds", print)
+
+
+def test_limit_ignores_orphaned_jobs():
+    write_job("orphan-1", "ds", "running", dead_pid())
+    write_job("orphan-2", "ds", "queued", dead_pid())
+    assert job_service._count_active_jobs("ds") == 0
+    assert not os.listdir(job_service._get_active_dir("ds"))
+
+
+class StaleVersionError(ValueError):
+    pass
+
+
+@pytest.mark.parametrize("error, status", [
+    (VersionInUseError("v1_step is in use"), 409),
+    (StaleVersionError("stale"), 400),
+    (FileNotFoundError("missing"), 404),
+    (RuntimeError("boom"), 500)
+])
+def test_failed_job_records_the_route_status(client, error, status):
+    write_job("failing", "ds", "running", os.getpid())
+    future = Future()
+    future.set_exception(error)
+    job_service._finish_job("failing", "ds", future)
+
+    assert get_job("failing")["error"]["status"] == status
+    response = client.get("/jobs/failing/result")
+    assert response.status_code == status
@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.execution_service import execute_step, execute_pipeline
+from app.services.quality_scoring_service import compute_quality_score
+from app.services.risk_leakage_service import _vif_scores
+from app.services.storage_service import (
+    get_latest_version,
+    load_cross_products,
+    load_profile,
+    read_version
+)
+from app.utils.statistics import profile_columns
+
+
+def assert_profile_matches_data(dataset_id: str, version: str):
+    """
+    The stored profile of a version equals one computed from scratch.
+    """
+    profile = load_profile(dataset_id, version)
+    assert profile is not None
+
+    df = read_version(dataset_id, version)
+    assert profile.n_rows == len(df)
+    assert profile.duplicate_count == df.duplicated().sum()
+    pd.testing.assert_frame_equal(
+        profile.columns.loc[df.columns],
+        profile_columns(df),
+        check_dtype=False,
+        rtol=1e-6
+    )
+
+
+def test_ingested_profile_matches_full_profile(upload, frame):
+    dataset_id = upload(frame)
+    assert_profile_matches_data(dataset_id, "v0_raw")
+
+
+@pytest.mark.parametrize("action, params", [
+    ("median_impute", {"feature": "income"}),
+    ("mean_impute", {"feature": "income"}),
+    ("mode_impute", {"feature": "city"}),
+    ("log_transform", {"feature": "income"}),
+    ("standard_scale", {"features": ["score", "age"]}),
+    ("clip_outliers", {"feature": "income"}),
+    ("label_encode", {"feature": "city"}),
+    ("drop_feature", {"feature": "name"})
+])
+def test_step_profile_matches_full_profile(upload, frame, action, params):
+    dataset_id = upload(frame)
+    version = execute_step(dataset_id, action, params)["new_version"]
+    assert_profile_matches_data(dataset_id, version)
+
+
+def test_chained_step_profiles_match_full_profiles(upload, frame):
+    """
+    Each step derives its profile from the previous step's, so errors
+    would accumulate along a chain.
+    """
+    dataset_id = upload(frame)
+    steps = [
+        ("drop_feature", {"feature": "name"}),
+        ("median_impute", {"feature": "income"}),
+        ("mode_impute", {"feature": "city"}),
+        ("standard_scale", {"feature": "income"}),
+        ("label_encode", {"feature": "city"})
+    ]
+    for action, params in steps:
+        version = execute_step(dataset_id, action, params)["new_version"]
+        assert_profile_matches_data(dataset_id, version)
+
+
+def test_pipeline_checkpoint_profiles_match_full_profiles(upload, frame):
+    dataset_id = upload(frame)
+    result = execute_pipeline(dataset_id, [
+        {"action": "median_impute", "params": {"feature": "income"}},
+        {"action": "log_transform", "params": {"feature": "income"}},
+        {"action": "drop_feature", "params": {"feature": "account"}}
+    ], checkpoint=True)
+
+    for step in result["steps"]:
+        assert_profile_matches_data(dataset_id, step["version"])
+    assert get_latest_version(dataset_id) == result["new_version"]
+
+
+def assert_vif_matches_data(dataset_id: str, version: str):
+    """
+    The stored VIF of a version equals one computed from its data.
+    """
+    vif = load_profile(dataset_id, version).vif
+    assert vif is not None
+
+    df = read_version(dataset_id, version)
+    expected = _vif_scores(df.select_dtypes(include=[np.number]))
+    assert list(vif) == list(expected)
+    np.testing.assert_allclose(
+        list(vif.values()), list(expected.values()), rtol=1e-6
+    )
+
+
+@pytest.mark.parametrize("action, params", [
+    ("median_impute", {"feature": "income"}),
+    ("log_transform", {"feature": "income"}),
+    ("standard_scale", {"features": ["score", "age"]}),
+    ("label_encode", {"feature": "city"}),
+    ("drop_feature", {"feature": "account"}),
+    ("mode_impute", {"feature": "city"})
+])
+def test_step_vif_is_updated_from_cross_products(
+    upload, frame, action, params
+):
+    dataset_id = upload(frame)
+    compute_quality_score(dataset_id)
+    assert load_cross_products(dataset_id, "v0_raw") is not None
+
+    version = execute_step(dataset_id, action, params)["new_version"]
+    assert load_cross_products(dataset_id, version) is not None
+    assert_vif_matches_data(dataset_id, version)
+
+
+def test_chained_step_vifs_match_full_vifs(upload, frame):
+    dataset_id = upload(frame)
+    compute_quality_score(dataset_id)
+    steps = [
+        ("median_impute", {"feature": "income"}),
+        ("standard_scale", {"feature": "income"}),
+        ("label_encode", {"feature": "city"}),
+        ("clip_outliers", {"feature": "score"}),
+        ("drop_feature", {"feature": "age"})
+    ]
+    for action, params in steps:
+        version = execute_step(dataset_id, action, params)["new_version"]
+        assert_vif_matches_data(dataset_id, version)
@@ -0,0 +1,44 @@
+import re
+
+import pytest
+from reportlab import rl_config
+
+from app.services import report_service
+from app.services.report_service import generate_report
+
+
+def test_report_fonts_are_defined_in_the_pdf(upload, frame, monkeypatch):
+    monkeypatch.setattr(rl_config, "pageCompression", 0)
+    dataset_id = upload(frame)
+    with open(generate_report(dataset_id, "target")["pdf_report"], "rb") as f:
+        pdf = f.read()
+
+    defined = set(re.findall(rb"/(F\d+) \d+ 0 R", pdf))
+    used = set(re.findall(rb"/(F\d+) [\d.]+ Tf", pdf))
+    assert used and used <= defined
+
+
+def test_cached_report_renders_nothing(upload, frame, monkeypatch):
+    dataset_id = upload(frame)
+    generate_report(dataset_id, "target")
+
+    def no_rendering(*args):
+        raise AssertionError("a cached section was rendered again")
+
+    monkeypatch.setattr(report_service, "_render_feature_task", no_rendering)
+    monkeypatch.setattr(report_service, "_get_render_executor", no_rendering)
+    with open(generate_report(dataset_id, "target")["pdf_report"], "rb") as f:
+        assert f.read().startswith(b"%PDF")
+
+
+def test_code_is_not_pasted_with_other_font_names(tmp_path):
+    block = report_service._block(20, [
+        report_service._text(40, 10, "Title", font="Helvetica-Bold")
+    ])
+    assert block["fonts"] == {"Helvetica-Bold": "/F2"}
+
+    block["fonts"] = {"Helvetica-Bold": "/F3"}
+    with pytest.raises(RuntimeError):
+        report_service._write_pdf(
+            [{"blocks": [block]}], str(tmp_path / "report.pdf"), "footer"
+        )
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.quality_scoring_service import find_duplicate_rows
+from app.utils.statistics import DuplicateRowCounter, count_duplicate_rows
+
+
+def duplicate_frame(seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    n_rows = 2000
+    return pd.DataFrame({
+        "small": rng.integers(0, 3, n_rows),
+        "float": rng.choice([0.5, -0.0, 0.0, np.nan], n_rows),
+        "text": rng.choice(["a", "b", None], n_rows),
+        "category": pd.Categorical(rng.choice(["x", "y"], n_rows)),
+        "flag": rng.choice([True, False], n_rows)
+    })
+
+
+@pytest.mark.parametrize("chunk_rows", [1, 7, 500, 10_000])
+def test_duplicate_count_matches_pandas(chunk_rows):
+    df = duplicate_frame()
+    assert count_duplicate_rows(df, chunk_rows=chunk_rows) == (
+        df.duplicated().sum()
+    )
+
+
+def test_duplicate_count_treats_equal_floats_alike():
+    # -0.0 == 0.0 and NaN payloads are all missing, as for pandas
+    nan_payload = np.frombuffer(
+        np.uint64(0x7FF8000000000001).tobytes(), dtype=np.float64
+    )[0]
+    df = pd.DataFrame({"x": [0.0, -0.0, np.nan, nan_payload, 1.0]})
+    assert count_duplicate_rows(df, chunk_rows=2) == df.duplicated().sum()
+
+
+def test_duplicate_samples_are_first_duplicates():
+    df = duplicate_frame(seed=1)
+    counter = DuplicateRowCounter(sample_size=10)
+    for start in range(0, len(df), 300):
+        counter.update(df.iloc[start:start + 300])
+
+    expected = np.flatnonzero(df.duplicated().to_numpy())
+    assert counter.duplicate_count == len(expected)
+    assert counter.sample_indices == expected[:10].tolist()
+
+
+def test_stored_version_duplicates_match_pandas(upload, frame):
+    dataset_id = upload(frame)
+    result = find_duplicate_rows(dataset_id, "v0_raw", sample_size=5)
+
+    expected = np.flatnonzero(frame.duplicated().to_numpy())
+    assert result["duplicate_rows"] == len(expected)
+    assert result["sample_indices"] == expected[:5].tolist()
@@ -0,0 +1,166 @@
+import threading
+
+import pandas as pd
+import pytest
+
+from app.services.execution_service import execute_step
+from app.services.versioning_service import (
+    undo_last_execution,
+    rollback_to_version
+)
+from app.services.storage_service import (
+    VersionInUseError,
+    dataset_lock,
+    delete_version,
+    get_column_fingerprints,
+    get_latest_version,
+    get_version_record,
+    list_versions,
+    read_journal,
+    read_version
+)
+
+
+def test_steps_store_only_written_columns(upload, frame):
+    dataset_id = upload(frame)
+    v0 = get_column_fingerprints(dataset_id, "v0_raw")
+
+    v1 = execute_step(
+        dataset_id, "median_impute", {"feature": "income"}
+    )["new_version"]
+    v2 = execute_step(
+        dataset_id, "drop_feature", {"feature": "name"}
+    )["new_version"]
+
+    assert get_version_record(dataset_id, v1)["written"] == ["income"]
+    assert get_version_record(dataset_id, v2)["written"] == []
+
+    fingerprints = get_column_fingerprints(dataset_id, v2)
+    assert "name" not in fingerprints
+    assert fingerprints["income"].startswith(f"{v1}:")
+    for col in ("age", "score", "account", "city", "target"):
+        assert fingerprints[col] == v0[col]
+
+
+def test_lineage_survives_undo(upload, frame):
+    dataset_id = upload(frame)
+    v1 = execute_step(
+        dataset_id, "median_impute", {"feature": "income"}
+    )["new_version"]
+    v1_data = read_version(dataset_id, v1)
+    v1_fingerprints = get_column_fingerprints(dataset_id, v1)
+
+    v2 = execute_step(
+        dataset_id, "standard_scale", {"feature": "score"}
+    )["new_version"]
+    assert undo_last_execution(dataset_id)["undone_version"] == v2
+
+    assert get_latest_version(dataset_id) == v1
+    assert v2 not in list_versions(dataset_id)
+    assert get_column_fingerprints(dataset_id, v1) == v1_fingerprints
+    pd.testing.assert_frame_equal(read_version(dataset_id, v1), v1_data)
+
+    # The undone step leaves the active journal; the next undo takes v1
+    assert [entry["version"] for entry in read_journal(dataset_id)] == [v1]
+    assert undo_last_execution(dataset_id)["undone_version"] == v1
+    assert get_latest_version(dataset_id) == "v0_raw"
+
+
+def test_rollback_points_at_target(upload, frame):
+    dataset_id = upload(frame)
+    v0_data = read_version(dataset_id, "v0_raw")
+    execute_step(dataset_id, "median_impute", {"feature": "income"})
+    execute_step(dataset_id, "label_encode", {"feature": "city"})
+
+    rollback = rollback_to_version(dataset_id, "v0_raw")["new_version"]
+
+    record = get_version_record(dataset_id, rollback)
+    assert record["parent"] == "v0_raw"
+    assert record["bytes"] == 0
+    assert (
+        record["content_hash"]
+        == get_version_record(dataset_id, "v0_raw")["content_hash"]
+    )
+    assert get_column_fingerprints(dataset_id, rollback) == (
+        get_column_fingerprints(dataset_id, "v0_raw")
+    )
+    pd.testing.assert_frame_equal(read_version(dataset_id, rollback), v0_data)
+
+    # Steps after a rollback build on the rolled back content
+    v4 = execute_step(
+        dataset_id, "drop_feature", {"feature": "name"}
+    )["new_version"]
+    pd.testing.assert_frame_equal(
+        read_version(dataset_id, v4), v0_data.drop(columns="name")
+    )
+
+
+def test_version_with_children_cannot_be_deleted(upload, frame):
+    dataset_id = upload(frame)
+    execute_step(dataset_id, "median_impute", {"feature": "income"})
+
+    with pytest.raises(VersionInUseError):
+        delete_version(dataset_id, "v0_raw")
+
+
+def test_undo_without_steps_is_rejected(client, upload, frame):
+    dataset_id = upload(frame)
+
+    response = client.post(f"/versions/undo/{dataset_id}")
+    assert response.status_code == 400
+
+    response = client.post("/versions/undo/no-such-dataset")
+    assert response.status_code == 404
+
+
+def test_concurrent_steps_create_distinct_versions(upload, frame):
+    dataset_id = upload(frame)
+    steps = [
+        ("median_impute", {"feature": "income"}),
+        ("label_encode", {"feature": "city"})
+    ]
+    start = threading.Barrier(len(steps))
+    results = []
+    errors = []
+
+    def run(action, params):
+        start.wait()
+        try:
+            results.append(execute_step(dataset_id, action, params))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=step) for step in steps]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    versions = sorted(result["new_version"] for result in results)
+    assert len(set(versions)) == 2
+    assert [v.split("_")[0] for v in versions] == ["v1", "v2"]
+    assert [entry["version"] for entry in read_journal(dataset_id)] == (
+        sorted(versions)
+    )
+
+    # The later step saw the earlier one's column
+    latest = read_version(dataset_id, get_latest_version(dataset_id))
+    assert latest["income"].notna().all()
+    assert pd.api.types.is_numeric_dtype(latest["city"])
+
+
+def test_lock_is_exclusive_across_threads(upload, frame):
+    dataset_id = upload(frame)
+    entered = threading.Event()
+
+    def hold_briefly():
+        with dataset_lock(dataset_id):
+            entered.set()
+
+    with dataset_lock(dataset_id):
+        thread = threading.Thread(target=hold_briefly)
+        thread.start()
+        assert not entered.wait(0.2)
+    thread.join()
+    assert entered.is_set()